@@ -0,0 +1,103 @@
+import argparse
+import time
+
+import numpy
+
+from model.clock import clock_of
+from model.local_search import improve_route
+from model.location import DISTANCE_DTYPE, nearest_candidates
+from model.package import Package
+from model.routing import NOT_DELAYED, route_order
+
+"""
+Nearest neighbor and local search with and without per-location candidate lists, on a synthetic network of random
+points with straight-line distances.
+
+    python -m benchmark.candidate_benchmark --locations 10000 --k 16
+
+Reports the time and the miles of each mode; the exact candidate mode must give the same miles as the full scan.
+"""
+
+START = clock_of(8)
+
+
+# Time Complexity: O(N^2)
+# Space Complexity: O(N^2)
+def synthetic_distances(count, seed=1):
+    points = numpy.random.default_rng(seed).random((count, 2)) * 20
+    distances = numpy.empty((count, count), dtype=DISTANCE_DTYPE)
+    for first in range(0, count, 1024):
+        block = points[first:first + 1024, None, :] - points[None, :, :]
+        distances[first:first + 1024] = numpy.sqrt((block ** 2).sum(axis=2))
+    return distances
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(1)
+def route_miles(distances, location_ids, order, start_location_id=0):
+    stops = numpy.concatenate(([start_location_id], location_ids[order], [start_location_id]))
+    return float(distances[stops[:-1], stops[1:]].sum())
+
+
+# Time Complexity: O(N^2)
+# Space Complexity: O(N)
+def time_route(distances, location_ids, candidates, exact):
+    available_times = numpy.full(len(location_ids), NOT_DELAYED, dtype=numpy.int64)
+    started = time.perf_counter()
+    order = route_order(distances, location_ids, available_times, 0, START, candidates, exact)[0]
+    return time.perf_counter() - started, route_miles(distances, location_ids, order), order
+
+
+# Time Complexity: O(I * N) [bounded by the time budget]
+# Space Complexity: O(N)
+def time_improvement(distances, location_ids, order, candidates, budget):
+    packages = {}
+    route = []
+    for index in order:
+        package = Package(index + 1, "", "", "", None, 1, "")
+        package.location_id = int(location_ids[index])
+        packages[package.id] = package
+        route.append((package.location_id, package.id, 0))
+    _, _, result = improve_route(distances, [route], packages, 0, START, budget, 10 ** 9, candidates)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routing with nearest neighbor candidate lists.")
+    parser.add_argument("--locations", type=int, default=10000)
+    parser.add_argument("--packages", type=int, default=None, help="one per location other than the hub by default")
+    parser.add_argument("--k", type=int, default=16)
+    parser.add_argument("--search-stops", type=int, default=1000, help="stops in the local search comparison")
+    parser.add_argument("--time-budget", type=float, default=5.0, help="seconds of local search per mode")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    distances = synthetic_distances(args.locations)
+    print(str(args.locations) + " locations, matrix built in {:.2f} s".format(time.perf_counter() - started))
+    started = time.perf_counter()
+    candidates = nearest_candidates(distances, args.k)
+    print("candidate lists, k={}: {:.2f} s".format(args.k, time.perf_counter() - started))
+
+    packages = args.packages or args.locations - 1
+    location_ids = numpy.random.default_rng(2).integers(1, args.locations, packages)
+    print("\nnearest neighbor, " + str(packages) + " packages")
+    print("{:<22} {:>10} {:>12}".format("", "seconds", "miles"))
+    orders = {}
+    for name, lists, exact in (("full scan", None, True), ("candidates, exact", candidates, True),
+                               ("candidates, approx", candidates, False)):
+        seconds, miles, orders[name] = time_route(distances, location_ids, lists, exact)
+        print("{:<22} {:>10.3f} {:>12.1f}".format(name, seconds, miles))
+
+    count = min(args.search_stops, len(location_ids))
+    subset = location_ids[:count]
+    order = time_route(distances, subset, candidates, True)[2]
+    print("\nlocal search, " + str(count) + " stops, {:.1f} s budget".format(args.time_budget))
+    print("{:<22} {:>10} {:>12} {:>12} {:>10}".format("", "seconds", "miles before", "miles after", "moves"))
+    for name, lists in (("full neighbourhood", None), ("candidate moves", candidates)):
+        result = time_improvement(distances, subset, order, lists, args.time_budget)
+        print("{:<22} {:>10.3f} {:>12.1f} {:>12.1f} {:>10}".format(name, result.seconds, result.miles_before,
+                                                                    result.miles_after, result.moves))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import datetime
+import io
+import random
+import time
+
+from benchmark.candidate_benchmark import synthetic_distances
+from model.location import Location
+from model.package import Package, PackagePriority
+from model.wgups import WGUPS
+from util.reporter import Reporter
+
+"""
+Routing of single large trucks: generate_route over thousands of packages with deadlines, some of them delayed, so
+the time spent on the clock (delivery times, availability and deadline checks) shows next to the distance scans.
+
+    python -m benchmark.clock_benchmark --locations 3000 --packages 1000 5000 --repeat 3
+
+Route caching and exact routing are off, so every repeat routes the truck again. Reports the best time per size and
+the miles and late packages, which must not change between commits that only change how time is kept.
+"""
+
+START = datetime.datetime(1, 1, 1, 8)
+
+
+# A WGUPS with one truck carrying count packages spread over the locations: a tenth due at 10:30, a tenth at noon,
+# the rest at the end of the day, and one in twenty held at the hub until a time between 8:00 and 12:00.
+# Time Complexity: O(N)
+# Space Complexity: O(L^2 + N)
+def large_truck(distances, count, seed=1):
+    rng = random.Random(seed)
+    locations = [Location(i, "Location " + str(i), str(i) + " Main St", "84115") for i in range(len(distances))]
+    packages = []
+    for i in range(count):
+        deadline = rng.choices(["10:30 AM", "12:00 PM", "EOD"], [0.1, 0.1, 0.8])[0]
+        package = Package(i + 1, locations[rng.randrange(1, len(locations))].address, "Salt Lake City", "84115",
+                          deadline, "5", "")
+        if rng.random() < 0.05:
+            package.available_time = START + datetime.timedelta(minutes=rng.randrange(240))
+        packages.append(package)
+    wgups = WGUPS(locations, distances, packages, 1, route_cache_size=0, reporter=Reporter(), exact_locations=0)
+    truck = wgups.trucks[0]
+    for package in wgups.packages:
+        package.truck = truck
+        package.priority = PackagePriority.LOW
+        truck.packages.append(package)
+    return wgups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark routing large trucks.")
+    parser.add_argument("--locations", type=int, default=3000)
+    parser.add_argument("--packages", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    distances = synthetic_distances(args.locations)
+    print("{:>10} {:>12} {:>12} {:>8}".format("packages", "seconds", "miles", "late"))
+    for count in args.packages:
+        with contextlib.redirect_stdout(io.StringIO()):
+            wgups = large_truck(distances, count)
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            route, _ = wgups.generate_route(1, START)
+            best = min(best, time.perf_counter() - started)
+        late = sum(1 for p in wgups.packages if p.deadline is not None and p.delivered_time > p.deadline)
+        print("{:>10} {:>12.3f} {:>12.1f} {:>8}".format(count, best, sum(entry[2] for entry in route), late))
+
+
+if __name__ == "__main__":
+    main()
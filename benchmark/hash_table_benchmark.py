@@ -0,0 +1,58 @@
+import argparse
+import random
+import time
+
+from model.chaining_hash_table import ChainingHashTable
+from model.open_addressing_hash_table import OpenAddressingHashTable
+
+"""
+Micro-benchmark of ChainingHashTable against OpenAddressingHashTable.
+
+    python -m benchmark.hash_table_benchmark --sizes 1000 100000 1000000
+
+Lookups on the chaining table walk a chain of N / 10 nodes, so at large sizes only a sample of keys is looked up and
+the per-operation time is reported.
+"""
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(1)
+def time_per_operation(operation, keys):
+    started = time.perf_counter()
+    for key in keys:
+        operation(key)
+    return (time.perf_counter() - started) / max(1, len(keys)) * 1e9
+
+
+# Time Complexity: O(N) for the open addressing table, O(N^2 / 10) for a chaining lookup of every key
+# Space Complexity: O(N)
+def benchmark(table_class, size, sample):
+    keys = list(range(size))
+    random.Random(size).shuffle(keys)
+    lookups = keys if sample <= 0 else keys[:sample]
+    table = table_class()
+    results = {"insert_ns": time_per_operation(lambda key: table.insert_(key, key), keys),
+               "lookup_ns": time_per_operation(table.lookup_, lookups)}
+    started = time.perf_counter()
+    len(table)
+    results["len_ns"] = (time.perf_counter() - started) * 1e9
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the chaining and open addressing hash tables.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--chaining-sample", type=int, default=1000,
+                        help="number of keys looked up in the chaining table (0 for all)")
+    args = parser.parse_args()
+
+    print("{:>10} {:>24} {:>12} {:>12} {:>14}".format("keys", "table", "insert ns", "lookup ns", "len ns"))
+    for size in args.sizes:
+        for table_class, sample in ((ChainingHashTable, args.chaining_sample), (OpenAddressingHashTable, 0)):
+            results = benchmark(table_class, size, sample)
+            print("{:>10} {:>24} {:>12.0f} {:>12.0f} {:>14.0f}".format(
+                size, table_class.__name__, results["insert_ns"], results["lookup_ns"], results["len_ns"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import gc
+import tracemalloc
+
+from model.location import Location
+from model.package import Package
+from model.package_store import PackageStore
+from model.truck import Truck
+from util.csv_reader import get_package_data
+
+"""
+Memory used per package, location and truck, measured with tracemalloc.
+
+    python -m benchmark.memory_benchmark --packages 1000000
+
+Packages are copies of the rows of data/package.csv with new ids, so addresses and notes repeat as in a real manifest.
+"""
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def synthetic_packages(count):
+    rows = get_package_data()
+    for i in range(count):
+        row = rows[i % len(rows)]
+        # copy the strings so each package owns its text, as it would when parsed from its own csv row
+        yield Package(i + 1, "".join(row.address), "".join(row.city), "".join(row.zip), row.deadline, row.weight,
+                      "".join(row.notes))
+
+
+# Returns the bytes still allocated after build() returns, keeping its result alive.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory of the package, location and truck objects.")
+    parser.add_argument("--packages", type=int, default=1000000)
+    parser.add_argument("--locations", type=int, default=10000)
+    args = parser.parse_args()
+
+    results = [
+        ("Package objects", args.packages, measure(lambda: list(synthetic_packages(args.packages)))),
+        ("PackageStore", args.packages, measure(lambda: PackageStore.from_packages(synthetic_packages(args.packages)))),
+        ("Location objects", args.locations,
+         measure(lambda: [Location(i, "Location " + str(i), str(i) + " Main St", "84000")
+                          for i in range(args.locations)])),
+        ("Truck objects", 1000, measure(lambda: [Truck(i + 1) for i in range(1000)])),
+    ]
+
+    print("{:<18} {:>10} {:>12} {:>12} {:>10}".format("", "count", "current MB", "peak MB", "bytes/obj"))
+    for name, count, (current, peak) in results:
+        print("{:<18} {:>10} {:>12.1f} {:>12.1f} {:>10.0f}".format(name, count, current / 1e6, peak / 1e6,
+                                                                    current / count))
+
+
+if __name__ == "__main__":
+    main()
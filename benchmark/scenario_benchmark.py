@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import math
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from model.chaining_hash_table import ChainingHashTable
+from model.held_karp import DEFAULT_MAX_LOCATIONS, MAX_LOCATIONS
+from model.open_addressing_hash_table import OpenAddressingHashTable
+from model.package import PackageStatus
+from model.wgups import WGUPS
+from util import instrumentation
+from util.csv_reader import get_location_data, get_package_data
+from util.scenario_generator import generate_scenario
+
+"""
+End-to-end benchmark on a generated scenario: csv loading, package table builds, automatic loading, route generation
+and status queries.
+
+    python -m benchmark.scenario_benchmark --locations 2000 --packages 10000 --output results.json
+
+Each stage reports its wall time and the peak resident memory of the process once it is done; the routed miles and
+the arguments are saved with them as JSON, so runs on different commits can be compared. Pass --scenario to reuse a
+directory written by util.scenario_generator instead of generating one, and --profile to record the counters and
+timers of util.instrumentation (which slows the stages it measures).
+"""
+
+START = datetime.datetime(1, 1, 1, 8)
+
+
+# Peak resident memory of the process so far, in MB.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Runs a stage, printing nothing it prints, and records its time and the memory high-water mark after it.
+# Time Complexity: O(1) [plus the stage]
+# Space Complexity: O(1)
+def run_stage(results, name, stage):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        value = stage()
+    results[name] = {"seconds": time.perf_counter() - started, "peak_memory_mb": peak_memory_mb()}
+    print("{:<22} {:>10.3f} s {:>10.1f} MB".format(name, results[name]["seconds"], results[name]["peak_memory_mb"]))
+    return value
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, routing and status queries on a synthetic "
+                                                 "scenario.")
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--packages", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--note-rate", type=float, default=0.25)
+    parser.add_argument("--trucks", type=int, default=None, help="enough for every package by default")
+    parser.add_argument("--drivers", type=int, default=None, help="half the trucks by default")
+    parser.add_argument("--chaining-limit", type=int, default=20000,
+                        help="largest package count the chaining table is built for")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--exact-locations", type=int, default=DEFAULT_MAX_LOCATIONS,
+                        choices=range(MAX_LOCATIONS + 1), metavar="0-" + str(MAX_LOCATIONS),
+                        help="route stop sets of at most this many locations exactly, 0 to never")
+    parser.add_argument("--partition", action="store_true", help="load one geographic cluster per truck")
+    parser.add_argument("--scenario", default=None, help="directory with distance.csv and package.csv")
+    parser.add_argument("--output", default=None, help="JSON file for the results")
+    parser.add_argument("--profile", default=None,
+                        help="record instrumentation and write it to this file in pstats format")
+    args = parser.parse_args()
+    if args.profile:
+        instrumentation.enable()
+
+    trucks = args.trucks or max(1, math.ceil(args.packages / 12))
+    drivers = args.drivers or max(1, trucks // 2)
+    stages = {}
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = Path(args.scenario or temporary)
+        if args.scenario is None:
+            run_stage(stages, "generate", lambda: generate_scenario(directory, args.locations, args.packages,
+                                                                    args.seed, note_rate=args.note_rate,
+                                                                    trucks=trucks))
+        locations, distances = run_stage(stages, "load locations",
+                                         lambda: get_location_data(directory / "distance.csv"))
+        packages = run_stage(stages, "load packages", lambda: get_package_data(directory / "package.csv"))
+
+    def build(table_class):
+        table = table_class()
+        for package in packages:
+            table.insert_(package.id, package)
+        return table
+
+    if len(packages) <= args.chaining_limit:
+        run_stage(stages, "chaining table", lambda: build(ChainingHashTable))
+    run_stage(stages, "open addressing table", lambda: build(OpenAddressingHashTable))
+    wgups = run_stage(stages, "WGUPS init", lambda: WGUPS(locations, distances, packages, trucks,
+                                                             exact_locations=args.exact_locations))
+    plan = run_stage(stages, "auto load", lambda: wgups.auto_load(START, drivers, partition=args.partition))
+
+    # trucks are routed as the simulated day dispatches them; a truck waiting for another takes its driver when back
+    run_stage(stages, "generate routes", lambda: wgups.simulate(plan.schedule, drivers))
+    miles = sum(entry[2] for route_, _ in wgups.routes.values() for entry in route_)
+
+    # status queries need every package on a route
+    if plan.unassigned:
+        print(str(len(plan.unassigned)) + " packages did not fit on a truck; status queries skipped")
+    else:
+        times = [START + datetime.timedelta(minutes=i * 600 // args.queries) for i in range(args.queries)]
+        run_stage(stages, "status timeline", wgups.status_timeline)
+        run_stage(stages, "status counts", lambda: [wgups.get_status_counts(t) for t in times])
+        run_stage(stages, "delivered ids", lambda: [wgups.get_package_ids_with_status(PackageStatus.DELIVERED, t)
+                                                    for t in times])
+        run_stage(stages, "all statuses", lambda: wgups.get_all_package_statuses("12:00"))
+
+    results = {"commit": git_commit(),
+               "arguments": vars(args),
+               "locations": len(locations),
+               "packages": len(packages),
+               "trucks": trucks,
+               "drivers": drivers,
+               "unassigned_packages": len(plan.unassigned),
+               "total_miles": round(float(miles), 1),
+               "stages": stages}
+    print("total miles: {:.1f}".format(miles))
+    if args.profile:
+        results["instrumentation"] = instrumentation.report()
+        instrumentation.dump_stats(args.profile)
+        print("\n" + instrumentation.format_report())
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+        print("Results saved to " + args.output)
+
+
+if __name__ == "__main__":
+    main()
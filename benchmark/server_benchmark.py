@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import math
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from util.scenario_generator import generate_scenario
+
+"""
+Load test of the status server (util.status_server): many concurrent connections sending STATUS queries one at a time,
+then BULK and ALL queries, then STATUS queries while the day is re-planned.
+
+    python -m benchmark.server_benchmark --connections 2000 --queries 50 --packages 10000 --locations 1000
+
+The server runs in its own process, started with `main.py serve`, so client and server share the machine but not an
+interpreter. Without --packages the shipped data is served.
+"""
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+# Starts the server and waits until it answers queries.
+# Time Complexity: O(1) [plus the server's planning]
+# Space Complexity: O(1)
+def start_server(port, arguments):
+    process = subprocess.Popen([sys.executable, str(MAIN), "serve", "--port", str(port)] + arguments,
+                               stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("Answering status queries"):
+            return process
+    raise RuntimeError("The server exited before listening")
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+async def request(reader, writer, line):
+    writer.write(line.encode() + b"\n")
+    response = await reader.readline()
+    if response.startswith(b'{"error"'):
+        raise RuntimeError(line + ": " + response.decode().strip())
+    return response
+
+
+# One connection sending queries one at a time; returns the latency of each.
+# Time Complexity: O(Q)
+# Space Complexity: O(Q)
+async def client(reader, writer, queries, make_query):
+    latencies = []
+    for _ in range(queries):
+        line = make_query()
+        began = time.perf_counter()
+        await request(reader, writer, line)
+        latencies.append(time.perf_counter() - began)
+    writer.close()
+    return latencies
+
+
+# Time Complexity: O(C * Q log(C * Q))
+# Space Complexity: O(C * Q)
+def report(name, latencies, seconds):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1e3
+    p99 = latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.99))] * 1e3
+    print("{:<26} {:>10.0f} queries/s   p50 {:>8.2f} ms   p99 {:>8.2f} ms   max {:>8.2f} ms".format(
+        name, len(latencies) / seconds, p50, p99, latencies[-1] * 1e3))
+
+
+# Opens every connection first, then starts the queries on all of them at once.
+# Time Complexity: O(C * Q)
+# Space Complexity: O(C * Q)
+async def load(name, port, connections, queries, make_query):
+    streams = await asyncio.gather(*[asyncio.open_connection("127.0.0.1", port, limit=1 << 24)
+                                     for _ in range(connections)])
+    began = time.perf_counter()
+    results = await asyncio.gather(*[client(reader, writer, queries, make_query) for reader, writer in streams])
+    report(name, [latency for latencies in results for latency in latencies], time.perf_counter() - began)
+
+
+async def run(args, port, package_ids):
+    rng = random.Random(args.seed)
+
+    def clock():
+        return "{:02d}:{:02d}".format(rng.randrange(8, 18), rng.randrange(60))
+
+    def status_query():
+        return "STATUS " + str(rng.choice(package_ids)) + " " + clock()
+
+    def bulk_query():
+        return "BULK " + clock() + " " + " ".join(str(i) for i in rng.sample(package_ids, min(100, len(package_ids))))
+
+    def all_query():
+        return "ALL " + clock()
+
+    await load("STATUS", port, args.connections, args.queries, status_query)
+    await load("BULK of 100", port, min(args.connections, 100), args.queries, bulk_query)
+    await load("ALL", port, min(args.connections, 100), 5, all_query)
+
+    # queries while a REPLAN keeps the planning thread busy
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    began = time.perf_counter()
+    replan = asyncio.create_task(request(reader, writer, "REPLAN"))
+    await load("STATUS during REPLAN", port, min(args.connections, 200), args.queries, status_query)
+    await replan
+    print("REPLAN took {:.3f} s".format(time.perf_counter() - began))
+    print((await request(reader, writer, "STATS")).decode().strip())
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the status query server.")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50, help="queries per connection")
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--packages", type=int, default=None, help="serve a generated scenario of this size")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8429)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        arguments = []
+        count = 40
+        if args.packages:
+            trucks = math.ceil(args.packages / 16)
+            distance_path, package_path = generate_scenario(directory, args.locations, args.packages, args.seed,
+                                                            trucks=trucks)
+            arguments = ["--distances", str(distance_path), "--packages", str(package_path), "--trucks", str(trucks),
+                         "--drivers", str(max(1, trucks // 2)), "--candidates", "16"]
+            count = args.packages
+        started = time.perf_counter()
+        server = start_server(args.port, arguments)
+        print("server planned and listening in {:.3f} s".format(time.perf_counter() - started))
+        try:
+            asyncio.run(run(args, args.port, list(range(1, count + 1))))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import datetime
+import random
+import time
+
+from model.simulation import simulate_day
+
+"""
+The discrete-event engine of model.simulation on a large day: hundreds of trucks, a shared pool of drivers, delayed
+packages and a million deliveries.
+
+    python -m benchmark.simulation_benchmark --trucks 300 --drivers 150 --deliveries 1000000
+
+Routes are generated up front, with delivery times as offsets from the dispatch time, so only the engine is timed:
+the heap, the driver hand-offs and the status changes. Routing itself is measured by benchmark.scenario_benchmark.
+"""
+
+START = datetime.datetime(1, 1, 1, 8)
+
+
+# Per truck, the package ids in delivery order with their minutes after dispatch, and the minutes until it is back.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def synthetic_routes(trucks, deliveries, seed=1):
+    rng = random.Random(seed)
+    routes = {}
+    package_id = 1
+    for truck_id in range(1, trucks + 1):
+        count = deliveries // trucks + (1 if truck_id <= deliveries % trucks else 0)
+        offsets = []
+        minutes = 0.0
+        for _ in range(count):
+            minutes += rng.random() * 240 / max(1, count)
+            offsets.append((datetime.timedelta(minutes=minutes), package_id))
+            package_id += 1
+        routes[truck_id] = (offsets, datetime.timedelta(minutes=minutes + rng.randrange(5, 30)))
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the discrete-event fleet simulation.")
+    parser.add_argument("--trucks", type=int, default=300)
+    parser.add_argument("--drivers", type=int, default=150)
+    parser.add_argument("--deliveries", type=int, default=1000000)
+    parser.add_argument("--delayed", type=float, default=0.01, help="share of packages arriving during the day")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    routes = synthetic_routes(args.trucks, args.deliveries, args.seed)
+    packages = {truck_id: [package_id for _, package_id in offsets] for truck_id, (offsets, _) in routes.items()}
+    # the first drivers trucks leave at the start or when their packages are in; each later one takes over the driver
+    # of the truck drivers before it
+    schedule = [(truck_id, None if truck_id <= args.drivers else truck_id - args.drivers)
+                for truck_id in range(1, args.trucks + 1)]
+    rng = random.Random(args.seed + 1)
+    arrivals = [(START + datetime.timedelta(minutes=rng.randrange(120)), package_id)
+                for truck_id in range(1, min(args.trucks, args.drivers) + 1) for package_id in packages[truck_id]
+                if rng.random() < args.delayed]
+
+    def route(truck_id, dispatch_time):
+        offsets, back = routes[truck_id]
+        return [], dispatch_time + back, [(dispatch_time + offset, package_id) for offset, package_id in offsets]
+
+    started = time.perf_counter()
+    result = simulate_day(schedule, args.drivers, packages, arrivals, route, START)
+    seconds = time.perf_counter() - started
+
+    last_return = max(return_time for _, return_time in result.routes.values())
+    print("{} trucks, {} drivers, {} deliveries, {} arrivals".format(args.trucks, args.drivers, args.deliveries,
+                                                                    len(arrivals)))
+    print("{} events, {} status changes, {} hand-offs in {:.3f} s ({:.0f} events/s)".format(
+        result.events, len(result.statuses), len(result.handoffs), seconds, result.events / seconds))
+    print("last truck back at " + last_return.strftime("%H:%M"))
+
+
+if __name__ == "__main__":
+    main()
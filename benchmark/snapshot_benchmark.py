@@ -0,0 +1,61 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmark.status_benchmark import routed_packages
+from util.plan_snapshot import load_plan, save_plan
+from util.status_server import StatusIndex, StoreStatusIndex
+
+"""
+Saving and reloading a planned day with util.plan_snapshot, against building the status index from Package objects.
+
+    python -m benchmark.snapshot_benchmark --packages 1000000
+
+Reports the size of the snapshot, the time to save it, and the time a status-only process needs from opening the
+file to answering its first STATUS query, with and without verifying the section checksums.
+"""
+
+
+# Time Complexity: O(1) [plus the stage]
+# Space Complexity: O(1)
+def timed_stage(name, stage):
+    started = time.perf_counter()
+    value = stage()
+    print("{:<34} {:>10.2f} ms".format(name, (time.perf_counter() - started) * 1000))
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark plan snapshots.")
+    parser.add_argument("--packages", type=int, default=1000000)
+    parser.add_argument("--trucks", type=int, default=200)
+    parser.add_argument("--keep", default=None, help="write the snapshot to this path and keep it")
+    args = parser.parse_args()
+
+    packages = routed_packages(args.packages, args.trucks)
+    trucks = sorted({p.truck for p in packages}, key=lambda t: t.id)
+    for package in packages:
+        package.truck.packages.append(package)
+
+    with tempfile.TemporaryDirectory() as temporary:
+        path = args.keep or os.path.join(temporary, "day.plan")
+        timed_stage("save", lambda: save_plan(path, packages, trucks, {}))
+        print("{:<34} {:>10.1f} MB".format("snapshot size", os.path.getsize(path) / 1e6))
+
+        middle = packages[len(packages) // 2].id
+        for verify in (False, True):
+            started = time.perf_counter()
+            snapshot = load_plan(path, verify=verify)
+            index = StoreStatusIndex(snapshot.packages)
+            index.package_json(middle, 12 * 60)
+            print("{:<34} {:>10.2f} ms".format("load, index, first query" + (" (verify)" if verify else ""),
+                                                (time.perf_counter() - started) * 1000))
+        snapshot = load_plan(path, verify=False)
+        timed_stage("single lookup", lambda: snapshot.packages.lookup_(middle).delivered_time)
+        timed_stage("counts from snapshot", lambda: StoreStatusIndex(snapshot.packages).counts(12 * 60))
+        timed_stage("StatusIndex from Package objects", lambda: StatusIndex(packages).package_json(middle, 12 * 60))
+
+
+if __name__ == "__main__":
+    main()
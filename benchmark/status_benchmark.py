@@ -0,0 +1,104 @@
+import argparse
+import contextlib
+import datetime
+import io
+import random
+import time
+
+from model.clock import to_clock
+from model.package import Package, PackageStatus
+from model.status_timeline import StatusTimeline
+from model.truck import Truck
+
+"""
+Status queries over a routed day: per-package clock comparisons against the StatusTimeline.
+
+    python -m benchmark.status_benchmark --packages 100000 --queries 1000
+
+The per-package baseline is timed on a sample of the query times and reported per query.
+"""
+
+
+# Packages spread over trucks leaving between 8:00 and 12:00, each delivered within four hours of dispatch.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def routed_packages(count, trucks=200, seed=1):
+    rng = random.Random(seed)
+    fleet = [Truck(i + 1) for i in range(trucks)]
+    for truck in fleet:
+        truck.dispatch_time = datetime.datetime(1, 1, 1, 8) + datetime.timedelta(minutes=rng.randrange(240))
+    packages = []
+    for i in range(count):
+        truck = fleet[i % trucks]
+        package = Package(i + 1, str(i % 500) + " Main St", "Salt Lake City", "84115", "EOD", "5", "")
+        package.truck = truck
+        package.dispatched_time = truck.dispatch_time
+        package.delivered_time = truck.dispatch_time + datetime.timedelta(seconds=rng.randrange(4 * 3600))
+        packages.append(package)
+    return packages
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(1)
+def count_by_comparison(packages, time_):
+    at = to_clock(time_)
+    counts = {status: 0 for status in PackageStatus}
+    for package in packages:
+        status = PackageStatus.HUB
+        if at > package.dispatched_at:
+            status = PackageStatus.EN_ROUTE
+        if at > package.delivered_at:
+            status = PackageStatus.DELIVERED
+        counts[status] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark status queries against the status timeline.")
+    parser.add_argument("--packages", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--baseline-sample", type=int, default=10)
+    args = parser.parse_args()
+
+    packages = routed_packages(args.packages)
+    times = [datetime.datetime(1, 1, 1, 7) + datetime.timedelta(seconds=i * 10 * 3600 // args.queries)
+             for i in range(args.queries)]
+    sample = times[::max(1, len(times) // args.baseline_sample)][:args.baseline_sample]
+
+    started = time.perf_counter()
+    timeline = StatusTimeline(packages)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for time_ in sample:
+        assert count_by_comparison(packages, time_) == timeline.counts(time_)
+    compare = (time.perf_counter() - started) / len(sample)
+
+    started = time.perf_counter()
+    for time_ in times:
+        timeline.counts(time_)
+    counts = (time.perf_counter() - started) / len(times)
+
+    started = time.perf_counter()
+    for time_ in sample:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for package in packages:
+                package.print_package_status(time_)
+    print_table = (time.perf_counter() - started) / len(sample)
+
+    started = time.perf_counter()
+    for time_ in sample:
+        timeline.format_statuses(time_)
+    format_table = (time.perf_counter() - started) / len(sample)
+
+    print(str(args.packages) + " packages, " + str(args.queries) + " query times")
+    print("timeline build:                       {:10.3f} s".format(build))
+    print("counts, per-package comparison:       {:10.3f} ms/query".format(compare * 1e3))
+    print("counts, timeline binary search:       {:10.3f} ms/query ({:.3f} s for all queries)".format(
+        counts * 1e3, counts * len(times)))
+    print("full table, print_package_status:     {:10.3f} ms/query".format(print_table * 1e3))
+    print("full table, timeline bulk formatting: {:10.3f} ms/query".format(format_table * 1e3))
+
+
+if __name__ == "__main__":
+    main()
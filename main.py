@@ -1,149 +1,435 @@
 # Mario Silvestri III - 000941631
+import argparse
 import datetime
+import os
+import sys
 
-from model.package import PackagePriority
-from model.wgups import WGUPS
-from util.csv_reader import get_location_data, get_package_data
+"""
+Command line entry point. Importing this module does nothing; each command imports what it needs when it runs.
 
+    python main.py [--format FORMAT] [--quiet]    the interactive menu, also available as `python main.py interactive`
+    python main.py plan --trucks 3 --load auto --output-dir out --snapshot day.plan
+    python main.py serve --snapshot day.plan
 
-# initiate WGUPS with location data and package data from cvs files and two trucks
+plan runs headless: it loads the csv files, loads the trucks from a plan file or automatically, routes them and writes
+routes, statuses and a JSON summary with the mileage into the output directory. --snapshot also saves the whole plan,
+which serve can answer status queries from without reading the csv files or planning again.
+"""
+
+FORMATS = ["console", "text", "csv", "jsonl", "quiet"]  # util.reporter.REPORTERS, without importing it
+EXTENSIONS = {"text": ".txt", "csv": ".csv", "jsonl": ".jsonl"}
+
+
+# The interactive menu. --format chooses how loads, routes and status tables are written (console is the interactive
+# text); --quiet drops them without formatting. Buffered formats are written once per menu command.
 # Time Complexity: O(N^2)
 # Space Complexity: O(N^2)
-wgups = WGUPS(get_location_data(), get_package_data(), 3)
-
-print("Welcome to WGUPS")
-print("Time is " + str(wgups.time))
-print("Packages in warehouse: " + str(len(wgups.packages)))
-
-input_ = input("Press Q to quit, R to generate routes\n")
-
-# Starts the process of generating routes using the nearest neighbor algorithm.
-# Time Complexity: O(N^2) [number of packages * number of packages / 2]
-# Space Complexity: O(N^2) [number of packages * number of packages]
-if input_ == "R":
-    print()
-    print("All packages will be delivered based on delivery time constraints and then distance from current location "
-          "using the nearest neighbor algorithm.\n")
-    print("Constraints:")
-    print("\tPackages 3, 18, 36, and 38 must go on truck 2")
-    print("\tPackages 14, 15, and 19 must go together")
-    print("\tPackages 6, 25, 28, and 32 are delayed, and must be dispatched after 9:05am")
-    print("\tPackage 9 address is incorrect and won't be available until 10:20am")
-    print("\tPackage 15 must be delivered by 9:00am")
-    print("\tPackages 1, 6, 13, 14, 16, 20, 25, 29, 30, 31, 34, 37, and 40 must be delivered by 10:30am\n")
-
-    print("Load the packages that must go on truck 2")
-    wgups.load_truck(2, 3, PackagePriority.MEDIUM)
-    wgups.load_truck(2, 18, PackagePriority.MEDIUM)
-    wgups.load_truck(2, 36, PackagePriority.MEDIUM)
-    wgups.load_truck(2, 38, PackagePriority.MEDIUM)
-
-    print("\nLet's take care of the early deliveries and load them on truck 1 to go out at 8:00am")
-    wgups.load_truck(1, 1, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 13, PackagePriority.MEDIUM)  # So it can be delivered with 15 and 19
-    wgups.load_truck(1, 14, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 16, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 20, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 29, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 30, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 31, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 34, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 37, PackagePriority.MEDIUM)
-    wgups.load_truck(1, 40, PackagePriority.MEDIUM)
-
-    print("\nPackages 6, 25, 28, and 32 are late, so we'll load them on truck 2 to send out at 9:05, "
-          "and prioritize package 25 since it has an early deadline.")
-    wgups.load_truck(2, 25, PackagePriority.HIGH)
-    wgups.load_truck(2, 6, PackagePriority.MEDIUM)
-    wgups.load_truck(2, 28, PackagePriority.MEDIUM)
-    wgups.load_truck(2, 32, PackagePriority.MEDIUM)
-
-    print("\nPackages 15 and 19 have to go out with package 14 on truck 1. Package 15 "
-          "has an early deadline so it's set to high priority.")
-
-    wgups.load_truck(1, 15, PackagePriority.HIGH)
-    wgups.load_truck(1, 19, PackagePriority.MEDIUM)
-
-    print("Lets fill up truck 2 with its maximum of 16 packages at low priority. Truck 1 will finish its early "
-          "delivery and then the driver will come back for truck 3. Package 9 won't be available to deliver until "
-          "10:20 when the correct address comes in.")
-
-    wgups.load_truck(2, 2, PackagePriority.LOW)
-    wgups.load_truck(2, 4, PackagePriority.LOW)
-    wgups.load_truck(2, 5, PackagePriority.LOW)
-    wgups.load_truck(2, 7, PackagePriority.LOW)
-    wgups.load_truck(2, 8, PackagePriority.LOW)
-    wgups.load_truck(2, 10, PackagePriority.LOW)
-    wgups.load_truck(2, 11, PackagePriority.LOW)
-    wgups.load_truck(2, 12, PackagePriority.LOW)
-
-    wgups.load_truck(3, 9)
-
-    # Time Complexity: O(1) -> O(N) [based on hash table bucket size / collision frequency]
-    # Space Complexity: O(1)
-    wgups.packages.lookup_(9).available_time = datetime.datetime(1, 1, 1, 10, 20)
-
-    wgups.load_truck(3, 17)
-    wgups.load_truck(3, 21)
-    wgups.load_truck(3, 22)
-    wgups.load_truck(3, 23)
-    wgups.load_truck(3, 24)
-    wgups.load_truck(3, 26)
-    wgups.load_truck(3, 27)
-    wgups.load_truck(3, 33)
-    wgups.load_truck(3, 35)
-    wgups.load_truck(3, 39)
-
-    print("\nHere's how the packages are loaded: ")
-    print("\tTruck 1: " + str(sorted(p.id for p in wgups.trucks[0].packages)))
-    print("\tTruck 2: " + str(sorted(p.id for p in wgups.trucks[1].packages)))
-    print("\tTruck 3: " + str(sorted(p.id for p in wgups.trucks[2].packages)))
-
-    print("\nHere's the order of the packages delivered: ")
+def interactive(args):
+    from model.package import PackagePriority
+    from model.wgups import WGUPS
+    from util.csv_reader import iter_packages
+    from util.distance_store import get_location_data_cached
+    from util.reporter import make_reporter
+
+    # initiate WGUPS with location data and package data from cvs files and two trucks
+    # Time Complexity: O(N^2)
+    # Space Complexity: O(N^2)
+    locations, distances = get_location_data_cached()
+    wgups = WGUPS(locations, distances, iter_packages(), 3,
+                  reporter=make_reporter("quiet" if args.quiet else args.format))
+
+    print("Welcome to WGUPS")
+    print("Time is " + str(wgups.time))
+    print("Packages in warehouse: " + str(len(wgups.packages)))
+
+    input_ = input("Press Q to quit, R to generate routes\n")
+
+    # Starts the process of generating routes using the nearest neighbor algorithm.
     # Time Complexity: O(N^2) [number of packages * number of packages / 2]
     # Space Complexity: O(N^2) [number of packages * number of packages]
-    truck1, wgups.time = wgups.generate_route(1, datetime.datetime(1, 1, 1, 8))
-    truck2, truck2_return_time = wgups.generate_route(2, datetime.datetime(1, 1, 1, 9, 5))
-    truck3, wgups.time = wgups.generate_route(3, wgups.time)
+    if input_ == "R":
+        print()
+        print("All packages will be delivered based on delivery time constraints and then distance from current "
+              "location using the nearest neighbor algorithm.\n")
+        print("Constraints:")
+        print("\tPackages 3, 18, 36, and 38 must go on truck 2")
+        print("\tPackages 14, 15, and 19 must go together")
+        print("\tPackages 6, 25, 28, and 32 are delayed, and must be dispatched after 9:05am")
+        print("\tPackage 9 address is incorrect and won't be available until 10:20am")
+        print("\tPackage 15 must be delivered by 9:00am")
+        print("\tPackages 1, 6, 13, 14, 16, 20, 25, 29, 30, 31, 34, 37, and 40 must be delivered by 10:30am\n")
 
-    total_miles = 0
+        print("Load the packages that must go on truck 2")
+        wgups.load_truck(2, 3, PackagePriority.MEDIUM)
+        wgups.load_truck(2, 18, PackagePriority.MEDIUM)
+        wgups.load_truck(2, 36, PackagePriority.MEDIUM)
+        wgups.load_truck(2, 38, PackagePriority.MEDIUM)
 
-    # Time Complexity: O(N) [number of packages]
-    # Space Complexity: O(1)
-    for tuple_ in truck1:
-        total_miles += tuple_[2]
+        print("\nLet's take care of the early deliveries and load them on truck 1 to go out at 8:00am")
+        wgups.load_truck(1, 1, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 13, PackagePriority.MEDIUM)  # So it can be delivered with 15 and 19
+        wgups.load_truck(1, 14, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 16, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 20, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 29, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 30, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 31, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 34, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 37, PackagePriority.MEDIUM)
+        wgups.load_truck(1, 40, PackagePriority.MEDIUM)
 
-    for tuple_ in truck2:
-        total_miles += tuple_[2]
+        print("\nPackages 6, 25, 28, and 32 are late, so we'll load them on truck 2 to send out at 9:05, "
+              "and prioritize package 25 since it has an early deadline.")
+        wgups.load_truck(2, 25, PackagePriority.HIGH)
+        wgups.load_truck(2, 6, PackagePriority.MEDIUM)
+        wgups.load_truck(2, 28, PackagePriority.MEDIUM)
+        wgups.load_truck(2, 32, PackagePriority.MEDIUM)
 
-    for tuple_ in truck3:
-        total_miles += tuple_[2]
+        print("\nPackages 15 and 19 have to go out with package 14 on truck 1. Package 15 "
+              "has an early deadline so it's set to high priority.")
 
-    print("\tTruck 1: " + str([tuple_[1] for tuple_ in truck1 if tuple_[1] is not None]))
-    print("\tTruck 2: " + str([tuple_[1] for tuple_ in truck2 if tuple_[1] is not None]))
-    print("\tTruck 3: " + str([tuple_[1] for tuple_ in truck3 if tuple_[1] is not None]) + "\n")
+        wgups.load_truck(1, 15, PackagePriority.HIGH)
+        wgups.load_truck(1, 19, PackagePriority.MEDIUM)
 
-    print("Total miles traveled: " + "{:.2f}".format(total_miles) + "\n")
+        print("Lets fill up truck 2 with its maximum of 16 packages at low priority. Truck 1 will finish its early "
+              "delivery and then the driver will come back for truck 3. Package 9 won't be available to deliver until "
+              "10:20 when the correct address comes in.")
 
-# Enables the user to view the status of packages.
-# Time Complexity: O(N log N)
-# Space Complexity: O(N)
-while input_ != "Q":
-    input_ = input("Q to Quit. P for package status. A for all package statuses.\n\n")
-
-    # Time Complexity: O(1)
-    # Space Complexity: O(1)
-    if input_ == "P":
-        print("Enter Package ID and time in HH:MM (24h) for package status. \nExamples: 1 09:05, 24 13:35\n")
-        input_ = input()
-        print()
-        wgups.get_package_status(input_)
+        wgups.load_truck(2, 2, PackagePriority.LOW)
+        wgups.load_truck(2, 4, PackagePriority.LOW)
+        wgups.load_truck(2, 5, PackagePriority.LOW)
+        wgups.load_truck(2, 7, PackagePriority.LOW)
+        wgups.load_truck(2, 8, PackagePriority.LOW)
+        wgups.load_truck(2, 10, PackagePriority.LOW)
+        wgups.load_truck(2, 11, PackagePriority.LOW)
+        wgups.load_truck(2, 12, PackagePriority.LOW)
+
+        wgups.load_truck(3, 9)
+
+        # Time Complexity: O(1) [expected, the package table resizes to keep its load factor bounded]
+        # Space Complexity: O(1)
+        wgups.packages.lookup_(9).available_time = datetime.datetime(1, 1, 1, 10, 20)
+
+        wgups.load_truck(3, 17)
+        wgups.load_truck(3, 21)
+        wgups.load_truck(3, 22)
+        wgups.load_truck(3, 23)
+        wgups.load_truck(3, 24)
+        wgups.load_truck(3, 26)
+        wgups.load_truck(3, 27)
+        wgups.load_truck(3, 33)
+        wgups.load_truck(3, 35)
+        wgups.load_truck(3, 39)
+
+        print("\nHere's how the packages are loaded: ")
+        print("\tTruck 1: " + str(sorted(p.id for p in wgups.trucks[0].packages)))
+        print("\tTruck 2: " + str(sorted(p.id for p in wgups.trucks[1].packages)))
+        print("\tTruck 3: " + str(sorted(p.id for p in wgups.trucks[2].packages)))
+
+        print("\nHere's the order of the packages delivered: ")
+        # Two drivers: truck 1 leaves at 8:00, truck 2 at 9:05 and truck 1's driver takes truck 3 when back.
+        # Time Complexity: O(N^2) [number of packages * number of packages / 2]
+        # Space Complexity: O(N^2) [number of packages * number of packages]
+        day = wgups.simulate([(1, datetime.datetime(1, 1, 1, 8)), (2, datetime.datetime(1, 1, 1, 9, 5)), (3, 1)],
+                             drivers=2)
+        truck1, truck2, truck3 = day.routes[1][0], day.routes[2][0], day.routes[3][0]
+        wgups.time = day.return_time(3)
+
+        total_miles = 0
+
+        # Time Complexity: O(N) [number of packages]
+        # Space Complexity: O(1)
+        for tuple_ in truck1:
+            total_miles += tuple_[2]
 
+        for tuple_ in truck2:
+            total_miles += tuple_[2]
+
+        for tuple_ in truck3:
+            total_miles += tuple_[2]
+
+        print("\tTruck 1: " + str([tuple_[1] for tuple_ in truck1 if tuple_[1] is not None]))
+        print("\tTruck 2: " + str([tuple_[1] for tuple_ in truck2 if tuple_[1] is not None]))
+        print("\tTruck 3: " + str([tuple_[1] for tuple_ in truck3 if tuple_[1] is not None]) + "\n")
+
+        print("Total miles traveled: " + "{:.2f}".format(total_miles) + "\n")
+        wgups.reporter.flush()
+
+    # Enables the user to view the status of packages.
     # Time Complexity: O(N log N)
     # Space Complexity: O(N)
-    if input_ == "A":
-        print("Enter time in HH:MM (24h) for all package statuses at that time. \nExamples: 09:05, 13:35")
-        input_ = input()
-        print()
-        wgups.get_all_package_statuses(input_)
+    while input_ != "Q":
+        input_ = input("Q to Quit. P for package status. A for all package statuses.\n\n")
+
+        # Time Complexity: O(1)
+        # Space Complexity: O(1)
+        if input_ == "P":
+            print("Enter Package ID and time in HH:MM (24h) for package status. \nExamples: 1 09:05, 24 13:35\n")
+            input_ = input()
+            print()
+            wgups.get_package_status(input_)
+
+        # Time Complexity: O(N log N)
+        # Space Complexity: O(N)
+        if input_ == "A":
+            print("Enter time in HH:MM (24h) for all package statuses at that time. \nExamples: 09:05, 13:35")
+            input_ = input()
+            print()
+            wgups.get_all_package_statuses(input_)
+            wgups.reporter.flush()
+
+
+# Parses HH:MM into a time of the program's day.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_clock(text) -> datetime.datetime:
+    try:
+        hours, minutes = text.split(":")
+        return datetime.datetime(1, 1, 1, int(hours), int(minutes))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected a time in HH:MM, got " + repr(text))
+
+
+# Parses TRUCK=HH:MM, a departure time, or TRUCK=after:ID, leave when truck ID is back, into a schedule entry.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_departure(text) -> tuple:
+    truck_id, _, start = text.partition("=")
+    try:
+        if start.startswith("after:"):
+            return int(truck_id), int(start[len("after:"):])
+        return int(truck_id), parse_clock(start)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected TRUCK=HH:MM or TRUCK=after:ID, got " + repr(text))
+
+
+# Parses ID=HH:MM, the time a package becomes available at the hub.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_availability(text) -> tuple:
+    package_id, _, time_ = text.partition("=")
+    try:
+        return int(package_id), parse_clock(time_)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected ID=HH:MM, got " + repr(text))
+
+
+# Reads a loading plan: csv rows of truck, package and an optional priority name (LOW when missing), in loading
+# order. A first row that does not start with a number is taken as a header.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def read_load_plan(path) -> list[tuple]:
+    import csv
+
+    from model.package import PackagePriority
+
+    loads = []
+    with open(path, newline="") as file:
+        for line_number, row in enumerate(csv.reader(file), 1):
+            if not row or (line_number == 1 and not row[0].strip().isdigit()):
+                continue
+            try:
+                priority = PackagePriority[row[2].strip().upper()] if len(row) > 2 and row[2].strip() else \
+                    PackagePriority.LOW
+                loads.append((int(row[0]), int(row[1]), priority))
+            except (ValueError, KeyError, IndexError):
+                raise ValueError(str(path) + ":" + str(line_number) + ": expected truck,package[,priority], got " +
+                                 ",".join(row))
+    return loads
+
+
+# Loads the data files and the trucks as the plan and serve arguments say and routes every loaded truck, simulating
+# the day so a truck only leaves once one of the --drivers is free (see WGUPS.simulate). Loads and routes go to
+# reporter, quiet by default. Returns the routed WGUPS, {truck_id: (route, return_time)} and the at-risk
+# and unassigned packages of automatic loading.
+# Time Complexity: O(T * N^2) [T trucks of N packages]
+# Space Complexity: O(N^2)
+def plan_day(args, reporter=None) -> tuple:
+    from pathlib import Path
+
+    from model.wgups import WGUPS
+    from util.csv_reader import DATA_DIRECTORY, DISTANCE_CSV, iter_packages
+    from util.distance_store import get_location_data_cached
+    from util.reporter import Reporter
+
+    distance_csv = Path(args.distances)
+    # the compiled table of another csv sits next to it, so it never replaces the one of the shipped data
+    binary = DATA_DIRECTORY / "distance.bin" if distance_csv.resolve() == DISTANCE_CSV else \
+        distance_csv.with_suffix(".bin")
+    locations, distances = get_location_data_cached(distance_csv, binary)
+
+    wgups = WGUPS(locations, distances, iter_packages(args.packages), args.trucks,
+                  route_cache_size=0 if args.no_cache else 128, reporter=reporter or Reporter(),
+                  exact_locations=args.exact_locations)
+    if args.candidates:
+        wgups.use_candidate_lists(args.candidates)
+    for package_id, available_time in args.available:
+        package = wgups.packages.lookup_(package_id)
+        if package is None:
+            raise ValueError("No package " + str(package_id) + " to make available at " +
+                             available_time.strftime("%H:%M"))
+        package.available_time = available_time
+
+    at_risk, unassigned = [], []
+    if args.load in ("auto", "partition"):
+        load_plan = wgups.auto_load(args.start, args.drivers, partition=args.load == "partition")
+        schedule, at_risk, unassigned = load_plan.schedule, load_plan.at_risk, load_plan.unassigned
+    else:
+        for truck_id, package_id, priority in read_load_plan(args.load):
+            wgups.load_truck(truck_id, package_id, priority)
+        # the first drivers trucks leave at the start, every other one when the truck drivers before it is back
+        schedule = [(truck.id, args.start if truck.id <= args.drivers else truck.id - args.drivers)
+                    for truck in wgups.trucks if truck.packages]
+    departures = dict(args.depart)
+    schedule = [(truck_id, departures.pop(truck_id, start)) for truck_id, start in schedule]
+    schedule += [(truck_id, start) for truck_id, start in departures.items() if wgups.trucks[truck_id - 1].packages]
+
+    if args.workers:
+        routes = wgups.generate_routes(schedule, args.workers)
+    else:
+        routes = wgups.simulate(schedule, args.drivers, args.improve).routes
+    return wgups, routes, at_risk, unassigned
+
+
+# Runs planning without prompts and writes routes.<ext> (loads and routes), statuses.<ext> (every package at each
+# --status-times time, end of day by default) and summary.json (mileage per truck and in total, late, at-risk and
+# unassigned packages) to the output directory.
+# Time Complexity: O(T * N^2)
+# Space Complexity: O(N^2)
+def plan(args):
+    import json
+    from pathlib import Path
+
+    from util import instrumentation
+    from util.reporter import make_reporter
+
+    if args.profile:
+        instrumentation.enable()
+    output_directory = Path(args.output_dir)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    extension = EXTENSIONS[args.output_format]
+
+    with open(output_directory / ("routes" + extension), "w", newline="") as routes_file:
+        reporter = make_reporter(args.output_format, routes_file)
+        wgups, routes, at_risk, unassigned = plan_day(args, reporter)
+        reporter.flush()
+
+    with open(output_directory / ("statuses" + extension), "w", newline="") as statuses_file:
+        reporter = make_reporter(args.output_format, statuses_file)
+        for at_time in args.status_times or [datetime.datetime(1, 1, 1, 23, 59)]:
+            reporter.statuses(wgups.package_statuses(at_time))
+        reporter.flush()
+
+    trucks = {}
+    for truck_id, (route, return_time) in sorted(routes.items()):
+        truck = wgups.trucks[truck_id - 1]
+        trucks[truck_id] = {"dispatch": truck.dispatch_time.strftime("%H:%M"), "return": return_time.strftime("%H:%M"),
+                            "miles": round(float(sum(entry[2] for entry in route)), 2),
+                            "packages": [entry[1] for entry in route if entry[1] not in (None, "back_to_hq")]}
+    packages = wgups.packages.get_all()
+    late = sorted(p.id for p in packages
+                  if p.deadline_at is not None and p.delivered_at is not None and p.delivered_at > p.deadline_at)
+    not_loaded = sorted(p.id for p in packages if p.truck is None)
+    summary = {"total_miles": round(sum(truck["miles"] for truck in trucks.values()), 2), "trucks": trucks,
+               "late": late, "at_risk": at_risk, "unassigned": unassigned, "not_loaded": not_loaded}
+    with open(output_directory / "summary.json", "w") as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    if args.snapshot:
+        wgups.save_plan(args.snapshot)
+    if args.profile:
+        instrumentation.write_report(output_directory / "profile.json")
+        instrumentation.dump_stats(output_directory / "profile.prof")
+    print("Total miles traveled: " + "{:.2f}".format(summary["total_miles"]) + ", " + str(len(late)) + " late, " +
+          str(len(not_loaded)) + " not loaded. Output in " + str(output_directory))
+    return summary
+
+
+# Plans the day and answers status queries over a socket until interrupted, see util.status_server. REPLAN runs
+# plan_day again with the same arguments. With --snapshot the saved plan is served instead, without planning.
+# Time Complexity: O(T * N^2) [planning], O(1) per status query
+# Space Complexity: O(N^2)
+def serve(args):
+    from util import status_server
+
+    if args.snapshot:
+        from util.plan_snapshot import load_plan
+
+        index = status_server.StoreStatusIndex(load_plan(args.snapshot).packages)
+        status_server.run(None, args.host, args.port, args.unix, index)
+    else:
+        status_server.run(lambda: plan_day(args)[0], args.host, args.port, args.unix)
+
+
+# The arguments of plan and serve that say which data to load and how to load and route the trucks.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def add_plan_arguments(parser: argparse.ArgumentParser):
+    from model.held_karp import DEFAULT_MAX_LOCATIONS, MAX_LOCATIONS
+
+    # the data paths default to the shipped files
+    data = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+    parser.add_argument("--distances", default=os.path.join(data, "distance.csv"), help="distance table csv")
+    parser.add_argument("--packages", default=os.path.join(data, "package.csv"), help="package csv")
+    parser.add_argument("--trucks", type=int, default=3)
+    parser.add_argument("--drivers", type=int, default=2, help="trucks that can be out at once")
+    parser.add_argument("--load", default="auto",
+                        help="'auto' to load from the package notes, 'partition' to also load one geographic cluster "
+                             "per truck, or a csv of truck,package[,priority] rows")
+    parser.add_argument("--start", type=parse_clock, default=datetime.datetime(1, 1, 1, 8), help="HH:MM")
+    parser.add_argument("--depart", type=parse_departure, action="append", default=[],
+                        help="TRUCK=HH:MM or TRUCK=after:ID, replacing the truck's scheduled departure")
+    parser.add_argument("--available", type=parse_availability, action="append", default=[],
+                        help="ID=HH:MM, a package that cannot leave the hub before then")
+    parser.add_argument("--improve", action="store_true", help="run local search on each route")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="route trucks in this many processes (0 routes them in this process)")
+    parser.add_argument("--candidates", type=int, default=0, help="route with k nearest candidate lists")
+    parser.add_argument("--exact-locations", type=int, default=DEFAULT_MAX_LOCATIONS,
+                        choices=range(MAX_LOCATIONS + 1), metavar="0-" + str(MAX_LOCATIONS),
+                        help="route stop sets of at most this many locations exactly, 0 to never")
+    parser.add_argument("--no-cache", action="store_true", help="do not keep generated routes for reuse")
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="WGUPS routing program")
+    parser.add_argument("--format", choices=FORMATS, default="console")
+    parser.add_argument("--quiet", action="store_true")
+    subcommands = parser.add_subparsers(dest="command")
+    subcommands.add_parser("interactive", help="the interactive menu (default)")
+
+    plan_parser = subcommands.add_parser("plan", help="plan routes headless and write them to files")
+    add_plan_arguments(plan_parser)
+    plan_parser.add_argument("--output-dir", default="output")
+    plan_parser.add_argument("--format", dest="output_format", choices=list(EXTENSIONS), default="csv")
+    plan_parser.add_argument("--status-times", type=parse_clock, nargs="*", default=[],
+                             help="HH:MM times to write every package status at, end of day by default")
+    plan_parser.add_argument("--profile", action="store_true", help="write profile.json and profile.prof")
+    plan_parser.add_argument("--snapshot", help="also save the plan to this file, see util.plan_snapshot")
+
+    serve_parser = subcommands.add_parser("serve", help="plan routes and answer status queries over a socket")
+    add_plan_arguments(serve_parser)
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8421)
+    serve_parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    serve_parser.add_argument("--snapshot", help="serve a plan saved by plan --snapshot instead of planning")
+    return parser
+
+
+# Time Complexity: O(1) [plus the command]
+# Space Complexity: O(1)
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command in ("plan", "serve"):
+        try:
+            plan(args) if args.command == "plan" else serve(args)
+        except (OSError, ValueError) as error:
+            sys.exit(args.command + ": " + str(error))
+    else:
+        interactive(args)
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+import datetime
+import re
+from typing import Optional
+
+import numpy
+
+from model.clock import MICROSECONDS_PER_MINUTE
+from model.package import Package, PackagePriority
+from model.truck import Truck
+
+"""
+Automatic truck loading. The special notes of the package csv are parsed into constraints, packages that must travel
+together or share an address and release time are grouped, and each group is placed greedily on the truck that
+already stops closest to it, subject to truck capacity, pinned trucks and an estimate of whether the truck can still
+make the group's deadline. Every decision is a vectorized pass over the trucks, so loading is O(G * T) for G groups
+and T trucks.
+
+Trucks 1..drivers form the first wave and leave at the start of the day, or later if they carry delayed packages.
+Every later truck leaves when an earlier truck returns, so its driver is free.
+"""
+
+PINNED_TRUCK = re.compile(r"can only be on truck (\d+)", re.IGNORECASE)
+DELAYED_UNTIL = re.compile(r"delayed.*until (\d{1,2}:\d{2}\s*[ap]\.?m\.?)", re.IGNORECASE)
+DELIVERED_WITH = re.compile(r"must be delivered with ([\d,\s]+)", re.IGNORECASE)
+WRONG_ADDRESS = re.compile(r"wrong address", re.IGNORECASE)
+
+
+# Constraints parsed from a package's notes.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class PackageConstraints:
+    __slots__ = ("truck_id", "available_time", "delivered_with", "address_pending")
+
+    def __init__(self, truck_id=None, available_time=None, delivered_with=(), address_pending=False):
+        self.truck_id: Optional[int] = truck_id
+        self.available_time: Optional[datetime.datetime] = available_time
+        self.delivered_with: tuple[int, ...] = tuple(delivered_with)
+        self.address_pending = address_pending
+
+
+# Time Complexity: O(1) [length of the notes]
+# Space Complexity: O(1)
+def parse_notes(notes: str) -> PackageConstraints:
+    constraints = PackageConstraints()
+    if not notes:
+        return constraints
+    match = PINNED_TRUCK.search(notes)
+    if match:
+        constraints.truck_id = int(match.group(1))
+    match = DELAYED_UNTIL.search(notes)
+    if match:
+        parsed = datetime.datetime.strptime(match.group(1).replace(".", "").replace(" ", "").upper(), "%I:%M%p")
+        constraints.available_time = datetime.datetime(1, 1, 1, parsed.hour, parsed.minute)
+    match = DELIVERED_WITH.search(notes)
+    if match:
+        constraints.delivered_with = tuple(int(i) for i in re.findall(r"\d+", match.group(1)))
+    constraints.address_pending = WRONG_ADDRESS.search(notes) is not None
+    return constraints
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def minutes_of(time_: Optional[datetime.datetime], default=numpy.inf):
+    return default if time_ is None else time_.hour * 60 + time_.minute + time_.second / 60
+
+
+# minutes_of for a time on the clock of model.clock, such as a package's deadline_at or available_at.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def clock_minutes_of(clock: Optional[int], default=numpy.inf):
+    return default if clock is None else clock / MICROSECONDS_PER_MINUTE
+
+
+# Result of assign_packages. loads maps a truck id to (package id, priority) pairs in loading order, schedule is a
+# list of (truck_id, start) in the form generate_routes takes, at_risk lists deadline packages placed on a truck
+# that is not expected to make the deadline, or on a later wave whose departure is not known yet, and unassigned the
+# packages no truck had room for.
+# Time Complexity: O(1)
+# Space Complexity: O(N)
+class LoadPlan:
+    def __init__(self, loads, schedule, at_risk, unassigned):
+        self.loads: dict[int, list[tuple[int, PackagePriority]]] = loads
+        self.schedule: list[tuple] = schedule
+        self.at_risk: list[int] = at_risk
+        self.unassigned: list[int] = unassigned
+
+
+# Time Complexity: O(α(N))
+# Space Complexity: O(1)
+def find(parents: dict, key):
+    root = key
+    while parents[root] != root:
+        root = parents[root]
+    while parents[key] != root:
+        parents[key], key = root, parents[key]
+    return root
+
+
+# Groups packages that must be delivered together, then adds packages at the same location released at the same time
+# to those groups as long as the group still fits on a truck and both are pinned to the same truck or neither is, so
+# pinned trucks are not filled with packages that could go anywhere. Held packages, waiting on an address correction,
+# only merge with other held ones, so a package at the listed wrong address is not held back with them. Returns lists
+# of packages, each in manifest order.
+# Time Complexity: O(N α(N))
+# Space Complexity: O(N)
+def group_packages(packages: list[Package], constraints: dict[int, PackageConstraints], release: dict[int, float],
+                   held: set[int], capacity=Truck.MAXIMUM_PACKAGES):
+    parents = {p.id: p.id for p in packages}
+    for package in packages:
+        for other in constraints[package.id].delivered_with:
+            if other in parents:
+                parents[find(parents, other)] = find(parents, package.id)
+
+    sizes: dict[int, int] = {}
+    pins: dict[int, set] = {}
+    for package in packages:
+        root = find(parents, package.id)
+        sizes[root] = sizes.get(root, 0) + 1
+        pins.setdefault(root, set()).update({constraints[package.id].truck_id} - {None})
+
+    same_stop = {}
+    for package in packages:
+        key = (package.location_id, release[package.id], package.id in held)
+        root = find(parents, package.id)
+        other = find(parents, same_stop[key]) if key in same_stop else None
+        if other is None or other == root:
+            same_stop[key] = package.id
+        elif sizes[root] + sizes[other] <= capacity and pins[root] == pins[other]:
+            parents[root] = other
+            sizes[other] += sizes.pop(root)
+            pins[other] |= pins.pop(root)
+        else:
+            same_stop[key] = package.id  # later packages at this stop join this package's group instead
+
+    groups: dict[int, list[Package]] = {}
+    for package in packages:
+        groups.setdefault(find(parents, package.id), []).append(package)
+    return list(groups.values())
+
+
+# Splits a group back into the parts that must be delivered together, undoing the same-stop merges.
+# Time Complexity: O(N α(N)) [N packages in the group]
+# Space Complexity: O(N)
+def split_group(group: list[Package], constraints: dict[int, PackageConstraints]):
+    parents = {p.id: p.id for p in group}
+    for package in group:
+        for other in constraints[package.id].delivered_with:
+            if other in parents:
+                parents[find(parents, other)] = find(parents, package.id)
+    parts: dict[int, list[Package]] = {}
+    for package in group:
+        parts.setdefault(find(parents, package.id), []).append(package)
+    return list(parts.values())
+
+
+# Typical leg between two stops: the mean distance from each package location to its neighbour-th nearest other
+# one, over a sample of at most `sample` locations. A nearest neighbor route seldom finds the very nearest stop still
+# unvisited; the third nearest matches the legs of the routes on the shipped data.
+# Time Complexity: O(S^2)
+# Space Complexity: O(S^2)
+def typical_leg(distances: numpy.ndarray, location_ids, neighbour=3, sample=500):
+    location_ids = numpy.unique(numpy.asarray(location_ids, dtype=numpy.intp))[:sample]
+    if len(location_ids) < 2:
+        return 0.0
+    block = distances[numpy.ix_(location_ids, location_ids)]
+    # column 0 of each sorted row is the location itself
+    nearest = numpy.sort(block, axis=1)[:, min(neighbour, len(location_ids) - 1)]
+    return float(nearest[numpy.isfinite(nearest)].mean())
+
+
+# Assigns packages to trucks. Deadlines are checked with an estimate of the arrival time: the departure, the direct
+# drive from the hub and one typical leg per stop on the truck, since the route is ordered by distance rather than by
+# deadline. A group only joins a truck if every deadline already on it stays reachable, so a truck whose departure is
+# pushed back by delayed packages, or that is already busy, stops taking more work.
+# Time Complexity: O(G * T) [G groups, T trucks, vectorized over the trucks]
+# Space Complexity: O(N + T * C) [C truck capacity]
+def assign_packages(packages: list[Package], truck_count, distances: numpy.ndarray, hub_location_id,
+                    start_time: datetime.datetime, drivers=2, capacity=Truck.MAXIMUM_PACKAGES):
+    drivers = max(1, min(drivers, truck_count))
+    start = minutes_of(start_time)
+    constraints, release, held = prepare_packages(packages, start)
+
+    groups = group_packages(packages, constraints, release, held, capacity)
+
+    deadlines = [p.deadline_at for p in packages if p.deadline_at is not None]
+    earliest_deadline = min(deadlines) if deadlines else None
+
+    first_wave = numpy.arange(truck_count) < drivers
+    departure = numpy.where(first_wave, start, numpy.inf)  # later waves leave at an unknown, later time
+    latest_departure = numpy.full(truck_count, numpy.inf)  # keeps every deadline on the truck reachable
+    load = numpy.zeros(truck_count, dtype=numpy.int64)
+    stops = numpy.full((truck_count, capacity), hub_location_id, dtype=numpy.intp)
+    stop_count = numpy.zeros(truck_count, dtype=numpy.int64)
+    minutes_per_mile = 60 / Truck.MILES_PER_HOUR
+    leg = typical_leg(distances, [p.location_id for p in packages]) * minutes_per_mile
+
+    # pinned groups first, then by deadline, then larger groups first so they are packed while room is left
+    def order(group):
+        pinned = any(constraints[p.id].truck_id is not None for p in group)
+        deadline = min(clock_minutes_of(p.deadline_at) for p in group)
+        return not pinned, deadline, -len(group), group[0].id
+
+    loads = {truck_id: [] for truck_id in range(1, truck_count + 1)}
+    at_risk = []
+    unassigned = []
+    pending = sorted(groups, key=order, reverse=True)  # a stack, next group last
+    while pending:
+        group = pending.pop()
+        location_id = group[0].location_id
+        group_release = max(release[p.id] for p in group)
+        group_deadline = min(clock_minutes_of(p.deadline_at) for p in group)
+        drive = distances[hub_location_id, location_id] * minutes_per_mile
+        pinned = {constraints[p.id].truck_id for p in group} - {None}
+
+        feasible = load + len(group) <= capacity
+        if len(pinned) > 1 or any(truck_id > truck_count for truck_id in pinned):
+            feasible[:] = False
+        elif pinned:
+            feasible &= numpy.arange(1, truck_count + 1) == pinned.pop()
+        if held & {p.id for p in group} and not first_wave.all():
+            feasible &= ~first_wave
+        if not feasible.any():
+            parts = split_group(group, constraints) if len(group) > 1 else [group]
+            if len(parts) > 1:
+                pending += sorted(parts, key=order, reverse=True)
+            else:
+                unassigned += [p.id for p in group]
+            continue
+
+        new_departure = numpy.maximum(departure, group_release)
+        arrival = new_departure + drive + stop_count * leg
+        on_time = (new_departure + (stop_count + 1) * leg <= latest_departure) & (arrival <= group_deadline)
+        if numpy.isinf(group_deadline):
+            on_time |= ~first_wave & numpy.isinf(latest_departure)
+        candidates = feasible & on_time
+        if not candidates.any():
+            candidates = feasible
+            at_risk += [p.id for p in group if p.deadline_at is not None]
+
+        # closest stop already on each truck, plus a penalty per minute of pushed back departure
+        cost = distances[location_id][stops].min(axis=1)
+        delay = numpy.where(first_wave, new_departure - numpy.where(first_wave, departure, 0), 0)
+        cost = cost + delay / minutes_per_mile
+        truck = int(numpy.argmin(numpy.where(candidates, cost, numpy.inf)))
+
+        stops[truck, load[truck]:load[truck] + len(group)] = location_id
+        load[truck] += len(group)
+        if first_wave[truck]:
+            departure[truck] = new_departure[truck]
+        if not numpy.isinf(group_deadline):
+            latest_departure[truck] = min(latest_departure[truck], group_deadline - drive)
+        stop_count[truck] += 1
+        loads[truck + 1] += [(package.id, package_priority(package, earliest_deadline)) for package in group]
+
+    return LoadPlan({t: l for t, l in loads.items() if l}, wave_schedule(first_wave, departure, load, start_time),
+                    at_risk, unassigned)
+
+
+# Parses the notes of every package and sets the available time of delayed packages. Returns the constraints, the
+# minute after midnight each package can leave the hub, and the packages waiting on an address correction without a
+# known time, which are held for the later waves.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def prepare_packages(packages: list[Package], start):
+    constraints = {p.id: parse_notes(p.notes) for p in packages}
+    for package in packages:
+        if package.available_time is None and constraints[package.id].available_time is not None:
+            package.available_time = constraints[package.id].available_time
+    release = {p.id: max(start, clock_minutes_of(p.available_at, start)) for p in packages}
+    held = {p.id for p in packages if constraints[p.id].address_pending and p.available_at is None}
+    return constraints, release, held
+
+
+# The earliest deadline of the day is HIGH priority, other deadlines MEDIUM and end of day LOW.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def package_priority(package: Package, earliest_deadline) -> PackagePriority:
+    if package.deadline_at is None:
+        return PackagePriority.LOW
+    if package.deadline_at == earliest_deadline:
+        return PackagePriority.HIGH
+    return PackagePriority.MEDIUM
+
+
+# First wave trucks leave at their departure, in minutes after midnight; the drivers then take the later trucks in
+# order, the driver who left first taking the next truck. Returns the schedule in the form generate_routes takes.
+# Time Complexity: O(T log T)
+# Space Complexity: O(T)
+def wave_schedule(first_wave: numpy.ndarray, departure: numpy.ndarray, load: numpy.ndarray,
+                  start_time: datetime.datetime) -> list[tuple]:
+    schedule = []
+    drivers_queue = []
+    for truck in sorted(numpy.flatnonzero(first_wave & (load > 0)), key=lambda t: (departure[t], t)):
+        seconds = int(round(departure[truck] * 60))
+        schedule.append((int(truck) + 1, datetime.datetime(1, 1, 1, seconds // 3600, seconds // 60 % 60,
+                                                           seconds % 60)))
+        drivers_queue.append(int(truck) + 1)
+    for truck in numpy.flatnonzero(~first_wave & (load > 0)):
+        schedule.append((int(truck) + 1, drivers_queue.pop(0) if drivers_queue else start_time))
+        drivers_queue.append(int(truck) + 1)
+    schedule.sort()
+    return schedule
@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import Optional
 
+from util import instrumentation
+
 """
 Chaining Hash Table implementation with Linked List and Node classes for buckets and key/value objects.
 """
@@ -119,10 +121,24 @@ class ChainingHashTable:
     # Space Complexity: O(1)
     def lookup_(self, key):
         bucket = self.hash_table[self.hash_(key)]
+        if instrumentation.enabled:
+            instrumentation.count("ChainingHashTable.lookup_ calls")
+            instrumentation.count("ChainingHashTable.lookup_ chain nodes", self.chain_length(bucket, key))
         for node in bucket:
             if node is not None and node.key == key:
                 return node.value
 
+    # Nodes a lookup of key walks in the bucket, for instrumentation.
+    # Time Complexity: O(N)
+    # Space Complexity: O(1)
+    def chain_length(self, bucket: LinkedList, key):
+        length = 0
+        for node in bucket:
+            length += 1
+            if node.key == key:
+                break
+        return length
+
     def get_all(self) -> list:
         all_objects = []
         for bucket in self.hash_table:
@@ -0,0 +1,60 @@
+import datetime
+from typing import Optional
+
+import numpy
+
+"""
+The program's clock. A time of the day is an integer count of microseconds since midnight, kept in plain ints on the
+packages and trucks and in int64 arrays for routing and status queries, so the routing loop adds and compares
+integers instead of allocating datetime and timedelta objects. Microseconds keep every time exactly as the datetime
+arithmetic it replaces computed it. datetime only appears where times are read in or shown, through to_clock and
+to_datetime.
+"""
+
+DAY = datetime.datetime(1, 1, 1)  # midnight of the day every datetime of the program falls on
+MICROSECOND = datetime.timedelta(microseconds=1)
+MICROSECONDS_PER_MINUTE = 60 * 1000000
+NOT_SET = -1  # an unset time in an int64 column: not routed yet, or no availability constraint
+NO_DEADLINE = numpy.iinfo(numpy.int64).max  # deadline of a package due at the end of the day
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def to_clock(time_: Optional[datetime.datetime]) -> Optional[int]:
+    return None if time_ is None else (time_ - DAY) // MICROSECOND
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def to_datetime(clock: Optional[int]) -> Optional[datetime.datetime]:
+    return None if clock is None else DAY + datetime.timedelta(microseconds=int(clock))
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def clock_of(hours, minutes=0) -> int:
+    return (hours * 60 + minutes) * MICROSECONDS_PER_MINUTE
+
+
+# HH:MM of a clock time, as strftime("%H:%M") shows the datetime.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def format_clock(clock: int) -> str:
+    hours, minutes = divmod(clock // MICROSECONDS_PER_MINUTE, 60)
+    return "{:02d}:{:02d}".format(hours % 24, minutes)
+
+
+# Packs optional clock times into an int64 array, with missing in place of None.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def clock_array(clocks, missing=NOT_SET) -> numpy.ndarray:
+    return numpy.array([missing if clock is None else clock for clock in clocks], dtype=numpy.int64)
+
+
+# HH:MM of every time in an int64 array.
+# Time Complexity: O(N) [vectorized]
+# Space Complexity: O(N)
+def format_clocks(clocks: numpy.ndarray) -> list[str]:
+    hours, minutes = numpy.divmod(clocks // MICROSECONDS_PER_MINUTE, 60)
+    return numpy.char.add(numpy.char.add(numpy.char.zfill((hours % 24).astype(str), 2), ":"),
+                          numpy.char.zfill(minutes.astype(str), 2)).tolist()
@@ -0,0 +1,43 @@
+import datetime
+from typing import Optional
+
+from model.package import Package, PackagePriority
+
+"""
+Events that change the packages of a truck after it has left the hub. WGUPS.apply_event updates the package and
+re-plans only the remaining stops of the affected truck, from where the truck is at the time of the event.
+"""
+
+
+# A package handed to a truck during the day, deliverable from the time of the event.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class NewPackage:
+    def __init__(self, time_: datetime.datetime, package: Package, truck_id,
+                 priority: PackagePriority = PackagePriority.LOW):
+        self.time = time_
+        self.package = package
+        self.truck_id = truck_id
+        self.priority = priority
+
+
+# A corrected delivery address, known from the time of the event.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class AddressChange:
+    def __init__(self, time_: datetime.datetime, package_id, address, city=None, zip_=None):
+        self.time = time_
+        self.package_id = package_id
+        self.address = address
+        self.city = city
+        self.zip = zip_
+
+
+# A package that cannot be delivered before available_time, or again without a constraint when it is None.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class Delay:
+    def __init__(self, time_: datetime.datetime, package_id, available_time: Optional[datetime.datetime]):
+        self.time = time_
+        self.package_id = package_id
+        self.available_time = available_time
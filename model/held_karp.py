@@ -0,0 +1,115 @@
+import functools
+from collections import OrderedDict
+from typing import Optional
+
+import numpy
+
+from util import instrumentation
+
+"""
+Exact shortest visiting order of a small set of locations by Held-Karp dynamic programming. The DP tables are arrays
+indexed by (visited subset bitmask, last location), filled one subset size at a time with a vectorized pass per last
+location, so a solve is O(2^n * n^2) arithmetic in O(n^2) numpy calls. Solved (start, locations, end) sets are kept
+in an LRU memo, so the same stop set on another truck or in a re-plan is not solved again.
+"""
+
+DEFAULT_MAX_LOCATIONS = 13  # about 4 ms per new set; 15 takes about 20 ms
+MAX_LOCATIONS = 20  # the DP tables of 20 locations take 160 MB; parent indices must also fit in int8
+
+
+# Bitmasks of n bits with each bit set, grouped by the number of bits set: layers[size][j] holds the masks of that
+# size that contain location j.
+# Time Complexity: O(2^n * n)
+# Space Complexity: O(2^n * n)
+@functools.lru_cache(maxsize=None)
+def mask_layers(n) -> list[list[numpy.ndarray]]:
+    masks = numpy.arange(1 << n, dtype=numpy.int64)
+    sizes = numpy.zeros(1 << n, dtype=numpy.int64)
+    for j in range(n):
+        sizes += (masks >> j) & 1
+    return [[masks[(sizes == size) & (((masks >> j) & 1) == 1)] for j in range(n)] for size in range(n + 1)]
+
+
+# Shortest path from start through every location, ending at end if given and anywhere otherwise. Returns the indices
+# into locations in visiting order and the length of the path. locations must be distinct and not contain start.
+# Time Complexity: O(2^n * n^2)
+# Space Complexity: O(2^n * n)
+def held_karp(distances: numpy.ndarray, start, locations: numpy.ndarray, end=None) -> tuple[list[int], float]:
+    n = len(locations)
+    if n == 0:
+        return [], float(distances[start, end]) if end is not None else 0.0
+    between = distances[numpy.ix_(locations, locations)].astype(numpy.float64)
+    cost = numpy.full((1 << n, n), numpy.inf)
+    parent = numpy.full((1 << n, n), -1, dtype=numpy.int8)
+    single = 1 << numpy.arange(n)
+    cost[single, numpy.arange(n)] = distances[start, locations]
+
+    layers = mask_layers(n)
+    for size in range(2, n + 1):
+        for j in range(n):
+            masks = layers[size][j]
+            # cost of reaching j last: the best path over the rest of the mask, ending anywhere, plus the leg to j
+            options = cost[masks ^ (1 << j)] + between[:, j]
+            best = options.argmin(axis=1)
+            cost[masks, j] = options[numpy.arange(len(masks)), best]
+            parent[masks, j] = best
+
+    full = (1 << n) - 1
+    final = cost[full] + (distances[locations, end] if end is not None else 0)
+    last = int(final.argmin())
+    length = float(final[last])
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(last)
+        last, mask = int(parent[mask, last]), mask ^ (1 << last)
+    order.reverse()
+    return order, length
+
+
+# Held-Karp over one distance matrix with a memo of solved location sets. Raises ValueError unless max_locations is
+# between 0 and MAX_LOCATIONS.
+# Time Complexity: O(2^n * n^2) per new location set, O(1) per memoized one
+# Space Complexity: O(M * n) [M memoized sets]
+class ExactSolver:
+    def __init__(self, distances: numpy.ndarray, max_locations=DEFAULT_MAX_LOCATIONS, cache_size=4096):
+        if not 0 <= max_locations <= MAX_LOCATIONS:
+            raise ValueError("max_locations must be between 0 and " + str(MAX_LOCATIONS) + ", got " +
+                             str(max_locations))
+        self.distances = distances
+        self.max_locations = max_locations
+        self.cache_size = cache_size
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    # Visiting order of the distinct locations, as location ids, for a path from start ending at end if given.
+    # Returns None for more than max_locations locations.
+    # Time Complexity: O(2^n * n^2), O(n log n) when memoized
+    # Space Complexity: O(2^n * n)
+    def solve(self, start, locations, end=None) -> Optional[tuple]:
+        key = (start, tuple(sorted(locations)), end)
+        if len(key[1]) > self.max_locations:
+            return None
+        order = self.cache.get(key)
+        if order is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            instrumentation.count("held_karp memo hits")
+            return order
+        self.misses += 1
+        instrumentation.count("held_karp solves")
+        location_ids = numpy.array(key[1], dtype=numpy.intp)
+        indices, _ = held_karp(self.distances, start, location_ids, end)
+        order = tuple(int(location_ids[i]) for i in indices)
+        if self.cache_size > 0:
+            self.cache[key] = order
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return order
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def info(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache),
+                "max_locations": self.max_locations}
@@ -0,0 +1,250 @@
+import time
+
+import numpy
+
+from model.clock import MICROSECONDS_PER_MINUTE
+from model.package import Package
+from model.routing import travel_time
+from model.truck import Truck
+
+"""
+Local search applied to a generated route. Each priority segment is improved in place with 2-opt (reverse a run of
+stops) and Or-opt (move a run of one to three stops) while the stops around the segment stay fixed, so the order of the
+priority segments is kept. Moves are scored with an O(1) distance delta; only improving moves pay for the O(N) check
+that every package still meets its deadline and is not delivered before its available time.
+"""
+
+IMPROVEMENT_EPSILON = 1e-9
+OR_OPT_MAX_LENGTH = 3
+
+
+# Summary of one improvement pass.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class ImprovementResult:
+    def __init__(self, miles_before, miles_after, iterations, moves, seconds):
+        self.miles_before = miles_before
+        self.miles_after = miles_after
+        self.iterations = iterations
+        self.moves = moves
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "ImprovementResult(miles_before={:.2f}, miles_after={:.2f}, iterations={}, moves={})".format(
+            self.miles_before, self.miles_after, self.iterations, self.moves)
+
+
+# A stop is a location visited once, carrying every package delivered there on that visit. Consecutive route
+# entries to the same location form one stop. Placeholder entries of empty segments produce no stops.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+def route_to_stops(route: list[tuple]) -> list[tuple[int, list[int]]]:
+    stops = []
+    for location_id, package_id, _ in route:
+        if package_id is None:
+            continue
+        if stops and stops[-1][0] == location_id:
+            stops[-1][1].append(package_id)
+        else:
+            stops.append((location_id, [package_id]))
+    return stops
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(1)
+def stops_miles(distances: numpy.ndarray, start_location_id, stops: list[tuple[int, list[int]]], end_location_id):
+    miles = 0
+    previous = start_location_id
+    for location_id, _ in stops:
+        miles += distances[previous, location_id]
+        previous = location_id
+    return miles + distances[previous, end_location_id]
+
+
+# Tracks delivery times for a whole route of stops in minutes after the start time. Waiting follows nearest neighbor:
+# the truck does not leave for a stop until one of its packages is available, and once there waits for the rest.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+class TimeWindows:
+    def __init__(self, packages: dict[int, Package], start_location_id, start_time: int):
+        self.start_location_id = start_location_id
+        self.start_time = start_time
+        self.available = {}
+        self.deadline = {}
+        for package_id, package in packages.items():
+            if package.available_at is not None:
+                self.available[package_id] = (package.available_at - start_time) / MICROSECONDS_PER_MINUTE
+            if package.deadline_at is not None:
+                self.deadline[package_id] = (package.deadline_at - start_time) / MICROSECONDS_PER_MINUTE
+        self.already_late: set[int] = set()
+
+    # Returns the ids of the packages delivered after their deadline.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def late_packages(self, distances: numpy.ndarray, stops: list[tuple[int, list[int]]]):
+        late = set()
+        minutes = 0
+        previous = self.start_location_id
+        for location_id, package_ids in stops:
+            minutes = max(minutes, min(self.available.get(package_id, minutes) for package_id in package_ids))
+            minutes += distances[previous, location_id] / Truck.MILES_PER_HOUR * 60
+            previous = location_id
+            for package_id in package_ids:
+                minutes = max(minutes, self.available.get(package_id, minutes))
+                if minutes > self.deadline.get(package_id, numpy.inf) + IMPROVEMENT_EPSILON:
+                    late.add(package_id)
+        return late
+
+    # A move is accepted if it does not make any package late that was on time before it.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def feasible(self, distances: numpy.ndarray, stops: list[tuple[int, list[int]]]):
+        return self.late_packages(distances, stops) <= self.already_late
+
+
+# Improves one segment (stops[first:last]) in place. The stop before the segment and the stop after it are fixed.
+# With candidate lists (see nearest_candidates) only moves that create an edge from a stop to one of its candidates
+# are evaluated: 2-opt reversals whose new first edge joins a candidate pair, and Or-opt insertions next to a
+# candidate of the moved block. This is the approximate mode; without candidate lists every move is evaluated.
+# Time Complexity: O(N^2) per sweep [O(N * K) with candidate lists], bounded by max_iterations and the deadline
+# Space Complexity: O(N)
+def improve_segment(distances: numpy.ndarray, stops: list, first, last, windows: TimeWindows,
+                    stop_at: float, max_iterations, candidates: numpy.ndarray = None):
+    iterations = 0
+    moves = 0
+
+    def location(index):
+        if index < 0:
+            return windows.start_location_id
+        if index >= len(stops):
+            return windows.start_location_id  # the truck returns to the hub after the last stop
+        return stops[index][0]
+
+    # positions between low and high (inclusive) holding a candidate of the location at index
+    def near(index, low, high, positions):
+        if candidates is None:
+            return range(low, high + 1)
+        found = []
+        for location_id in candidates[location(index)].tolist():
+            found += [k for k in positions.get(location_id, ()) if low <= k <= high]
+        return sorted(found)
+
+    improved = True
+    while improved:
+        improved = False
+        positions: dict[int, list[int]] = {}
+        if candidates is not None:
+            for index in range(first - 1, last):
+                positions.setdefault(location(index), []).append(index)
+
+        # 2-opt: reverse stops[i..j]
+        for i in range(first, last):
+            for j in near(i - 1, i + 1, last - 1, positions):
+                iterations += 1
+                if iterations > max_iterations or (iterations & 255 == 0 and time.perf_counter() > stop_at):
+                    return iterations - 1, moves
+                a, b, c, d = location(i - 1), location(i), location(j), location(j + 1)
+                delta = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+                if delta < -IMPROVEMENT_EPSILON:
+                    candidate = stops[:i] + stops[i:j + 1][::-1] + stops[j + 1:]
+                    if windows.feasible(distances, candidate):
+                        stops[:] = candidate
+                        moves += 1
+                        improved = True
+                        break
+            if improved:
+                break
+        if improved:
+            continue
+
+        # Or-opt: move stops[i..i + length - 1] to sit between stops[k] and stops[k + 1]
+        for length in range(1, OR_OPT_MAX_LENGTH + 1):
+            for i in range(first, last - length + 1):
+                j = i + length - 1
+                a, b, c, d = location(i - 1), location(i), location(j), location(j + 1)
+                removed = distances[a, d] - distances[a, b] - distances[c, d]
+                for k in near(i, first - 1, last - 1, positions):
+                    if i - 1 <= k <= j:
+                        continue
+                    iterations += 1
+                    if iterations > max_iterations or (iterations & 255 == 0 and time.perf_counter() > stop_at):
+                        return iterations - 1, moves
+                    e, f = location(k), location(k + 1)
+                    delta = removed + distances[e, b] + distances[c, f] - distances[e, f]
+                    if delta < -IMPROVEMENT_EPSILON:
+                        block = stops[i:j + 1]
+                        rest = stops[:i] + stops[j + 1:]
+                        insert_at = k + 1 if k < i else k + 1 - length
+                        candidate = rest[:insert_at] + block + rest[insert_at:]
+                        if windows.feasible(distances, candidate):
+                            stops[:] = candidate
+                            moves += 1
+                            improved = True
+                            break
+                if improved:
+                    break
+            if improved:
+                break
+
+    return iterations, moves
+
+
+# Runs the local search over the priority segments of a route produced by generate_route (before the return to the
+# hub is appended). Returns the rebuilt segments, the time the last package is delivered, and an ImprovementResult.
+# Delivery times are written back to the packages.
+# Time Complexity: O(I * N) [I improving moves, each checked in O(N)], bounded by time_budget and max_iterations
+# Space Complexity: O(N)
+def improve_route(distances: numpy.ndarray, segments: list[list[tuple]], packages: dict[int, Package],
+                  start_location_id, start_time: int, time_budget: float, max_iterations,
+                  candidates: numpy.ndarray = None):
+    started = time.perf_counter()
+    windows = TimeWindows(packages, start_location_id, start_time)
+
+    stops = []
+    bounds = []
+    for segment in segments:
+        segment_stops = route_to_stops(segment)
+        bounds.append((len(stops), len(stops) + len(segment_stops)))
+        stops.extend(segment_stops)
+
+    miles_before = stops_miles(distances, start_location_id, stops, start_location_id)
+    windows.already_late = windows.late_packages(distances, stops)
+
+    iterations = 0
+    moves = 0
+    for first, last in bounds:
+        if last - first < 2:
+            continue
+        segment_iterations, segment_moves = improve_segment(distances, stops, first, last, windows,
+                                                            started + time_budget, max_iterations - iterations,
+                                                            candidates)
+        iterations += segment_iterations
+        moves += segment_moves
+
+    # rebuild the route entries on the clock of the routing engine so unchanged routes keep identical delivery times
+    improved_segments = []
+    current_location_id = start_location_id
+    current_time = start_time
+    for (first, last), segment in zip(bounds, segments):
+        if first == last:
+            improved_segments.append([(current_location_id, None, 0)])
+            continue
+        route = []
+        for location_id, package_ids in stops[first:last]:
+            available_times = [packages[i].available_at for i in package_ids]
+            if None not in available_times:
+                current_time = max(current_time, min(available_times))
+            distance = distances[current_location_id, location_id]
+            current_time = current_time + travel_time(distance)
+            current_location_id = location_id
+            for package_id, available_time in zip(package_ids, available_times):
+                if available_time is not None and available_time > current_time:
+                    current_time = available_time
+                packages[package_id].delivered_at = current_time
+                route.append((location_id, package_id, distance))
+                distance = 0
+        improved_segments.append(route)
+
+    miles_after = stops_miles(distances, start_location_id, stops, start_location_id)
+    result = ImprovementResult(miles_before, miles_after, iterations, moves, time.perf_counter() - started)
+    return improved_segments, current_time, result
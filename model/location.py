@@ -1,20 +1,35 @@
-# Time Complexity: O(N)
-# Space Complexity: O(N) [a list of locations will have a space complexity of N^2]
+import numpy
+
+# Distances are held in one dense, symmetric matrix indexed by location id rather than per-location lists, so memory
+# is a single predictable block (N * N * 8 bytes) and a whole row can be read as one vector.
+DISTANCE_DTYPE = numpy.float64
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1) [distances live in the shared distance matrix]
 class Location:
+    __slots__ = ("id", "name", "address", "zip", "time")
+
     # Time Complexity: O(1)
-    # Space Complexity: O(N)
-    def __init__(self, id_, name, address, zip_, distances):
+    # Space Complexity: O(1)
+    def __init__(self, id_, name, address, zip_):
         self.id = int(id_)
         self.name = name
         self.address = address
         self.zip = zip_
-        self.distances = distances
         self.time = None
 
     def __getitem__(self, item):
         return self
 
 
+# Collapses whitespace and case so "300 State St" and " 300  state st" resolve to the same location.
+# Time Complexity: O(1) [length of the address]
+# Space Complexity: O(1)
+def normalize_address(address: str):
+    return " ".join(address.split()).casefold()
+
+
 # Time Complexity: O(N)
 # Space Complexity: O(1)
 def get_location(locations: list[Location], id_: int):
@@ -23,11 +38,34 @@ def get_location(locations: list[Location], id_: int):
             return p
 
 
-# Time Complexity: O(1) [max() is an O(N) function but in this case N is always two]
+# Time Complexity: O(1)
 # Space Complexity: O(1)
-def get_distance(locations: list[Location], id1, id2):
-    """ Gets the distance between two locations. The function depends on the structure of the csv file; Each
-    location's id is equal to its index, and each location contains a list of distances all lower-indexed locations.
-    Therefore, the higher of the two location id's is chosen for the first index and the lower location id is the
-    index in the higher location index's list of distances. """
-    return locations[max(id1, id2)].distances[min(id1, id2)]
+def get_distance(distances: numpy.ndarray, id1, id2):
+    """ Gets the distance between two locations. Each location's id is equal to its row (and column) in the distance
+    matrix, and the matrix is symmetric, so the order of the two ids does not matter. """
+    return distances[id1, id2]
+
+
+# Top-k candidate lists: row i holds the ids of the k locations closest to location i, nearest first, the location
+# itself excluded and ties in id order. Rows are processed in blocks so only a block of the matrix is sorted at once.
+# Time Complexity: O(N^2) [one partial sort per row]
+# Space Complexity: O(N * k)
+def nearest_candidates(distances: numpy.ndarray, k=16, block=1024) -> numpy.ndarray:
+    count = len(distances)
+    k = max(0, min(k, count - 1))
+    candidates = numpy.empty((count, k), dtype=numpy.int32)
+    if k == 0:
+        return candidates
+    for first in range(0, count, block):
+        rows = numpy.array(distances[first:first + block], dtype=DISTANCE_DTYPE)
+        own = numpy.arange(first, first + len(rows))
+        rows[numpy.arange(len(rows)), own] = numpy.inf
+        # a partial sort finds the k smallest in O(N), only those are then sorted; ties at the k-th distance are
+        # resolved by id because the sort is stable and argpartition is only used to bound the sort
+        nearest = numpy.argpartition(rows, k - 1, axis=1)[:, :k]
+        bound = numpy.take_along_axis(rows, nearest, axis=1).max(axis=1, keepdims=True)
+        for i, row in enumerate(rows):
+            ids = numpy.flatnonzero(row <= bound[i])
+            ids = ids[numpy.argsort(row[ids], kind="stable")][:k]
+            candidates[first + i] = ids
+    return candidates
@@ -0,0 +1,159 @@
+from util import instrumentation
+
+"""
+Open addressing hash table with linear probing. Keys and values live in two flat lists instead of a Node per entry,
+the table doubles whenever the filled slots pass MAX_LOAD_FACTOR, and the number of entries is kept in a counter.
+Exposes the same insert_/lookup_/delete_/get_all API as ChainingHashTable, but insert_ replaces the value of an
+existing key instead of adding a duplicate.
+"""
+
+# Slot markers. A deleted slot keeps probe chains through it intact until the next resize.
+EMPTY = object()
+DELETED = object()
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+# Lookup Time Complexity: O(1) expected, as the load factor is bounded
+class OpenAddressingHashTable:
+    MAX_LOAD_FACTOR = 0.7
+    MINIMUM_CAPACITY = 8
+
+    # size is the number of entries expected; the table still grows past it as needed.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def __init__(self, size=10):
+        capacity = self.MINIMUM_CAPACITY
+        while capacity * self.MAX_LOAD_FACTOR < size:
+            capacity *= 2
+        self.keys: list = [EMPTY] * capacity
+        self.values: list = [None] * capacity
+        self.count = 0  # live entries
+        self.filled = 0  # live entries plus deleted markers
+
+    # Iterates over the stored values. Each call returns an independent iterator, so loops can be nested.
+    # Time Complexity: O(N)
+    # Space Complexity: O(1)
+    def __iter__(self):
+        keys = self.keys
+        values = self.values
+        for i in range(len(keys)):
+            if keys[i] is not EMPTY and keys[i] is not DELETED:
+                yield values[i]
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def __len__(self):
+        return self.count
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def hash_(self, key):
+        return hash(key) & (len(self.keys) - 1)
+
+    # Returns the slot holding key, or -1.
+    # Time Complexity: O(1) expected
+    # Space Complexity: O(1)
+    def find_slot(self, key):
+        keys = self.keys
+        mask = len(keys) - 1
+        i = hash(key) & mask
+        while True:
+            slot_key = keys[i]
+            if slot_key is EMPTY:
+                return -1
+            if slot_key is not DELETED and slot_key == key:
+                return i
+            i = (i + 1) & mask
+
+    # Slots find_slot examines for key, for instrumentation.
+    # Time Complexity: O(1) expected
+    # Space Complexity: O(1)
+    def probe_length(self, key):
+        keys = self.keys
+        mask = len(keys) - 1
+        i = hash(key) & mask
+        length = 1
+        while keys[i] is not EMPTY and (keys[i] is DELETED or keys[i] != key):
+            i = (i + 1) & mask
+            length += 1
+        return length
+
+    # Rehashes every live entry into a table of the given capacity, dropping deleted markers.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def resize(self, capacity):
+        old_keys = self.keys
+        old_values = self.values
+        self.keys = keys = [EMPTY] * capacity
+        self.values = values = [None] * capacity
+        mask = capacity - 1
+        for key, value in zip(old_keys, old_values):
+            if key is EMPTY or key is DELETED:
+                continue
+            i = hash(key) & mask
+            while keys[i] is not EMPTY:
+                i = (i + 1) & mask
+            keys[i] = key
+            values[i] = value
+        self.filled = self.count
+
+    # Inserts the value, or replaces it if the key is already present.
+    # Time Complexity: O(1) amortized
+    # Space Complexity: O(1) amortized
+    def insert_(self, key, value):
+        if (self.filled + 1) > len(self.keys) * self.MAX_LOAD_FACTOR:
+            # grow when mostly live entries; rebuild at the same size when mostly deleted markers
+            if (self.count + 1) > len(self.keys) * self.MAX_LOAD_FACTOR / 2:
+                self.resize(len(self.keys) * 2)
+            else:
+                self.resize(len(self.keys))
+
+        keys = self.keys
+        mask = len(keys) - 1
+        i = hash(key) & mask
+        reuse = -1
+        while True:
+            slot_key = keys[i]
+            if slot_key is EMPTY:
+                break
+            if slot_key is DELETED:
+                if reuse < 0:
+                    reuse = i
+            elif slot_key == key:
+                self.values[i] = value
+                return
+            i = (i + 1) & mask
+
+        if reuse >= 0:
+            i = reuse
+        else:
+            self.filled += 1
+        keys[i] = key
+        self.values[i] = value
+        self.count += 1
+
+    # Time Complexity: O(1) expected
+    # Space Complexity: O(1)
+    def delete_(self, key):
+        i = self.find_slot(key)
+        if i >= 0:
+            self.keys[i] = DELETED
+            self.values[i] = None
+            self.count -= 1
+
+    # Returns the value stored for key, or None.
+    # Time Complexity: O(1) expected
+    # Space Complexity: O(1)
+    def lookup_(self, key):
+        if instrumentation.enabled:
+            instrumentation.count("OpenAddressingHashTable.lookup_ calls")
+            instrumentation.count("OpenAddressingHashTable.lookup_ probes", self.probe_length(key))
+        i = self.find_slot(key)
+        if i >= 0:
+            return self.values[i]
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def get_all(self) -> list:
+        return list(self)
@@ -1,5 +1,8 @@
 from datetime import datetime
 from enum import Enum
+from typing import Optional
+
+from model.clock import format_clock, to_clock, to_datetime
 
 
 class PackagePriority(Enum):
@@ -14,9 +17,56 @@ class PackageStatus(Enum):
     DELIVERED = 3
 
 
+# Parses a deadline such as "10:30 AM" into a datetime on the same day as the routing clock. "EOD" has no deadline.
+# Raises ValueError for any other text.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_deadline(deadline: str) -> Optional[datetime]:
+    if deadline.strip().upper() == "EOD":
+        return None
+    parsed = datetime.strptime(deadline.strip(), "%I:%M %p")
+    return datetime(1, 1, 1, parsed.hour, parsed.minute)
+
+
+# Formats a parsed deadline the way the csv writes it, e.g. "9:00 AM" or "EOD".
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def format_deadline(deadline: Optional[datetime]) -> str:
+    if deadline is None:
+        return "EOD"
+    return str(deadline.hour % 12 or 12) + ":" + "{:02d}".format(deadline.minute) + \
+        (" AM" if deadline.hour < 12 else " PM")
+
+
+# Parses a weight, keeping whole numbers as int so they print as they appear in the csv. Raises ValueError.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_weight(weight: str):
+    value = float(weight)
+    return int(value) if value.is_integer() else value
+
+
+# A datetime attribute stored in the integer clock attribute name.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def clock_property(name):
+    def get(package) -> Optional[datetime]:
+        return to_datetime(getattr(package, name))
+
+    def set_(package, value: Optional[datetime]):
+        setattr(package, name, to_clock(value))
+
+    return property(get, set_)
+
+
+# Times are kept on the clock of model.clock: deadline_at, available_at, dispatched_at and delivered_at are integer
+# microseconds since midnight, or None. deadline, available_time, dispatched_time and delivered_time read and write
+# them as datetimes, for input and display.
 # Time Complexity: O(1)
 # Space Complexity: O(1)
 class Package:
+    __slots__ = ("id", "address", "city", "zip", "deadline_at", "weight", "notes", "priority", "dispatched_at",
+                 "available_at", "delivered_at", "truck", "location_id")
 
     # Time Complexity: O(1)
     # Space Complexity: O(1)
@@ -26,31 +76,39 @@ class Package:
         self.address = address
         self.city = city
         self.zip = zip_
-        self.deadline = deadline
-        self.weight = weight
+        # deadline and weight are parsed once; the csv reader passes them already typed
+        self.deadline = parse_deadline(deadline) if isinstance(deadline, str) else deadline
+        self.weight = parse_weight(weight) if isinstance(weight, str) else weight
         self.notes = notes
         self.priority: PackagePriority = priority
-        self.dispatched_time = None
-        self.available_time = None
-        self.delivered_time = None
+        self.dispatched_at: Optional[int] = None
+        self.available_at: Optional[int] = None
+        self.delivered_at: Optional[int] = None
         self.truck = None
+        self.location_id = None
+
+    deadline = clock_property("deadline_at")
+    available_time = clock_property("available_at")
+    dispatched_time = clock_property("dispatched_at")
+    delivered_time = clock_property("delivered_at")
 
     # Time Complexity: O(1)
     # Space Complexity: O(1)
     def print_package_status(self, time_: datetime):
-        print("Package " + str(self.id) + " at " + time_.strftime("%H:%M"))
+        at = to_clock(time_)
+        print("Package " + str(self.id) + " at " + format_clock(at))
         print("Delivery address: " + str(self.address) + ", " + str(self.city) + ", " + str(self.zip))
         print("Weight: " + str(self.weight))
-        print("Deadline: " + str(self.deadline))
+        print("Deadline: " + format_deadline(self.deadline))
         if self.notes != "":
             print("Notes: " + str(self.notes))
         print("Dispatch: Truck " + str(self.truck.id) + ", leaving warehouse at " +
-              str(self.truck.dispatch_time.strftime("%H:%M")))
-        status = "Warehouse; delivery scheduled for " + self.delivered_time.strftime("%H:%M")
+              format_clock(self.truck.dispatch_at))
+        status = "Warehouse; delivery scheduled for " + format_clock(self.delivered_at)
 
-        if time_ > self.dispatched_time:
+        if at > self.dispatched_at:
             status = "En Route on truck " + str(self.truck.id) + "; delivery scheduled for " + \
-                     self.delivered_time.strftime("%H:%M")
-        if time_ > self.delivered_time:
-            status = "Delivered at " + self.delivered_time.strftime("%H:%M")
+                     format_clock(self.delivered_at)
+        if at > self.delivered_at:
+            status = "Delivered at " + format_clock(self.delivered_at)
         print("Status: " + status + "\n")
@@ -0,0 +1,250 @@
+import datetime
+from typing import Optional
+
+import numpy
+
+from model.clock import MICROSECONDS_PER_MINUTE, NOT_SET, to_clock, to_datetime
+from model.package import Package, PackagePriority
+
+"""
+Struct-of-arrays package table. Every package attribute is one column: NumPy arrays for the numeric fields and the
+status times, the latter as int64 times on the clock of model.clock, and interned string lists for the text fields.
+PackageRecord is a two-slot view of one row with the same attributes as Package, so WGUPS, the trucks and the routing
+code work on a store exactly as they do on Package objects, while the data itself stays in the columns.
+
+The store also implements the insert_/lookup_/delete_/get_all API of the hash tables and can be handed to WGUPS in
+place of a list of packages.
+"""
+
+NO_DEADLINE = -1  # deadline column value for "EOD"
+NO_LOCATION = -1
+NO_TRUCK = 0
+DELETED_ID = -1
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def deadline_minutes(deadline: Optional[datetime.datetime]):
+    return NO_DEADLINE if deadline is None else deadline.hour * 60 + deadline.minute
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def minutes_deadline(minutes) -> Optional[datetime.datetime]:
+    if minutes == NO_DEADLINE:
+        return None
+    return datetime.datetime(1, 1, 1, *divmod(int(minutes), 60))
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def minutes_clock(minutes) -> Optional[int]:
+    return None if minutes == NO_DEADLINE else int(minutes) * MICROSECONDS_PER_MINUTE
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def clock_minutes(clock: Optional[int]):
+    return NO_DEADLINE if clock is None else clock // MICROSECONDS_PER_MINUTE
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def from_column(value) -> Optional[int]:
+    return None if value == NOT_SET else int(value)
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def to_column(clock: Optional[int]):
+    return NOT_SET if clock is None else clock
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def column_datetime(value) -> Optional[datetime.datetime]:
+    return to_datetime(from_column(value))
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def datetime_column(value: Optional[datetime.datetime]):
+    return to_column(to_clock(value))
+
+
+# Builds a property that reads and writes one column of the store, converting at the edge.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def column(name, to_python=None, from_python=None):
+    def get(record):
+        value = getattr(record.store, name)[record.row]
+        return value if to_python is None else to_python(value)
+
+    def set_(record, value):
+        getattr(record.store, name)[record.row] = value if from_python is None else from_python(value)
+
+    return property(get, set_)
+
+
+# A view of one row of a PackageStore with the attributes and methods of Package.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class PackageRecord:
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    id = column("ids", int)
+    address = column("addresses")
+    city = column("cities")
+    zip = column("zips")
+    notes = column("notes")
+    deadline = column("deadlines", minutes_deadline, deadline_minutes)
+    deadline_at = column("deadlines", minutes_clock, clock_minutes)
+    weight = column("weights", lambda w: int(w) if float(w).is_integer() else float(w))
+    priority = column("priorities", PackagePriority, lambda p: p.value)
+    location_id = column("location_ids", lambda i: None if i == NO_LOCATION else int(i),
+                         lambda i: NO_LOCATION if i is None else i)
+    available_at = column("available_times", from_column, to_column)
+    dispatched_at = column("dispatched_times", from_column, to_column)
+    delivered_at = column("delivered_times", from_column, to_column)
+    available_time = column("available_times", column_datetime, datetime_column)
+    dispatched_time = column("dispatched_times", column_datetime, datetime_column)
+    delivered_time = column("delivered_times", column_datetime, datetime_column)
+
+    @property
+    def truck(self):
+        truck_id = self.store.truck_ids[self.row]
+        return None if truck_id == NO_TRUCK else self.store.trucks[truck_id - 1]
+
+    @truck.setter
+    def truck(self, truck):
+        self.store.truck_ids[self.row] = NO_TRUCK if truck is None else truck.id
+
+    def __eq__(self, other):
+        return isinstance(other, PackageRecord) and other.store is self.store and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
+
+    print_package_status = Package.print_package_status
+
+
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+class PackageStore:
+    NUMERIC_COLUMNS = {"ids": numpy.int64, "location_ids": numpy.int32, "deadlines": numpy.int16,
+                       "weights": numpy.float64, "priorities": numpy.int8, "truck_ids": numpy.int16,
+                       "available_times": numpy.int64, "dispatched_times": numpy.int64,
+                       "delivered_times": numpy.int64}
+    STRING_COLUMNS = ("addresses", "cities", "zips", "notes")
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.deleted = 0
+        for name, dtype in self.NUMERIC_COLUMNS.items():
+            setattr(self, name, numpy.empty(capacity, dtype=dtype))
+        for name in self.STRING_COLUMNS:
+            setattr(self, name, [])
+        self.interned: dict[str, str] = {}  # repeated addresses, cities and notes share one string object
+        self.trucks = []  # set by WGUPS so PackageRecord.truck can return Truck objects
+        self.rows: Optional[dict[int, int]] = None  # id -> row, built on the first lookup and then kept up to date
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    @classmethod
+    def from_packages(cls, packages):
+        store = cls()
+        for package in packages:
+            store.append(package)
+        return store
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def intern(self, text):
+        return self.interned.setdefault(text, text)
+
+    # Time Complexity: O(1) amortized [columns double in size when full]
+    # Space Complexity: O(1) amortized
+    def append(self, package: Package):
+        if self.size == len(self.ids):
+            for name in self.NUMERIC_COLUMNS:
+                grown = numpy.empty(max(16, 2 * len(self.ids)), dtype=getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        for name in self.STRING_COLUMNS:
+            getattr(self, name).append(None)
+
+        self.size += 1
+        record = PackageRecord(self, self.size - 1)
+        record.id = package.id
+        if self.rows is not None:
+            self.rows[package.id] = record.row
+        for attribute in ("address", "city", "zip", "notes"):
+            setattr(record, attribute, self.intern(getattr(package, attribute)))
+        record.deadline = package.deadline
+        record.weight = package.weight
+        record.priority = package.priority
+        record.location_id = package.location_id
+        record.available_at = package.available_at
+        record.dispatched_at = package.dispatched_at
+        record.delivered_at = package.delivered_at
+        self.truck_ids[record.row] = NO_TRUCK if package.truck is None else package.truck.id
+        return record
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def __len__(self):
+        return self.size - self.deleted
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(1)
+    def __iter__(self):
+        for row in range(self.size):
+            if self.ids[row] != DELETED_ID:
+                yield PackageRecord(self, row)
+
+    # Returns the row of a package id, or -1. The id -> row dict is built once from the id column on the first lookup,
+    # then append and delete_ keep it current, so a store that is never searched does not pay for it.
+    # Time Complexity: O(1), O(N) for the first lookup
+    # Space Complexity: O(N)
+    def row_of(self, package_id):
+        if self.rows is None:
+            ids = self.ids[:self.size].tolist()
+            self.rows = {package: row for row, package in enumerate(ids) if package != DELETED_ID}
+        return self.rows.get(package_id, -1)
+
+    # Hash table API
+
+    # Inserts the package, or overwrites the row of an existing id.
+    # Time Complexity: O(1) amortized
+    # Space Complexity: O(1) amortized
+    def insert_(self, key, value: Package):
+        if self.row_of(key) >= 0:
+            self.delete_(key)
+        self.append(value)
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def delete_(self, key):
+        row = self.row_of(key)
+        if row >= 0:
+            self.ids[row] = DELETED_ID
+            self.deleted += 1
+            del self.rows[key]
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def lookup_(self, key):
+        row = self.row_of(key)
+        if row >= 0:
+            return PackageRecord(self, row)
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def get_all(self) -> list:
+        return list(self)
@@ -0,0 +1,217 @@
+import datetime
+import math
+
+import numpy
+
+from model.assignment import (LoadPlan, clock_minutes_of, group_packages, minutes_of, package_priority,
+                              prepare_packages, split_group, typical_leg, wave_schedule)
+from model.package import Package
+from model.truck import Truck
+
+"""
+Geographic partitioning of the packages into one capacity-bounded cluster per truck, by k-medoids over the distance
+table. Cluster i is truck i + 1, so a package pinned to a truck by its notes can only join that truck's cluster.
+
+Each iteration assigns every package group (see model.assignment.group_packages) to the truck whose medoid is
+closest among the trucks with room that satisfy the group's constraints, then moves each medoid to the member location
+with the smallest package-weighted distance to the rest of the cluster. Groups are assigned pinned first, then held
+ones, then by deadline, then by regret, the extra distance to their second closest medoid, so groups with one clear
+cluster get it while it has room. Deadlines and delayed departures are checked as in model.assignment.assign_packages.
+
+An iteration is O(G * T) for G groups and T trucks, vectorized over the trucks, plus O(N * C) for the medoids of
+clusters of at most C packages, so partitioning is linear in the package count for a fixed fleet.
+"""
+
+FILL = 0.9  # share of the capacity of the open trucks the packages are expected to fill
+
+
+# Farthest-first seeds for the open trucks: the location of each pinned truck's first group, then repeatedly the
+# group location farthest from the hub and every seed so far. Closed trucks start at the hub.
+# Time Complexity: O(G * T)
+# Space Complexity: O(G)
+def initial_medoids(locations: numpy.ndarray, pins: numpy.ndarray, active: numpy.ndarray, distances: numpy.ndarray,
+                    hub_location_id) -> numpy.ndarray:
+    medoids = numpy.full(len(active), -1, dtype=numpy.intp)
+    for location_id, pin in zip(locations.tolist(), pins.tolist()):
+        if pin >= 0 and medoids[pin] < 0:
+            medoids[pin] = location_id
+    nearest = distances[locations, hub_location_id].astype(numpy.float64)
+    for medoid in medoids[medoids >= 0]:
+        nearest = numpy.minimum(nearest, distances[locations, medoid])
+    for truck in numpy.flatnonzero(medoids < 0):
+        if len(locations) == 0 or not active[truck]:
+            medoids[truck] = hub_location_id
+            continue
+        medoids[truck] = locations[int(numpy.argmax(nearest))]
+        nearest = numpy.minimum(nearest, distances[locations, medoids[truck]])
+    return medoids
+
+
+# Extra distance from each group location to its second closest medoid over its closest, in blocks of rows so the
+# distances to every medoid are never all held at once.
+# Time Complexity: O(G * T)
+# Space Complexity: O(G + block * T)
+def medoid_regret(locations: numpy.ndarray, medoids: numpy.ndarray, distances: numpy.ndarray, block=1024):
+    regret = numpy.zeros(len(locations))
+    if len(medoids) < 2:
+        return regret
+    for first in range(0, len(locations), block):
+        nearest = numpy.partition(distances[numpy.ix_(locations[first:first + block], medoids)], 1, axis=1)
+        regret[first:first + block] = nearest[:, 1] - nearest[:, 0]
+    return regret
+
+
+# The member location with the smallest total distance to every package in the cluster.
+# Time Complexity: O(U^2) [U distinct locations in the cluster, at most the truck capacity]
+# Space Complexity: O(U^2)
+def cluster_medoid(locations: numpy.ndarray, sizes: numpy.ndarray, distances: numpy.ndarray):
+    unique, inverse = numpy.unique(locations, return_inverse=True)
+    weights = numpy.bincount(inverse, weights=sizes)
+    return unique[int(numpy.argmin(distances[numpy.ix_(unique, unique)] @ weights))]
+
+
+# Partitions the packages over the trucks and returns the LoadPlan, in the form assign_packages returns.
+# Time Complexity: O(I * G * T) [I iterations]
+# Space Complexity: O(N + T * C)
+def partition_packages(packages: list[Package], truck_count, distances: numpy.ndarray, hub_location_id,
+                       start_time: datetime.datetime, drivers=2, capacity=Truck.MAXIMUM_PACKAGES, iterations=10):
+    drivers = max(1, min(drivers, truck_count))
+    start = minutes_of(start_time)
+    constraints, release, held = prepare_packages(packages, start)
+
+    # groups that cannot go on any one truck are split into the parts that must travel together
+    groups = []
+    unassigned = []
+    for group in group_packages(packages, constraints, release, held, capacity):
+        for part in (split_group(group, constraints) if len(group) > capacity else [group]):
+            pinned = {constraints[p.id].truck_id for p in part} - {None}
+            if len(part) > capacity or len(pinned) > 1 or any(truck_id > truck_count for truck_id in pinned):
+                unassigned += [p.id for p in part]
+            else:
+                groups.append(part)
+
+    locations = numpy.array([group[0].location_id for group in groups], dtype=numpy.intp)
+    sizes = numpy.array([len(group) for group in groups], dtype=numpy.int64)
+    pins = numpy.array([next((constraints[p.id].truck_id - 1 for p in group
+                              if constraints[p.id].truck_id is not None), -1) for group in groups], dtype=numpy.intp)
+    releases = [max(release[p.id] for p in group) for group in groups]
+    deadlines = numpy.array([min(clock_minutes_of(p.deadline_at) for p in group) for group in groups])
+    holds = numpy.array([bool(held & {p.id for p in group}) for group in groups], dtype=bool)
+
+    package_deadlines = [p.deadline_at for p in packages if p.deadline_at is not None]
+    earliest_deadline = min(package_deadlines) if package_deadlines else None
+    first_wave = numpy.arange(truck_count) < drivers
+    minutes_per_mile = 60 / Truck.MILES_PER_HOUR
+    leg = typical_leg(distances, locations) * minutes_per_mile
+    drives = distances[hub_location_id, locations] * minutes_per_mile
+    truck_ids = numpy.arange(truck_count)
+
+    # open as many trucks as the packages fill to FILL, pinned trucks and the earliest trucks first, and a later wave
+    # truck for held packages; another truck only opens when no open truck can take a group
+    active = numpy.zeros(truck_count, dtype=bool)
+    active[pins[pins >= 0]] = True
+    if holds.any() and not first_wave.all():
+        active[drivers] = True
+    for truck in range(truck_count):
+        if active.sum() >= math.ceil(sizes.sum() / (capacity * FILL)):
+            break
+        active[truck] = True
+
+    # a closed truck costs more than the longest leg between two groups; past 4096 groups, twice the farthest group
+    # from the hub bounds that leg by the triangle inequality without reading more than the hub row
+    if len(groups) <= 4096:
+        closed_penalty = float(numpy.max(distances[numpy.ix_(locations, locations)], initial=0))
+    else:
+        closed_penalty = 2 * float(numpy.max(distances[hub_location_id, locations]))
+
+    # one k-medoids assignment: (truck per group or -1, first wave departures, loads, at-risk package ids)
+    def assign(medoids):
+        departure = numpy.where(first_wave, start, numpy.inf)  # later waves leave at an unknown, later time
+        latest_departure = numpy.full(truck_count, numpy.inf)
+        load = numpy.zeros(truck_count, dtype=numpy.int64)
+        stop_count = numpy.zeros(truck_count, dtype=numpy.int64)
+        assignment = numpy.full(len(groups), -1, dtype=numpy.intp)
+        at_risk = []
+
+        regret = medoid_regret(locations, medoids[active], distances)
+        for g in numpy.lexsort((-regret, deadlines, ~holds, pins < 0)).tolist():
+            feasible = load + sizes[g] <= capacity
+            if pins[g] >= 0:
+                feasible &= truck_ids == pins[g]
+            if holds[g] and not first_wave.all():
+                feasible &= ~first_wave
+            if not feasible.any():
+                continue
+
+            new_departure = numpy.maximum(departure, releases[g])
+            on_time = (new_departure + (stop_count + 1) * leg <= latest_departure) & \
+                (new_departure + drives[g] + stop_count * leg <= deadlines[g])
+            if numpy.isinf(deadlines[g]):
+                on_time |= ~first_wave & numpy.isinf(latest_departure)
+            candidates = feasible & on_time
+            if not candidates.any():
+                candidates = feasible
+                at_risk += [p.id for p in groups[g] if p.deadline_at is not None]
+
+            # distance to the medoid, plus a penalty per minute of pushed back departure, and for a closed truck
+            delay = numpy.where(first_wave, new_departure - numpy.where(first_wave, departure, 0), 0)
+            cost = distances[locations[g], medoids] + delay / minutes_per_mile + numpy.where(active, 0, closed_penalty)
+            truck = int(numpy.argmin(numpy.where(candidates, cost, numpy.inf)))
+            if not active[truck]:
+                active[truck] = True
+                medoids[truck] = locations[g]
+            assignment[g] = truck
+            load[truck] += sizes[g]
+            stop_count[truck] += 1
+            if first_wave[truck]:
+                departure[truck] = new_departure[truck]
+            if not numpy.isinf(deadlines[g]):
+                latest_departure[truck] = min(latest_departure[truck], deadlines[g] - drives[g])
+        return assignment, departure, load, at_risk
+
+    # iterations can cycle, so the assignment with the smallest package-weighted distance to its medoids is kept
+    medoids = initial_medoids(locations, pins, active, distances, hub_location_id)
+    best = None
+    for _ in range(max(1, iterations)):
+        result = assign(medoids)
+        assignment = result[0]
+        placed = assignment >= 0
+        spread = float(sizes[placed] @ distances[locations[placed], medoids[assignment[placed]]])
+        score = (int(sizes[~placed].sum()), spread)
+        if best is None or score < best[0]:
+            best = score, result, medoids.copy()
+
+        new_medoids = medoids.copy()
+        for truck in range(truck_count):
+            members = numpy.flatnonzero(assignment == truck)
+            if len(members):
+                new_medoids[truck] = cluster_medoid(locations[members], sizes[members], distances)
+        if numpy.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+    _, (assignment, departure, load, at_risk), medoids = best
+
+    loads = {}
+    for g, truck in enumerate(assignment.tolist()):
+        if truck >= 0:
+            loads.setdefault(truck + 1, []).extend((p.id, package_priority(p, earliest_deadline)) for p in groups[g])
+            continue
+        # no truck had room for the whole group: its parts go to the closest medoids with room left
+        for part in split_group(groups[g], constraints):
+            feasible = load + len(part) <= capacity
+            pinned = {constraints[p.id].truck_id for p in part} - {None}
+            if pinned:
+                feasible &= truck_ids == pinned.pop() - 1
+            if held & {p.id for p in part} and not first_wave.all():
+                feasible &= ~first_wave
+            if not feasible.any():
+                unassigned += [p.id for p in part]
+                continue
+            truck = int(numpy.argmin(numpy.where(feasible, distances[locations[g], medoids], numpy.inf)))
+            load[truck] += len(part)
+            if first_wave[truck]:
+                departure[truck] = max(departure[truck], max(release[p.id] for p in part))
+            at_risk += [p.id for p in part if p.deadline_at is not None]
+            loads.setdefault(truck + 1, []).extend((p.id, package_priority(p, earliest_deadline)) for p in part)
+    return LoadPlan(dict(sorted(loads.items())), wave_schedule(first_wave, departure, load, start_time), at_risk,
+                    unassigned)
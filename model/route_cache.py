@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+from model.clock import MICROSECONDS_PER_MINUTE
+
+"""
+Bounded LRU cache of generated routes. A route is stored as its entries plus each delivery time and the return time
+as offsets in microseconds from the start time, so a hit for another start time only shifts the times. Routes whose
+order depends on the start time are keyed on its START_BUCKET, and a hit for another start in the bucket is only used
+if the shifted route still delivers no package before it is available and makes no package newly late.
+"""
+
+START_BUCKET = 30 * MICROSECONDS_PER_MINUTE
+
+
+# A cached route: the route entries, the start time it was generated for, the delivery offset of each package and the
+# offset of the return to the hub.
+# Time Complexity: O(1)
+# Space Complexity: O(N)
+class CachedRoute:
+    __slots__ = ("route", "start", "delivery_offsets", "return_offset")
+
+    def __init__(self, route: list[tuple], start: int, delivery_offsets: dict[int, int], return_offset: int):
+        self.route = route
+        self.start = start
+        self.delivery_offsets = delivery_offsets
+        self.return_offset = return_offset
+
+    # Whether the route still holds when it starts at start instead: no package is delivered before its available
+    # time, and no package that was on time is delivered after its deadline.
+    # Time Complexity: O(N)
+    # Space Complexity: O(1)
+    def fits(self, start: int, packages) -> bool:
+        if start == self.start:
+            return True
+        for package in packages:
+            offset = self.delivery_offsets[package.id]
+            if package.available_at is not None and start + offset < package.available_at:
+                return False
+            deadline = package.deadline_at
+            if deadline is not None and start + offset > deadline >= self.start + offset:
+                return False
+        return True
+
+
+# Time Complexity: O(1) per operation
+# Space Complexity: O(M * N) [M cached routes of N packages]
+class RouteCache:
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def __len__(self):
+        return len(self.entries)
+
+    # Returns the CachedRoute for key, or None, and counts the hit or miss. A route that does not fit the packages at
+    # start, see CachedRoute.fits, counts as a miss.
+    # Time Complexity: O(1), O(N) when start and packages are given
+    # Space Complexity: O(1)
+    def get(self, key, start: int = None, packages=None):
+        entry = self.entries.get(key)
+        if entry is None or (packages is not None and not entry.fits(start, packages)):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(N)
+    def put(self, key, entry: CachedRoute):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # Time Complexity: O(M)
+    # Space Complexity: O(1)
+    def clear(self):
+        self.entries.clear()
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def info(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self.entries),
+                "maxsize": self.maxsize, "hit_rate": self.hits / lookups if lookups else 0.0}
@@ -0,0 +1,285 @@
+import numpy
+
+from model.clock import MICROSECONDS_PER_MINUTE, NOT_SET
+from model.held_karp import ExactSolver
+from model.truck import Truck
+from util import instrumentation
+from util.distance_store import attach_distances
+
+"""
+Batched routing engine. Works on arrays of package location ids instead of Package objects so each step of the
+nearest neighbor search is a handful of vectorized operations over the remaining packages. Stop sets small enough
+for model.held_karp are routed exactly instead. Times are integers on the clock of model.clock: start times, the
+available_times and deadlines int64 arrays, and every delivery time returned.
+"""
+
+# Marks packages without an availability constraint: before every clock time, so never held back.
+NOT_DELAYED = NOT_SET
+
+
+# Driving time over distance miles, rounded to the microsecond as timedelta(minutes=...) rounds it.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def travel_time(distance) -> int:
+    return round(distance / Truck.MILES_PER_HOUR * 60 * MICROSECONDS_PER_MINUTE)
+
+
+# Minutes each delivery is ahead of its package's deadline, negative when it is late, in one vectorized pass.
+# times and deadlines are clock arrays in delivery order; packages due at the end of the day have a large slack.
+# Time Complexity: O(N) [vectorized]
+# Space Complexity: O(N)
+def route_slack(times: numpy.ndarray, deadlines: numpy.ndarray) -> numpy.ndarray:
+    return (deadlines - times) / MICROSECONDS_PER_MINUTE
+
+
+# Greedy nearest neighbor over arrays. Returns the package indices in delivery order, the distance driven to reach
+# each one, each delivery time, and the time the last package is delivered.
+# Packages already at the current location are delivered together at no distance; otherwise the truck drives to the
+# closest available package, ties going to the package listed first. If every remaining package is still
+# unavailable the truck waits at its current location until the earliest one becomes available.
+# Time Complexity: O(N^2) [N steps, each one O(N) vectorized pass over the packages]
+# Space Complexity: O(N)
+def nearest_neighbor_order(distances: numpy.ndarray, location_ids: numpy.ndarray, available_times: numpy.ndarray,
+                           start_location_id, start_time: int):
+    location_ids = numpy.asarray(location_ids, dtype=numpy.intp)
+    remaining = numpy.ones(len(location_ids), dtype=bool)
+    order: list[int] = []
+    legs: list[float] = []
+    times: list[int] = []
+    current_location_id = start_location_id
+    current_time = start_time
+    # once the clock is past the last availability every remaining package can be taken, without the mask
+    last_available = int(available_times.max()) if len(available_times) else NOT_DELAYED
+    iterations = 0
+    lookups = 0
+
+    while len(order) < len(location_ids):
+        iterations += 1
+        if current_time >= last_available:
+            candidates = remaining
+        else:
+            candidates = remaining & (available_times <= current_time)
+            if not candidates.any():
+                current_time = int(available_times[remaining].min())
+                continue
+
+        here = numpy.flatnonzero(candidates & (location_ids == current_location_id))
+        if len(here) > 0:
+            order.extend(here.tolist())
+            legs.extend([0] * len(here))
+            times.extend([current_time] * len(here))
+            remaining[here] = False
+            continue
+
+        row = numpy.where(candidates, distances[current_location_id, location_ids], numpy.inf)
+        lookups += len(location_ids)
+        next_index = int(row.argmin())
+        distance = distances[current_location_id, location_ids[next_index]]
+        current_time = current_time + travel_time(distance)
+        current_location_id = location_ids[next_index]
+        remaining[next_index] = False
+        order.append(next_index)
+        legs.append(distance)
+        times.append(current_time)
+
+    if instrumentation.enabled:
+        instrumentation.count("nearest_neighbor iterations", iterations)
+        instrumentation.count("nearest_neighbor distance lookups", lookups)
+    return order, legs, times, current_time
+
+
+# Nearest neighbor driven by the per-location candidate lists of nearest_candidates. Each step walks the candidate
+# list of the current location and takes the first location that still has an available package, which is the
+# nearest one without looking at the other packages; a full scan over the remaining packages is only made when every
+# candidate has been visited. With exact=True a step whose nearest candidate ties with the last entry of the list
+# also falls back to the scan, and ties among candidates go to the package listed first, so the route is identical
+# to nearest_neighbor_order. With exact=False the first candidate found is taken.
+# Time Complexity: O(N * K) when candidates are found, plus O(N) per fallback scan
+# Space Complexity: O(N)
+def candidate_nearest_neighbor_order(distances: numpy.ndarray, candidates: numpy.ndarray, location_ids: numpy.ndarray,
+                                     available_times: numpy.ndarray, start_location_id, start_time: int,
+                                     exact=True):
+    location_ids = numpy.asarray(location_ids, dtype=numpy.intp)
+    remaining = numpy.ones(len(location_ids), dtype=bool)
+    delayed = available_times != NOT_DELAYED
+    available_at = available_times.tolist()
+    # package indices still to deliver at each location, in package order
+    at_location: dict[int, list[int]] = {}
+    for index, location_id in enumerate(location_ids.tolist()):
+        at_location.setdefault(location_id, []).append(index)
+
+    order: list[int] = []
+    legs: list[float] = []
+    times: list[int] = []
+    current_location_id = int(start_location_id)
+    current_time = start_time
+
+    def available(indices, now):
+        if not delayed.any():
+            return indices
+        return [i for i in indices if available_at[i] <= now]
+
+    iterations = 0
+    lookups = 0
+    fallbacks = 0
+    while len(order) < len(location_ids):
+        iterations += 1
+        now = current_time
+        here = available(at_location.get(current_location_id, ()), now)
+        if here:
+            order.extend(here)
+            legs.extend([0] * len(here))
+            times.extend([current_time] * len(here))
+            remaining[here] = False
+            left = [i for i in at_location[current_location_id] if remaining[i]]
+            if left:
+                at_location[current_location_id] = left
+            else:
+                del at_location[current_location_id]
+            continue
+
+        next_index = None
+        best = numpy.inf
+        row = candidates[current_location_id]
+        for position, location_id in enumerate(row.tolist()):
+            distance = distances[current_location_id, location_id]
+            lookups += 1
+            if distance > best:
+                break
+            indices = available(at_location.get(location_id, ()), now)
+            if not indices:
+                continue
+            if next_index is None or indices[0] < next_index:
+                next_index = indices[0]
+                best = distance
+            if not exact:
+                break
+        if exact and next_index is not None and len(row) > 0 and best >= distances[current_location_id, row[-1]]:
+            next_index = None  # a location outside the list may tie with the nearest candidate
+
+        if next_index is None:
+            fallbacks += 1
+            lookups += len(location_ids)
+            mask = remaining & (available_times <= now)
+            if not mask.any():
+                current_time = int(available_times[remaining].min())
+                continue
+            next_index = int(numpy.where(mask, distances[current_location_id, location_ids], numpy.inf).argmin())
+
+        distance = distances[current_location_id, location_ids[next_index]]
+        current_time = current_time + travel_time(distance)
+        current_location_id = int(location_ids[next_index])
+        remaining[next_index] = False
+        at_location[current_location_id].remove(next_index)
+        if not at_location[current_location_id]:
+            del at_location[current_location_id]
+        order.append(next_index)
+        legs.append(distance)
+        times.append(current_time)
+
+    if instrumentation.enabled:
+        instrumentation.count("nearest_neighbor iterations", iterations)
+        instrumentation.count("nearest_neighbor distance lookups", lookups)
+        instrumentation.count("nearest_neighbor candidate fallbacks", fallbacks)
+    return order, legs, times, current_time
+
+
+# Shortest order of the packages by the exact solver, in the form nearest_neighbor_order returns, or None when the
+# packages are at more distinct locations than the solver takes, when one is not available yet at start_time, so
+# the truck would have to wait, or when the shortest order delivers a package after its deadline. Packages at the
+# start location are delivered first and packages sharing a location together, in package order. With
+# end_location_id the drive from the last stop to it counts towards the length.
+# Time Complexity: O(2^L * L^2) [L distinct locations], O(N) when memoized
+# Space Complexity: O(2^L * L)
+def exact_order(solver: ExactSolver, distances: numpy.ndarray, location_ids: numpy.ndarray,
+                available_times: numpy.ndarray, deadlines: numpy.ndarray, start_location_id,
+                start_time: int, end_location_id=None):
+    if (available_times > start_time).any():
+        return None
+    at_location: dict[int, list[int]] = {}
+    for index, location_id in enumerate(location_ids.tolist()):
+        at_location.setdefault(location_id, []).append(index)
+    here = at_location.pop(start_location_id, [])
+    stops = solver.solve(start_location_id, list(at_location), end_location_id)
+    if stops is None:
+        return None
+
+    order = list(here)
+    legs = [0] * len(here)
+    times = [start_time] * len(here)
+    current_location_id = start_location_id
+    current_time = start_time
+    for location_id in stops:
+        distance = distances[current_location_id, location_id]
+        current_time = current_time + travel_time(distance)
+        current_location_id = location_id
+        indices = at_location[location_id]
+        order += indices
+        legs += [distance] + [0] * (len(indices) - 1)
+        times += [current_time] * len(indices)
+    if deadlines is not None and (route_slack(numpy.array(times, dtype=numpy.int64), deadlines[order]) < 0).any():
+        instrumentation.count("held_karp orders past a deadline")
+        return None
+    return order, legs, times, current_time
+
+
+# Runs the exact solver when one is given and takes the packages, otherwise the candidate list engine when candidate
+# lists are given, and the full scan when not. deadlines and end_location_id are only used by the exact solver.
+# Time Complexity: O(N^2) [O(N * K) with candidate lists, O(2^L * L^2) exact]
+# Space Complexity: O(N)
+def route_order(distances: numpy.ndarray, location_ids: numpy.ndarray, available_times: numpy.ndarray,
+                start_location_id, start_time: int, candidates: numpy.ndarray = None, exact=True,
+                solver: ExactSolver = None, deadlines: numpy.ndarray = None, end_location_id=None):
+    if solver is not None:
+        result = exact_order(solver, distances, location_ids, available_times, deadlines, start_location_id,
+                             start_time, end_location_id)
+        if result is not None:
+            return result
+    if candidates is None:
+        return nearest_neighbor_order(distances, location_ids, available_times, start_location_id, start_time)
+    return candidate_nearest_neighbor_order(distances, candidates, location_ids, available_times, start_location_id,
+                                            start_time, exact)
+
+
+# Distance matrix of a worker process, attached once by init_worker when the process pool starts. The shared memory
+# block is kept referenced for as long as the array views it. Candidate lists, if any, are sent once per worker, and
+# each worker keeps its own exact solver memo.
+worker_memory = None
+worker_distances: numpy.ndarray = None
+worker_candidates: numpy.ndarray = None
+worker_exact = True
+worker_solver: ExactSolver = None
+
+
+# Time Complexity: O(1) [O(N * K) to receive the candidate lists]
+# Space Complexity: O(N * K)
+def init_worker(shared_distances_handle, candidates: numpy.ndarray = None, exact=True, exact_locations=0):
+    global worker_memory, worker_distances, worker_candidates, worker_exact, worker_solver
+    worker_memory, worker_distances = attach_distances(shared_distances_handle)
+    worker_candidates, worker_exact = candidates, exact
+    worker_solver = ExactSolver(worker_distances, exact_locations) if exact_locations > 0 else None
+
+
+# Routes each priority segment of one truck in a worker process, then drives back to the hub. segments is a list of
+# (location_ids, available_times, deadlines) arrays. Returns the (order, legs, times) of each segment, or None for an
+# empty one, the distance back to the hub and the time the truck is back.
+# Time Complexity: O(N^2)
+# Space Complexity: O(N)
+def plan_truck(segments: list[tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]], hub_location_id,
+               start_time: int):
+    results = []
+    current_location_id = hub_location_id
+    current_time = start_time
+    last = max((i for i, segment in enumerate(segments) if len(segment[0])), default=-1)
+    for i, (location_ids, available_times, deadlines) in enumerate(segments):
+        if len(location_ids) == 0:
+            results.append(None)
+            continue
+        order, legs, times, current_time = route_order(worker_distances, location_ids, available_times,
+                                                       current_location_id, current_time, worker_candidates,
+                                                       worker_exact, worker_solver, deadlines,
+                                                       hub_location_id if i == last else None)
+        current_location_id = int(location_ids[order[-1]])
+        results.append((order, legs, times))
+    back_to_hq = worker_distances[current_location_id, hub_location_id]
+    return results, back_to_hq, current_time + travel_time(back_to_hq)
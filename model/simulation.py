@@ -0,0 +1,196 @@
+import datetime
+import heapq
+from typing import Callable, Optional
+
+from model.package import PackageStatus
+
+"""
+Discrete-event simulation of a day of the fleet. Trucks becoming ready to leave, packages arriving at the hub,
+deliveries and drivers coming back are events in one heap ordered by time, so dispatch times, driver hand-offs and
+every status change come out of a single run instead of being threaded through by hand.
+
+Drivers are a limited resource: a truck leaves once its start time has come and a driver is free. A truck that starts
+after another one takes over that truck's driver when it is back at the hub, unless the truck still waits for
+something else: then the driver takes a truck that can leave now, and only waits for the blocked truck when there is
+none. A truck with no start time leaves as soon as a driver is free and every package on it has arrived, though not
+before the day starts. A truck listed more than once in the schedule waits for all of its entries. Each truck is
+routed when it leaves, and only its next delivery is kept in the heap, so the heap holds O(T + A) events for T trucks
+and A package arrivals and a day of E events runs in O(E log (T + A)).
+"""
+
+# Event kinds, in the order events at the same time are handled: packages and drivers reach the hub before the trucks
+# ready at that time take them.
+ARRIVAL = 0
+DELIVERY = 1
+RETURN = 2
+READY = 3
+
+
+# A driver leaving the hub with a new truck after bringing back the one before.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class Handoff:
+    __slots__ = ("time", "driver", "from_truck_id", "to_truck_id")
+
+    def __init__(self, time_: datetime.datetime, driver, from_truck_id, to_truck_id):
+        self.time = time_
+        self.driver = driver
+        self.from_truck_id = from_truck_id
+        self.to_truck_id = to_truck_id
+
+    def __repr__(self):
+        return "Handoff(" + self.time.strftime("%H:%M") + ", driver " + str(self.driver) + ", truck " + \
+            str(self.from_truck_id) + " -> " + str(self.to_truck_id) + ")"
+
+
+# Outcome of simulate_day. routes maps a truck id to its (route, return_time) as generate_route returns them,
+# dispatch_times and drivers to when each truck left and who drove it. The status changes are three parallel lists in
+# the order they happened: the time, the package id and the PackageStatus the package moved to.
+# Time Complexity: O(1)
+# Space Complexity: O(E)
+class SimulationResult:
+    def __init__(self):
+        self.routes: dict[int, tuple[list, datetime.datetime]] = {}
+        self.dispatch_times: dict[int, datetime.datetime] = {}
+        self.drivers: dict[int, int] = {}
+        self.handoffs: list[Handoff] = []
+        self.status_times: list[datetime.datetime] = []
+        self.status_package_ids: list[int] = []
+        self.statuses: list[PackageStatus] = []
+        self.events = 0
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def return_time(self, truck_id) -> datetime.datetime:
+        return self.routes[truck_id][1]
+
+    # Time Complexity: O(E)
+    # Space Complexity: O(E)
+    def transitions(self) -> list[tuple[datetime.datetime, int, PackageStatus]]:
+        return list(zip(self.status_times, self.status_package_ids, self.statuses))
+
+
+# Runs the day. schedule is a list of (truck_id, start) pairs where start is the earliest departure datetime, the id
+# of another scheduled truck whose driver takes this truck when it is back, or None to leave once every package has
+# arrived, at day_start at the earliest. packages maps a truck id to the package ids it carries and arrivals lists
+# (time, package id) pairs of packages that reach the hub during the day. route(truck_id, dispatch_time) routes a
+# truck and returns its route and return time together with (delivery time, package id) pairs in delivery order.
+# Raises ValueError for a truck that waits for an unscheduled truck or one that can never leave.
+# Time Complexity: O(E log (T + A)) [plus routing]
+# Space Complexity: O(E)
+def simulate_day(schedule: list[tuple], drivers, packages: dict[int, list[int]],
+                 arrivals: list[tuple[datetime.datetime, int]], route: Callable,
+                 day_start: datetime.datetime = datetime.datetime(1, 1, 1, 8)) -> SimulationResult:
+    scheduled = {truck_id for truck_id, _ in schedule}
+    for truck_id, start in schedule:
+        if start is not None and not isinstance(start, datetime.datetime) and start not in scheduled:
+            raise ValueError("Truck " + str(truck_id) + " waits for truck " + str(start) +
+                             ", which is not in the schedule")
+
+    result = SimulationResult()
+    events = []  # (time, kind, sequence, truck id or package id, delivery index)
+    sequence = 0
+    blockers = {truck_id: 0 for truck_id in scheduled}  # start times, trucks and arrivals a truck still waits for
+    successors: dict[int, list[int]] = {}  # truck id -> trucks that take its driver, in schedule order
+    holding: dict[int, int] = {}  # package id -> truck that does not leave before the package arrives
+    assigned: dict[int, int] = {}  # truck id -> driver handed over to it before it is ready
+    last_truck: dict[int, Optional[int]] = {driver: None for driver in range(1, max(1, drivers) + 1)}
+    free_drivers = list(last_truck)
+    waiting = []  # (ready time, truck id) of trucks ready to leave without a driver
+    deliveries: dict[int, list[tuple]] = {}
+    status_times, status_package_ids, statuses = result.status_times, result.status_package_ids, result.statuses
+
+    for truck_id, start in schedule:
+        if start is None:
+            start = day_start
+            for package_id in packages.get(truck_id, ()):
+                holding[package_id] = truck_id
+        if isinstance(start, datetime.datetime):
+            blockers[truck_id] += 1
+            heapq.heappush(events, (start, READY, sequence, truck_id, 0))
+            sequence += 1
+        else:
+            blockers[truck_id] += 1
+            successors.setdefault(start, []).append(truck_id)
+    for time_, package_id in arrivals:
+        truck_id = holding.get(package_id)
+        if truck_id is not None:
+            blockers[truck_id] += 1
+        heapq.heappush(events, (time_, ARRIVAL, sequence, package_id, 0))
+        sequence += 1
+
+    def dispatch(truck_id, driver, now):
+        nonlocal sequence
+        if last_truck[driver] is not None:
+            result.handoffs.append(Handoff(now, driver, last_truck[driver], truck_id))
+        last_truck[driver] = truck_id
+        result.dispatch_times[truck_id] = now
+        result.drivers[truck_id] = driver
+        loaded = packages.get(truck_id, ())
+        status_times.extend([now] * len(loaded))
+        status_package_ids.extend(loaded)
+        statuses.extend([PackageStatus.EN_ROUTE] * len(loaded))
+        truck_route, return_time, truck_deliveries = route(truck_id, now)
+        result.routes[truck_id] = (truck_route, return_time)
+        deliveries[truck_id] = truck_deliveries
+        if truck_deliveries:
+            heapq.heappush(events, (truck_deliveries[0][0], DELIVERY, sequence, truck_id, 0))
+        else:
+            heapq.heappush(events, (return_time, RETURN, sequence, truck_id, 0))
+        sequence += 1
+
+    def unblock(truck_id, now):
+        blockers[truck_id] -= 1
+        if blockers[truck_id] > 0:
+            return
+        if truck_id in assigned:
+            dispatch(truck_id, assigned.pop(truck_id), now)
+        elif free_drivers:
+            dispatch(truck_id, heapq.heappop(free_drivers), now)
+        else:
+            heapq.heappush(waiting, (now, truck_id))
+
+    while events:
+        now, kind, _, key, index = heapq.heappop(events)
+        result.events += 1
+        if kind == DELIVERY:
+            truck_deliveries = deliveries[key]
+            status_times.append(now)
+            status_package_ids.append(truck_deliveries[index][1])
+            statuses.append(PackageStatus.DELIVERED)
+            if index + 1 < len(truck_deliveries):
+                heapq.heappush(events, (truck_deliveries[index + 1][0], DELIVERY, sequence, key, index + 1))
+            else:
+                heapq.heappush(events, (result.return_time(key), RETURN, sequence, key, 0))
+                del deliveries[key]
+            sequence += 1
+        elif kind == RETURN:
+            driver = result.drivers[key]
+            following = successors.pop(key, [])
+            # the driver takes the first truck waiting for this one that can leave now, else a truck that is ready
+            # and waits for any driver, else the first truck waiting for this one without a driver handed to it yet
+            ready = [truck_id for truck_id in following if blockers[truck_id] == 1 and truck_id not in assigned]
+            blocked = [truck_id for truck_id in following if blockers[truck_id] > 1 and truck_id not in assigned]
+            if ready:
+                assigned[ready[0]] = driver
+            elif waiting:
+                dispatch(heapq.heappop(waiting)[1], driver, now)
+            elif blocked:
+                assigned[blocked[0]] = driver
+            else:
+                heapq.heappush(free_drivers, driver)
+            for truck_id in following:
+                unblock(truck_id, now)
+            while free_drivers and waiting:
+                dispatch(heapq.heappop(waiting)[1], heapq.heappop(free_drivers), now)
+        elif kind == ARRIVAL:
+            truck_id = holding.pop(key, None)
+            if truck_id is not None:
+                unblock(truck_id, now)
+        else:
+            unblock(key, now)
+
+    stuck = sorted(scheduled - result.dispatch_times.keys())
+    if stuck:
+        raise ValueError("Circular or missing truck dependencies in schedule, trucks never dispatched: " + str(stuck))
+    return result
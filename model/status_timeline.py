@@ -0,0 +1,120 @@
+import datetime
+from typing import Optional
+
+import numpy
+
+from model.clock import format_clock, to_clock
+from model.package import PackageStatus, format_deadline
+
+"""
+Event timeline of a routed day. Dispatch and delivery times of every package are stored once as sorted arrays on the
+clock of model.clock, so the number of packages at the hub, en route or delivered at any time is two binary searches,
+and the full status table is assembled from text rendered once per package instead of being printed line by line.
+The text is rendered on the first format_statuses call, so counts, ids and status rows never format anything.
+"""
+
+# status codes in the order of PackageStatus
+HUB = PackageStatus.HUB.value
+EN_ROUTE = PackageStatus.EN_ROUTE.value
+DELIVERED = PackageStatus.DELIVERED.value
+
+
+# Time Complexity: O(N log N) [sorting the event times]
+# Space Complexity: O(N)
+class StatusTimeline:
+
+    # Raises ValueError if a package has not been routed yet.
+    # Time Complexity: O(N log N)
+    # Space Complexity: O(N)
+    def __init__(self, packages):
+        packages = sorted(packages, key=lambda p: p.id)
+        unrouted = [p.id for p in packages if p.dispatched_at is None or p.delivered_at is None]
+        if unrouted:
+            raise ValueError("Packages without a route: " + str(unrouted[:10]))
+
+        self.ids = numpy.array([p.id for p in packages], dtype=numpy.int64)
+        self.truck_ids = numpy.array([p.truck.id for p in packages], dtype=numpy.int32)
+        self.dispatched = numpy.array([p.dispatched_at for p in packages], dtype=numpy.int64)
+        self.delivered = numpy.array([p.delivered_at for p in packages], dtype=numpy.int64)
+        self.sorted_dispatched = numpy.sort(self.dispatched)
+        self.sorted_delivered = numpy.sort(self.delivered)
+
+        self.packages = packages  # kept until their text is rendered
+        # the parts of each package's status text that do not depend on the query time, see render
+        self.headers: Optional[list[str]] = None
+        self.bodies: Optional[list[str]] = None
+        self.status_lines: Optional[list[tuple[str, str, str]]] = None
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def __len__(self):
+        return len(self.ids)
+
+    # Number of packages per status at the given time. A package is en route once the time is after its dispatch
+    # and delivered once the time is after its delivery, as in Package.print_package_status.
+    # Time Complexity: O(log N)
+    # Space Complexity: O(1)
+    def counts(self, time_: datetime.datetime) -> dict[PackageStatus, int]:
+        at = to_clock(time_)
+        dispatched = int(numpy.searchsorted(self.sorted_dispatched, at, side="left"))
+        delivered = int(numpy.searchsorted(self.sorted_delivered, at, side="left"))
+        return {PackageStatus.HUB: len(self.ids) - dispatched,
+                PackageStatus.EN_ROUTE: dispatched - delivered,
+                PackageStatus.DELIVERED: delivered}
+
+    # Status code of every package at the given time, in package id order.
+    # Time Complexity: O(N) [vectorized]
+    # Space Complexity: O(N)
+    def statuses(self, time_: datetime.datetime) -> numpy.ndarray:
+        at = to_clock(time_)
+        return HUB + (at > self.dispatched).astype(numpy.int8) + (at > self.delivered).astype(numpy.int8)
+
+    # Ids of the packages with the given status at the given time.
+    # Time Complexity: O(N) [vectorized]
+    # Space Complexity: O(N)
+    def package_ids(self, status: PackageStatus, time_: datetime.datetime) -> numpy.ndarray:
+        return self.ids[self.statuses(time_) == status.value]
+
+    # Renders the parts of every package's status text that do not depend on the query time.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def render(self):
+        self.headers = ["Package " + str(p.id) + " at " for p in self.packages]
+        self.bodies = [render_body(p) for p in self.packages]
+        self.status_lines = [render_status_lines(p) for p in self.packages]
+        self.packages = None
+
+    # The text Package.print_package_status prints for every package, built as a single string.
+    # Time Complexity: O(N), plus O(N) rendering on the first call
+    # Space Complexity: O(N)
+    def format_statuses(self, time_: datetime.datetime) -> str:
+        if self.headers is None:
+            self.render()
+        at = time_.strftime("%H:%M")
+        statuses = self.statuses(time_).tolist()
+        return "".join([header + at + body + lines[status - 1]
+                        for header, body, lines, status in zip(self.headers, self.bodies, self.status_lines,
+                                                               statuses)])
+
+
+# The lines of print_package_status between the "Package ... at" line and the status line.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def render_body(package) -> str:
+    body = "\nDelivery address: " + str(package.address) + ", " + str(package.city) + ", " + str(package.zip) + \
+           "\nWeight: " + str(package.weight) + \
+           "\nDeadline: " + format_deadline(package.deadline) + "\n"
+    if package.notes != "":
+        body += "Notes: " + str(package.notes) + "\n"
+    return body + "Dispatch: Truck " + str(package.truck.id) + ", leaving warehouse at " + \
+        format_clock(package.truck.dispatch_at) + "\n"
+
+
+# The status line for each of HUB, EN_ROUTE and DELIVERED.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def render_status_lines(package) -> tuple[str, str, str]:
+    delivered = format_clock(package.delivered_at)
+    return ("Status: Warehouse; delivery scheduled for " + delivered + "\n\n",
+            "Status: En Route on truck " + str(package.truck.id) + "; delivery scheduled for " + delivered + "\n\n",
+            "Status: Delivered at " + delivered + "\n\n")
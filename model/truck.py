@@ -1,13 +1,19 @@
-from model.package import Package
+from typing import Optional
 
+from model.package import Package, clock_property
 
+
+# dispatch_at is the departure on the clock of model.clock, dispatch_time the same as a datetime.
 # Time Complexity: O(1)
 # Space Complexity: O(1)
 class Truck:
+    __slots__ = ("id", "packages", "dispatch_at")
     MAXIMUM_PACKAGES = 16
     MILES_PER_HOUR = 18
 
     def __init__(self, id_):
         self.id = id_
         self.packages: list[Package] = []
-        self.dispatch_time = None
+        self.dispatch_at: Optional[int] = None
+
+    dispatch_time = clock_property("dispatch_at")
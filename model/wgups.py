@@ -1,11 +1,30 @@
 import datetime
 import string
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from typing import Optional
 
-from model.chaining_hash_table import ChainingHashTable
-from model.location import Location, get_distance
-from model.package import Package, PackagePriority
+import numpy
+
+from model.assignment import LoadPlan, assign_packages
+from model.clock import NO_DEADLINE, clock_array, format_clock, to_clock, to_datetime
+from model.events import AddressChange, Delay, NewPackage
+from model.held_karp import DEFAULT_MAX_LOCATIONS, ExactSolver
+from model.local_search import ImprovementResult, improve_route
+from model.location import Location, get_distance, nearest_candidates, normalize_address
+from model.open_addressing_hash_table import OpenAddressingHashTable
+from model.package import Package, PackagePriority, PackageStatus
+from model.package_store import PackageStore
+from model.partition import partition_packages
+from model.route_cache import START_BUCKET, CachedRoute, RouteCache
+from model.routing import init_worker, plan_truck, route_order, travel_time
+from model.simulation import SimulationResult, simulate_day
+from model.status_timeline import StatusTimeline
 from model.truck import Truck
+from util import instrumentation
+from util.distance_store import SharedDistanceMatrix
+from util.instrumentation import timed
+from util.plan_snapshot import PlanSnapshot, save_plan
+from util.reporter import ConsoleReporter, LoadRecord, Reporter, RouteRecord, StatusReport
 
 
 # The main class for the programs. Integrates all objects and data structures to manage the truck routes.
@@ -13,57 +32,244 @@ from model.truck import Truck
 # Space Complexity: O(N^2) [each additional location increases number of connections exponentially]
 class WGUPS:
 
-    # Time Complexity: O(N) [number of packages + number of trucks]
+    # Time Complexity: O(N) [number of packages + number of locations + number of trucks]
     # Space Complexity: O(N^2) [each additional location N must have N distances to other locations]
-    def __init__(self, locations: list[Location], packages: list[Package], trucks):
-        self.locations = locations  # Space Complexity: O(N^2)
-        self.packages = ChainingHashTable()
-        for p in packages:
-            self.packages.insert_(p.id, p)
-        self.time = datetime.time(8, 00)
+    # packages is either a list of Package objects, kept in a hash table, or a PackageStore, which is used as the
+    # package table directly. Up to route_cache_size generated routes are kept for reuse, see generate_route. Stop
+    # sets of up to exact_locations distinct locations are routed exactly, see use_exact_routing.
+    # Loads, routes, status tables and notices are handed to reporter, which prints them as the interactive program has
+    # unless another reporter from util.reporter is given.
+    @timed()
+    def __init__(self, locations: list[Location], distances: numpy.ndarray, packages, trucks, route_cache_size=128,
+                 reporter: Optional[Reporter] = None, exact_locations=DEFAULT_MAX_LOCATIONS):
+        self.reporter = reporter if reporter is not None else ConsoleReporter()
+        self.locations = locations
+        self.distances = distances  # Space Complexity: O(N^2)
         self.trucks = [Truck(i + 1) for i in range(trucks)]
+        # normalized address -> location id, so packages are matched to a location once instead of on every lookup
+        self.address_index = {normalize_address(loc.address): loc.id for loc in locations}
+        self.unresolved_packages: list[Package] = []
+        if isinstance(packages, PackageStore):
+            self.packages = packages
+            packages.trucks = self.trucks
+            for p in packages:
+                self.resolve_location(p)
+        else:
+            self.packages = OpenAddressingHashTable()
+            for p in packages:
+                self.resolve_location(p)
+                self.packages.insert_(p.id, p)
+        if self.unresolved_packages:
+            self.reporter.notice("No location found for package(s): " +
+                                 ", ".join(str(p.id) + " (" + str(p.address) + ")" for p in self.unresolved_packages))
+        self.time = datetime.time(8, 00)
+        self.improvements: dict[int, ImprovementResult] = {}
+        self.shared_distances: Optional[SharedDistanceMatrix] = None  # created by the first generate_routes call
+        self.timeline: Optional[StatusTimeline] = None  # built on the first status query after routing
+        self.routes: dict[int, tuple[list, datetime.datetime]] = {}  # last planned (route, return time) per truck
+        self.candidates: Optional[numpy.ndarray] = None  # per-location nearest candidate lists, see use_candidate_lists
+        self.exact_candidates = True
+        self.route_cache = RouteCache(route_cache_size)
+        self.exact_solver: Optional[ExactSolver] = None
+        self.use_exact_routing(exact_locations)
+
+    # Restores a plan loaded by util.plan_snapshot.load_plan, so it can be re-planned or take events. The packages stay
+    # in the snapshot's store; every truck gets back its load order, dispatch time and route.
+    # Time Complexity: O(N + R) [N packages, R route entries]
+    # Space Complexity: O(N + R)
+    @classmethod
+    def from_snapshot(cls, locations: list[Location], distances: numpy.ndarray, snapshot: PlanSnapshot, **options):
+        wgups = cls(locations, distances, snapshot.packages, len(snapshot.trucks), **options)
+        for truck, saved in zip(wgups.trucks, snapshot.trucks):
+            truck.dispatch_at = saved.dispatch_at
+            truck.packages = snapshot.truck_packages(truck.id)
+        wgups.routes = snapshot.routes()
+        return wgups
+
+    # Saves the packages, truck loads and routes of the day to path, see util.plan_snapshot.
+    # Time Complexity: O(N log N + R)
+    # Space Complexity: O(N + R)
+    def save_plan(self, path):
+        save_plan(path, self.packages, self.trucks, self.routes)
 
     # Time Complexity: O(1)
     # Space Complexity: O(1)
     def load_truck(self, truck_id, package_id, priority: PackagePriority = PackagePriority.LOW):
         package = self.packages.lookup_(package_id)
+        if package.location_id is None:
+            raise ValueError("Package " + str(package_id) + " has no location matching " + str(package.address))
+        if len(self.trucks[truck_id - 1].packages) >= Truck.MAXIMUM_PACKAGES:
+            raise ValueError("Truck " + str(truck_id) + " is full (" + str(Truck.MAXIMUM_PACKAGES) + " packages)")
+        self.timeline = None
         package.priority = priority
         package.truck = self.trucks[truck_id - 1]
         self.trucks[truck_id - 1].packages.append(package)
-        print("\tTruck " + str(truck_id) + " loaded with package " + str(package_id))
+        record = LoadRecord(truck_id, package_id, priority)
+        self.reporter.load(record)
+        return record
 
-    # Time Complexity: O(N)
+    # Loads every resolved package that is not on a truck yet, following the constraints in the package notes (see
+    # model.assignment). drivers is the number of trucks that can be out at once. partition=True loads one geographic
+    # cluster per truck instead (see model.partition), which keeps each truck's stops close together on large days.
+    # Returns the LoadPlan, whose schedule can be passed to generate_routes.
+    # Time Complexity: O(G * T) [G package groups, T trucks], times the k-medoids iterations when partitioning
+    # Space Complexity: O(N)
+    @timed()
+    def auto_load(self, start_time: datetime.datetime = datetime.datetime(1, 1, 1, 8), drivers=2,
+                  partition=False) -> LoadPlan:
+        packages = [p for p in self.packages if p.truck is None and p.location_id is not None]
+        loader = partition_packages if partition else assign_packages
+        plan = loader(packages, len(self.trucks), self.distances, self.locations[0].id, start_time, drivers)
+        for truck_id, loads in plan.loads.items():
+            for package_id, priority in loads:
+                self.load_truck(truck_id, package_id, priority)
+        if plan.at_risk:
+            self.reporter.notice("Package(s) that may miss their deadline: " + ", ".join(str(i) for i in plan.at_risk))
+        if plan.unassigned:
+            self.reporter.notice("No room on any truck for package(s): " + ", ".join(str(i) for i in plan.unassigned))
+        return plan
+
+    # Precomputes the k nearest locations of every location and routes with them from then on: nearest neighbor
+    # checks a stop's candidates before scanning every package. exact=True keeps routes identical to the full scan;
+    # exact=False takes the first candidate found and also restricts local search to candidate moves, trading some
+    # mileage for speed on large networks. k=0 goes back to full scans.
+    # Time Complexity: O(L^2) [L locations]
+    # Space Complexity: O(L * k)
+    def use_candidate_lists(self, k=16, exact=True):
+        self.candidates = nearest_candidates(self.distances, k) if k > 0 else None
+        self.exact_candidates = exact
+
+    # Routes every priority segment with at most max_locations distinct locations by Held-Karp (see model.held_karp)
+    # instead of nearest neighbor, as long as all its packages are available when the segment starts and the
+    # shortest order meets every deadline; the last segment also counts the drive back to the hub. Solved location
+    # sets are memoized across trucks and re-plans. max_locations=0 always uses nearest neighbor; values outside
+    # 0 to model.held_karp.MAX_LOCATIONS raise ValueError.
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def use_exact_routing(self, max_locations=DEFAULT_MAX_LOCATIONS):
+        self.exact_solver = ExactSolver(self.distances, max_locations) if max_locations != 0 else None
+
+    # Matches the package address against the address index and stores the location id on the package. Packages
+    # without a match are kept in unresolved_packages so they can be reported rather than routed to nowhere.
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def resolve_location(self, package: Package):
+        if instrumentation.enabled:
+            instrumentation.count("address resolutions")
+        package.location_id = self.address_index.get(normalize_address(package.address))
+        if package.location_id is None:
+            self.unresolved_packages.append(package)
+        return package.location_id
+
+    # Time Complexity: O(1)
     # Space Complexity: O(1)
     def get_location_id(self, package: Package):
-        for loc in self.locations:
-            if loc.address == package.address:
-                return loc.id
+        if package.location_id is None:
+            raise ValueError("Package " + str(package.id) + " has no location matching " + str(package.address))
+        return package.location_id
 
-    # Time Complexity: O(N)
+    # Time Complexity: O(1)
     # Space Complexity: O(1)
     def get_location(self, package: Package):
-        for loc in self.locations:
-            if loc.address == package.address:
-                return loc
+        return self.locations[self.get_location_id(package)]
 
     # Time Complexity: O(1)
     # Space Complexity: O(1)
     def get_distance(self, location_id1, location_id2):
-        return get_distance(self.locations, location_id1, location_id2)
+        return get_distance(self.distances, location_id1, location_id2)
 
-    # Splits the list of packages by priority level, then runs the nearest neighbor algorithm on each list.
-    # Time Complexity: O(N^2)
+    # Splits the list of packages by priority level, then runs the nearest neighbor algorithm on each list. With
+    # improve=True each priority segment is then shortened by local search within time_budget seconds and
+    # max_iterations move evaluations; the mileage before and after is kept in self.improvements[truck_id].
+    # Routes without improve are looked up in the route cache first (see route_key), and a hit only shifts the cached
+    # delivery times to start_time. Routing runs on the integer clock of model.clock; only the return time handed
+    # back is a datetime.
+    # Time Complexity: O(N^2) [O(N) on a cache hit]
     # Space Complexity: O(N)
-    def generate_route(self, truck_id, start_time: datetime):
+    @timed()
+    def generate_route(self, truck_id, start_time: datetime, improve=False, time_budget=0.1, max_iterations=100000):
 
-        self.trucks[truck_id - 1].dispatch_time = start_time
+        self.timeline = None
+        start = to_clock(start_time)
+        self.trucks[truck_id - 1].dispatch_at = start
+        for package in self.trucks[truck_id - 1].packages:
+            package.dispatched_at = start
+
+        # local search stops on a time budget, so its result is not repeatable and is not cached
+        key = None if improve else self.route_key(truck_id, start)
+        cached = None if key is None else self.route_cache.get(key, start, self.trucks[truck_id - 1].packages)
+        if cached is not None:
+            for package in self.trucks[truck_id - 1].packages:
+                package.delivered_at = start + cached.delivery_offsets[package.id]
+            route, time = list(cached.route), to_datetime(start + cached.return_offset)
+            self.routes[truck_id] = (route, time)
+            self.reporter.route(RouteRecord(truck_id, start_time, route, time))
+            return route, time
+
+        high_priority, medium_priority, low_priority = self.priority_segments(truck_id)
+        hub = self.locations[0].id
+
+        high_priority_route, time = self.nearest_neighbor(high_priority, hub, start,
+                                                          None if medium_priority or low_priority else hub)
+        medium_priority_route, time = self.nearest_neighbor(medium_priority, high_priority_route[-1][0], time,
+                                                            None if low_priority else hub)
+        low_priority_route, time = self.nearest_neighbor(low_priority, medium_priority_route[-1][0], time, hub)
+
+        if improve:
+            (high_priority_route, medium_priority_route, low_priority_route), time, self.improvements[truck_id] = \
+                improve_route(self.distances, [high_priority_route, medium_priority_route, low_priority_route],
+                              {p.id: p for p in self.trucks[truck_id - 1].packages}, self.locations[0].id,
+                              start, time_budget, max_iterations,
+                              None if self.exact_candidates else self.candidates)
+
+        route = high_priority_route + medium_priority_route + low_priority_route
+        back_to_hq = self.get_distance(route[-1][0], 0)
+        route.append((0, "back_to_hq", back_to_hq))
+        time = time + travel_time(back_to_hq)
 
+        if key is not None:
+            self.route_cache.put(key, CachedRoute(list(route), start, {p.id: p.delivered_at - start
+                                                                       for p in self.trucks[truck_id - 1].packages},
+                                                  time - start))
+        time = to_datetime(time)
+        self.routes[truck_id] = (route, time)
+        self.reporter.route(RouteRecord(truck_id, start_time, route, time))
+        return route, time
+
+    # Cache key of a truck's route: every package in load order with its location, priority and available time, so a
+    # changed address, priority or availability gives a new key and the old route is never returned. Nearest neighbor
+    # routes only depend on the start time through availability times, so it is part of the key only when a package
+    # has one. The exact solver turns down orders that miss a deadline, so with it the route also depends on the
+    # deadlines and the start time, and both are in the key. The start time is keyed by its
+    # model.route_cache.START_BUCKET, so a route is reused for another start in the same bucket when it still fits
+    # the packages there (see CachedRoute.fits). The routing mode is included because approximate candidate lists and
+    # exact routing can give another route.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def route_key(self, truck_id, start_time: int):
+        exact = self.exact_solver is not None
+        packages = tuple((p.id, p.location_id, p.priority, p.available_at, p.deadline_at if exact else None)
+                         for p in self.trucks[truck_id - 1].packages)
+        delayed = any(p[3] is not None for p in packages)
+        mode = (None if self.candidates is None or self.exact_candidates else self.candidates.shape[1],
+                None if self.exact_solver is None else self.exact_solver.max_locations)
+        return packages, self.locations[0].id, start_time // START_BUCKET if delayed or exact else None, mode
+
+    # Hits, misses, evictions and size of the route cache.
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def route_cache_info(self) -> dict:
+        return self.route_cache.info()
+
+    # Splits the truck's packages into high, medium and low priority lists in load order.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def priority_segments(self, truck_id):
         high_priority = []
         medium_priority = []
         low_priority = []
 
         for package in self.trucks[truck_id - 1].packages:
-            package.dispatched_time = start_time
             if package.priority == PackagePriority.HIGH:
                 high_priority.append(package)
             elif package.priority == PackagePriority.MEDIUM:
@@ -79,73 +285,255 @@ class WGUPS:
                 else:
                     low_priority.append(package)
 
-        high_priority_route, time = self.nearest_neighbor(high_priority, self.locations[0].id, start_time)
-        medium_priority_route, time = self.nearest_neighbor(medium_priority, high_priority_route[-1][0], time)
-        low_priority_route, time = self.nearest_neighbor(low_priority, medium_priority_route[-1][0], time)
+        return high_priority, medium_priority, low_priority
 
-        route = high_priority_route + medium_priority_route + low_priority_route
-        back_to_hq = self.get_distance(route[-1][0], 0)
-        route.append((0, "back_to_hq", back_to_hq))
-        time = time + datetime.timedelta(minutes=back_to_hq / Truck.MILES_PER_HOUR * 60)
+    # Plans several trucks at once on a pool of worker processes. schedule is a list of (truck_id, start) pairs where
+    # start is either a departure datetime or the id of another truck in the schedule, in which case the truck leaves
+    # when that truck is back at the hub. Workers only receive location-id and availability arrays per truck; the
+    # distance matrix is copied once into shared memory that every worker attaches to. Results are applied to the
+    # packages in schedule order, so the outcome is the same as calling generate_route for each truck in turn.
+    # Returns {truck_id: (route, return_time)}.
+    # Time Complexity: O(T * N^2 / W) [T trucks of N packages on W workers]
+    # Space Complexity: O(T * N)
+    @timed()
+    def generate_routes(self, schedule: list[tuple], max_workers=None):
+        jobs = {}
+        for truck_id, start in schedule:
+            segments = self.priority_segments(truck_id)
+            jobs[truck_id] = [(numpy.array([self.get_location_id(p) for p in segment], dtype=numpy.intp),
+                               clock_array(p.available_at for p in segment),
+                               clock_array((p.deadline_at for p in segment), NO_DEADLINE)) for segment in segments]
+        scheduled = {truck_id for truck_id, _ in schedule}
+        for truck_id, start in schedule:
+            if not isinstance(start, datetime.datetime) and start not in scheduled:
+                raise ValueError("Truck " + str(truck_id) + " waits for truck " + str(start) +
+                                 ", which is not in the schedule")
 
-        return route, time
+        plans = {}
+        start_times = {}
+        if self.shared_distances is None:
+            self.shared_distances = SharedDistanceMatrix(self.distances)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                                 initargs=(self.shared_distances.handle, self.candidates, self.exact_candidates,
+                                           0 if self.exact_solver is None else self.exact_solver.max_locations)) \
+                as executor:
+            running = {}
+            waiting = list(schedule)
+            while waiting or running:
+                # submit every truck whose start time is known
+                for truck_id, start in list(waiting):
+                    if isinstance(start, datetime.datetime):
+                        start_times[truck_id] = to_clock(start)
+                    elif start in plans:
+                        start_times[truck_id] = plans[start][2]
+                    else:
+                        continue
+                    waiting.remove((truck_id, start))
+                    future = executor.submit(plan_truck, jobs[truck_id], self.locations[0].id, start_times[truck_id])
+                    running[future] = truck_id
+                if not running:
+                    raise ValueError("Circular truck dependencies in schedule: " + str(waiting))
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    plans[running.pop(future)] = future.result()
 
-    # Time Complexity: O(N^2) [number of packages * number of packages / 2]
-    # Space Complexity: O(N)
-    def nearest_neighbor(self, packages: list[Package], start_location_id, start_time: datetime):
-        remaining_packages = packages  # Space: O(N) [n = number of packages]
-        route = []  # Space: O(N) [n = number of packages]
-        current_time = start_time
-        current_location_id = start_location_id
-
-        if len(remaining_packages) == 0:
-            route = [(current_location_id, None, 0)]
-            return route, current_time
-
-        # loop through all remaining packages to find the one that is closest to the current location. when a package
-        # is found, return that package id to the route as well as distance and time, then remove
-        # that package from the remaining packages and keep looping until the list is empty.
-        # Time Complexity: O(N^2) [number of packages * number of packages/2]
-        # Space Complexity: O(N) [number of packages to route]
-        while len(remaining_packages) > 0:
-
-            next_package: Optional[Package] = None
-            next_location_id = None
-
-            # loop through each package to find the closest location
-            for package in remaining_packages:  # Time: O(N) [n = number of packages]
-                if package.available_time and package.available_time > current_time:
-                    # This conditional stops package #9 with the incorrect address from being updated until 10:20am
-                    # per the task assumptions
-                    continue
-                location_id = self.get_location_id(package)
-                if next_package is None:
-                    next_package = package
-                    next_location_id = self.get_location_id(next_package)
-                    continue
-                if location_id == current_location_id:
-                    package.delivered_time = current_time
-                    route.append((self.get_location_id(package), package.id, 0))
-                    remaining_packages.remove(package)
+        self.timeline = None
+        routes = {}
+        for truck_id, _ in schedule:
+            truck = self.trucks[truck_id - 1]
+            truck.dispatch_at = start_times[truck_id]
+            for package in truck.packages:
+                package.dispatched_at = start_times[truck_id]
+
+            segment_results, back_to_hq, return_time = plans[truck_id]
+            return_time = to_datetime(return_time)
+            route = []
+            location_id = self.locations[0].id
+            for segment, result in zip(self.priority_segments(truck_id), segment_results):
+                if result is None:
+                    route.append((location_id, None, 0))
                     continue
-                if self.get_distance(current_location_id, location_id) \
-                        < self.get_distance(current_location_id, next_location_id):
-                    next_package = package
-                    next_location_id = self.get_location_id(package)
+                route += self.segment_route(segment, *result)
+                location_id = route[-1][0]
+            route.append((0, "back_to_hq", back_to_hq))
+            routes[truck_id] = (route, return_time)
+            self.reporter.route(RouteRecord(truck_id, truck.dispatch_time, route, return_time))
+        self.routes.update(routes)
+        return routes
 
-            # we have the closest location, now update the current location, remove the package from the remaining
-            # packages, and update the delivery time and miles traveled
+    # Runs the day as a discrete-event simulation (see model.simulation): each truck in schedule is routed with
+    # generate_route when it actually leaves, which is once its start has come and one of the drivers is free. start
+    # is a departure datetime, the id of a truck whose driver takes this one when it is back, or None to leave as soon
+    # as a driver is free and every package on the truck is available, not before day_start. Returns the
+    # SimulationResult with the routes, dispatch times, driver hand-offs and status changes of the day.
+    # Time Complexity: O(E log T) [E events, T trucks] plus O(T * N^2) routing
+    # Space Complexity: O(E)
+    @timed()
+    def simulate(self, schedule: list[tuple], drivers=2, improve=False,
+                 day_start: datetime.datetime = datetime.datetime(1, 1, 1, 8)) -> SimulationResult:
+        packages = {truck_id: [p.id for p in self.trucks[truck_id - 1].packages] for truck_id, _ in schedule}
+        arrivals = [(p.available_time, p.id) for truck_id, _ in schedule for p in self.trucks[truck_id - 1].packages
+                    if p.available_time is not None]
 
-            distance = self.get_distance(current_location_id, next_location_id)
-            route.append((next_location_id, next_package.id, distance))
-            minutes_to_travel = distance / Truck.MILES_PER_HOUR * 60
-            current_time = current_time + datetime.timedelta(minutes=minutes_to_travel)
-            next_package.delivered_time = current_time
+        def route(truck_id, dispatch_time):
+            truck_route, return_time = self.generate_route(truck_id, dispatch_time, improve=improve)
+            delivered = {p.id: p.delivered_time for p in self.trucks[truck_id - 1].packages}
+            return truck_route, return_time, [(delivered[entry[1]], entry[1]) for entry in truck_route
+                                              if entry[1] in delivered]
 
-            current_location_id = next_location_id
-            remaining_packages.remove(next_package)  # Time Complexity: O(N)
+        return simulate_day(schedule, drivers, packages, arrivals, route, day_start)
 
-        return route, current_time
+    # Applies a NewPackage, AddressChange or Delay event and re-plans the remaining route of the truck carrying the
+    # package. Returns the truck's new (route, return_time). The event is checked against the truck before any package
+    # is changed, so a rejected event leaves the packages and the truck loads as they were.
+    # Time Complexity: O(R^2) [R stops left on the truck]
+    # Space Complexity: O(N)
+    def apply_event(self, event):
+        if isinstance(event, NewPackage):
+            package = event.package
+            truck_id = event.truck_id
+            self.check_replan(truck_id, event.time)
+            if len(self.trucks[truck_id - 1].packages) >= Truck.MAXIMUM_PACKAGES:
+                raise ValueError("Truck " + str(truck_id) + " is full (" + str(Truck.MAXIMUM_PACKAGES) + " packages)")
+            if self.resolve_location(package) is None:
+                self.unresolved_packages.remove(package)
+                raise ValueError("Package " + str(package.id) + " has no location matching " + str(package.address))
+            self.packages.insert_(package.id, package)
+            package = self.packages.lookup_(package.id)
+            package.available_time = event.time
+            self.load_truck(truck_id, package.id, event.priority)
+            package.dispatched_time = event.time
+        else:
+            package = self.packages.lookup_(event.package_id)
+            if package.truck is None:
+                raise ValueError("Package " + str(package.id) + " is not on a truck")
+            if package.delivered_at is not None and package.delivered_at <= to_clock(event.time):
+                raise ValueError("Package " + str(package.id) + " was delivered at " +
+                                 format_clock(package.delivered_at))
+            truck_id = package.truck.id
+            if not isinstance(event, (AddressChange, Delay)):
+                raise ValueError("Unknown event " + type(event).__name__)
+            self.check_replan(truck_id, event.time)
+            if isinstance(event, AddressChange):
+                address, city, zip_ = package.address, package.city, package.zip
+                package.address = event.address
+                package.city = city if event.city is None else event.city
+                package.zip = zip_ if event.zip is None else event.zip
+                if self.resolve_location(package) is None:
+                    self.unresolved_packages.remove(package)
+                    package.address, package.city, package.zip = address, city, zip_
+                    self.resolve_location(package)
+                    raise ValueError("No location found for address " + str(event.address))
+                # the truck learns the new address at the time of the event
+                if package.available_at is None or package.available_at < to_clock(event.time):
+                    package.available_time = event.time
+            else:
+                package.available_time = event.available_time
+        return self.replan_truck(truck_id, event.time, None if isinstance(event, NewPackage) else package.id)
+
+    # Raises ValueError unless the truck can be re-planned at at_time: it must have a route and not be back at the hub.
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def check_replan(self, truck_id, at_time: datetime.datetime):
+        truck = self.trucks[truck_id - 1]
+        if truck_id not in self.routes or truck.dispatch_at is None:
+            raise ValueError("Truck " + str(truck_id) + " has no route to re-plan")
+        at = to_clock(at_time)
+        return_time = self.routes[truck_id][1]
+        if at > truck.dispatch_at and at >= to_clock(return_time):
+            raise ValueError("Truck " + str(truck_id) + " is back at the hub since " + return_time.strftime("%H:%M"))
+
+    # Re-plans the stops a truck has not reached at at_time. Stops already delivered, and the stop the truck is
+    # driving to, are kept as they are; the rest of the truck's packages are routed again by priority segment from
+    # that stop, and the route of every other truck is left untouched. A truck that has not left yet is planned
+    # again from its dispatch time. When the stop the truck is driving to is that of package_id, the package an event
+    # changed, the truck still gets there but does not deliver it: the leg is kept as a stop without a package and
+    # the package is routed again with the others. The arrival at such a stop is taken as the time of the stop before
+    # it plus the leg when the truck is re-planned again.
+    # Time Complexity: O(R^2) [R stops left]
+    # Space Complexity: O(N)
+    @timed()
+    def replan_truck(self, truck_id, at_time: datetime.datetime, package_id=None):
+        self.check_replan(truck_id, at_time)
+        truck = self.trucks[truck_id - 1]
+        at = to_clock(at_time)
+        if at <= truck.dispatch_at:
+            return self.generate_route(truck_id, truck.dispatch_time)
+        route, return_time = self.routes[truck_id]
+
+        packages = {p.id: p for p in truck.packages}
+        frozen = []
+        location_id = self.locations[0].id
+        time = truck.dispatch_at
+        for entry in route:
+            # stops are kept up to and including the first one the truck is still driving to
+            if entry[1] == "back_to_hq" or time > at:
+                break
+            if entry[1] is None:
+                if entry[2]:
+                    frozen.append(entry)
+                    location_id, time = entry[0], time + travel_time(entry[2])
+                continue
+            package = packages.get(entry[1])
+            if package is None or package.delivered_at is None:
+                break
+            frozen.append(entry)
+            location_id, time = entry[0], package.delivered_at
+        if frozen and frozen[-1][1] == package_id and time > at:
+            frozen[-1] = (frozen[-1][0], None, frozen[-1][2])
+        # the truck may also have been driving back to the hub, which it now leaves again from where it would be
+        if time < at:
+            time = at
+
+        self.timeline = None
+        delivered = {entry[1] for entry in frozen}
+        route = list(frozen)
+        segments = [[p for p in segment if p.id not in delivered] for segment in self.priority_segments(truck_id)]
+        segments = [segment for segment in segments if segment]
+        for i, remaining in enumerate(segments):
+            segment_route, time = self.nearest_neighbor(remaining, location_id, time,
+                                                        self.locations[0].id if i == len(segments) - 1 else None)
+            route += segment_route
+            location_id = route[-1][0]
+
+        back_to_hq = self.get_distance(location_id, 0)
+        route.append((0, "back_to_hq", back_to_hq))
+        return_time = to_datetime(time + travel_time(back_to_hq))
+        self.routes[truck_id] = (route, return_time)
+        self.reporter.route(RouteRecord(truck_id, truck.dispatch_time, route, return_time))
+        return route, return_time
+
+    # Writes the delivery times from the routing engine onto the packages and builds the route entries.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def segment_route(self, packages: list[Package], order, legs, times):
+        route = []
+        for index, distance, delivered_at in zip(order, legs, times):
+            package = packages[index]
+            package.delivered_at = delivered_at
+            route.append((package.location_id, package.id, distance))
+        return route
+
+    # Routes the packages with the batched nearest neighbor engine: location ids and availability times are packed
+    # into arrays once, then each step picks the next stop with a single argmin over a row of the distance matrix, or
+    # from the candidate lists when use_candidate_lists is on. Small stop sets are routed exactly instead, see
+    # use_exact_routing; end_location_id is where the truck goes after the last package, counted by the exact solver.
+    # start_time and the time returned are on the integer clock of model.clock.
+    # Time Complexity: O(N^2) [N steps of one vectorized O(N) pass; O(N * K) with candidate lists]
+    # Space Complexity: O(N)
+    @timed()
+    def nearest_neighbor(self, packages: list[Package], start_location_id, start_time: int, end_location_id=None):
+        if len(packages) == 0:
+            return [(start_location_id, None, 0)], start_time
+
+        location_ids = numpy.array([self.get_location_id(p) for p in packages], dtype=numpy.intp)
+        available_times = clock_array(p.available_at for p in packages)
+        deadlines = None if self.exact_solver is None else clock_array((p.deadline_at for p in packages), NO_DEADLINE)
+        order, legs, times, current_time = route_order(self.distances, location_ids, available_times,
+                                                       start_location_id, start_time, self.candidates,
+                                                       self.exact_candidates, self.exact_solver, deadlines,
+                                                       end_location_id)
+        return self.segment_route(packages, order, legs, times), current_time
 
     # Time Complexity: O(1)
     # Space Complexity: O(1)
@@ -160,15 +548,57 @@ class WGUPS:
         except:
             print("Input error")
 
-    # Time Complexity: O(N log N) [packages.sort()]
-    # Space Complexity: O(N) [packages.sort()]
+    # Returns the status timeline of the routed packages, building it on first use after routing changed. Returns
+    # None while some packages are not routed yet.
+    # Time Complexity: O(N log N) when built, O(1) afterwards
+    # Space Complexity: O(N)
+    def status_timeline(self) -> Optional[StatusTimeline]:
+        if self.timeline is None:
+            try:
+                self.timeline = StatusTimeline(self.packages.get_all())
+            except ValueError:
+                return None
+        return self.timeline
+
+    # Number of packages at the hub, en route and delivered at the given time.
+    # Time Complexity: O(log N) once the timeline is built
+    # Space Complexity: O(1)
+    def get_status_counts(self, at_time: datetime.datetime) -> dict[PackageStatus, int]:
+        timeline = self.status_timeline()
+        if timeline is None:
+            raise ValueError("Status counts need every package to be routed")
+        return timeline.counts(at_time)
+
+    # Ids of the packages with the given status at the given time.
+    # Time Complexity: O(N) [vectorized] once the timeline is built
+    # Space Complexity: O(N)
+    def get_package_ids_with_status(self, status: PackageStatus, at_time: datetime.datetime) -> list[int]:
+        timeline = self.status_timeline()
+        if timeline is None:
+            raise ValueError("Package statuses need every package to be routed")
+        return timeline.package_ids(status, at_time).tolist()
+
+    # The status of every package at the given time. Once all packages are routed it is read from the status
+    # timeline; before that from the packages themselves.
+    # Time Complexity: O(1) with the timeline, O(N log N) [packages.sort()] without
+    # Space Complexity: O(N)
+    def package_statuses(self, at_time: datetime.datetime) -> StatusReport:
+        timeline = self.status_timeline()
+        if timeline is not None:
+            return StatusReport(at_time, timeline)
+        packages = self.packages.get_all()
+        packages.sort(key=lambda x: x.id)  # Python algorithm Timsort, hybrid of merge and insertion sort.
+        return StatusReport(at_time, packages=packages)
+
+    # Reports every package status at the given time in HH:MM and returns the StatusReport.
+    # Time Complexity: O(N) with the timeline, O(N log N) [packages.sort()] without
+    # Space Complexity: O(N)
+    @timed()
     def get_all_package_statuses(self, input_time: string):
         try:
             hours, minutes = input_time.split(':')
-            input_time = datetime.datetime(1, 1, 1, int(hours), int(minutes))
-            packages = self.packages.get_all()
-            packages.sort(key=lambda x: x.id)  # Python algorithm Timsort, hybrid of merge and insertion sort.
-            for package in packages:
-                package.print_package_status(input_time)
+            report = self.package_statuses(datetime.datetime(1, 1, 1, int(hours), int(minutes)))
+            self.reporter.statuses(report)
+            return report
         except:
             print("Input error")
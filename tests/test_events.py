@@ -0,0 +1,107 @@
+import datetime
+import unittest
+
+import main
+from model.events import AddressChange, Delay, NewPackage
+from model.package import Package
+
+
+def at(hour, minute):
+    return datetime.datetime(1, 1, 1, hour, minute)
+
+
+# The shipped day planned as `main.py plan` plans it. Truck 1 leaves at 8:00, delivers package 14 at 8:06:20 and is
+# driving 2.0 miles on to package 15, delivered at 8:13.
+def planned_day():
+    return main.plan_day(main.build_parser().parse_args(["plan"]))[0]
+
+
+def miles(route):
+    return round(float(sum(entry[2] for entry in route)), 1)
+
+
+# Every package's address, location, times and truck, and every truck's load, to compare before and after an event.
+def day_state(wgups):
+    packages = sorted(wgups.packages.get_all(), key=lambda p: p.id)
+    return ([(p.id, p.address, p.location_id, p.available_at, p.delivered_at, p.truck and p.truck.id)
+             for p in packages], [[p.id for p in truck.packages] for truck in wgups.trucks], dict(wgups.routes))
+
+
+def new_package(package_id):
+    return Package(package_id, "410 S State St", "Salt Lake City", "84111", "EOD", "1", "")
+
+
+class ReplanTest(unittest.TestCase):
+    def test_delay_keeps_the_stops_already_made(self):
+        wgups = planned_day()
+        before = [entry for entry in wgups.routes[1][0] if entry[1] not in (None, "back_to_hq")]
+        package = max(wgups.trucks[0].packages, key=lambda p: p.delivered_at)  # delivered at 8:59
+        route, _ = wgups.apply_event(Delay(at(8, 40), package.id, at(10, 0)))
+        kept = [entry for entry in before if wgups.packages.lookup_(entry[1]).delivered_time <= at(8, 40)]
+        self.assertEqual(route[:len(kept)], kept)
+        self.assertGreaterEqual(package.delivered_time, at(10, 0))
+        self.assertEqual(sorted(entry[1] for entry in route if entry[1] not in (None, "back_to_hq")),
+                         sorted(p.id for p in wgups.trucks[0].packages))
+
+    def test_delay_before_the_truck_leaves_plans_it_again(self):
+        wgups = planned_day()
+        dispatch_time = wgups.trucks[2].dispatch_time
+        package_id = wgups.routes[3][0][0][1]
+        route, _ = wgups.apply_event(Delay(at(9, 0), package_id, at(11, 0)))
+        self.assertEqual(wgups.trucks[2].dispatch_time, dispatch_time)
+        self.assertGreaterEqual(wgups.packages.lookup_(package_id).delivered_time, at(11, 0))
+        self.assertEqual(wgups.routes[3][0], route)
+
+    def test_new_package_is_delivered_after_it_is_handed_over(self):
+        wgups = planned_day()
+        route, return_time = wgups.apply_event(NewPackage(at(8, 30), new_package(99), 1))
+        package = wgups.packages.lookup_(99)
+        self.assertIs(package.truck, wgups.trucks[0])
+        self.assertGreater(package.delivered_time, at(8, 30))
+        self.assertEqual([entry[1] for entry in route].count(99), 1)
+        self.assertEqual(wgups.routes[1], (route, return_time))
+
+    def test_rejected_events_leave_the_day_unchanged(self):
+        wgups = planned_day()
+        before = day_state(wgups)
+        for event in [NewPackage(at(13, 0), new_package(99), 1),  # truck 1 is back at 9:35
+                      Delay(at(9, 0), 14, at(10, 0)),  # delivered at 8:06
+                      AddressChange(at(8, 30), 40, "1 Nowhere Rd")]:
+            with self.assertRaises(ValueError):
+                wgups.apply_event(event)
+            self.assertEqual(day_state(wgups), before)
+
+
+class InFlightStopTest(unittest.TestCase):
+    def test_delay_of_the_package_being_driven_to(self):
+        wgups = planned_day()
+        route, _ = wgups.apply_event(Delay(at(8, 10), 15, at(8, 40)))
+        package = wgups.packages.lookup_(15)
+        self.assertGreaterEqual(package.delivered_time, at(8, 40))
+        # the truck still drives to the stop, but delivers package 15 later
+        self.assertEqual(route[0][:2], (20, 14))
+        self.assertEqual(route[1][:2], (21, None))
+        self.assertAlmostEqual(route[1][2], 2.0)
+        self.assertEqual(sum(1 for entry in route if entry[1] == 15), 1)
+
+    def test_address_change_of_the_package_being_driven_to(self):
+        wgups = planned_day()
+        target = wgups.packages.lookup_(20)
+        route, _ = wgups.apply_event(AddressChange(at(8, 10), 15, target.address, target.city, target.zip))
+        package = wgups.packages.lookup_(15)
+        self.assertEqual(package.location_id, target.location_id)
+        self.assertEqual(route[1][:2], (21, None))
+        self.assertEqual([entry[0] for entry in route if entry[1] == 15], [target.location_id])
+        self.assertGreater(package.delivered_time, at(8, 13))
+
+    def test_leg_without_a_package_is_kept_by_the_next_replan(self):
+        wgups = planned_day()
+        wgups.apply_event(Delay(at(8, 10), 15, at(8, 40)))
+        before = miles(wgups.routes[1][0])
+        route, _ = wgups.apply_event(Delay(at(8, 12), 20, None))
+        self.assertEqual(route[1][:2], (21, None))
+        self.assertAlmostEqual(miles(route), before, places=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import itertools
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+import numpy
+
+from model.held_karp import MAX_LOCATIONS, ExactSolver, held_karp
+from model.wgups import WGUPS
+from util.reporter import Reporter
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+# Length of visiting locations in order from start, ending at end if given.
+def path_length(distances, start, order, end=None):
+    stops = [start] + list(order) + ([] if end is None else [end])
+    return float(sum(distances[a, b] for a, b in zip(stops, stops[1:])))
+
+
+# Asymmetric random distances between n locations, rounded to tenths of a mile like the distance table.
+def random_distances(n, seed):
+    return numpy.random.default_rng(seed).integers(1, 100, size=(n, n)) / 10
+
+
+class HeldKarpTest(unittest.TestCase):
+    def test_shortest_path_matches_brute_force(self):
+        for seed in range(20):
+            distances = random_distances(9, seed)
+            locations = numpy.arange(1, 2 + seed % 7)
+            for end in (None, 0, 8):
+                order, length = held_karp(distances, 0, locations, end)
+                best = min(path_length(distances, 0, permutation, end)
+                           for permutation in itertools.permutations(locations.tolist()))
+                self.assertAlmostEqual(length, best)
+                self.assertEqual(sorted(order), list(range(len(locations))))
+                self.assertAlmostEqual(path_length(distances, 0, locations[order].tolist(), end), best)
+
+    def test_solver_memoizes_location_sets(self):
+        distances = random_distances(8, 1)
+        solver = ExactSolver(distances, 8)
+        first = solver.solve(0, [5, 3, 1, 7])
+        self.assertEqual(solver.solve(0, [7, 1, 3, 5]), first)
+        self.assertEqual((solver.hits, solver.misses), (1, 1))
+        self.assertIsNone(ExactSolver(distances, 3).solve(0, [5, 3, 1, 7]))
+
+
+class ExactSolverLimitTest(unittest.TestCase):
+    def test_rejects_location_counts_outside_the_range(self):
+        distances = numpy.zeros((3, 3))
+        for max_locations in (-1, MAX_LOCATIONS + 1, 25, 128):
+            with self.assertRaises(ValueError):
+                ExactSolver(distances, max_locations)
+        self.assertEqual(ExactSolver(distances, MAX_LOCATIONS).max_locations, MAX_LOCATIONS)
+        self.assertEqual(ExactSolver(distances, 0).max_locations, 0)
+
+    def test_wgups_rejects_negative_limit(self):
+        with self.assertRaises(ValueError):
+            WGUPS([], numpy.zeros((1, 1)), [], 1, reporter=Reporter(), exact_locations=-1)
+
+    def test_command_line_rejects_limit_above_the_range(self):
+        result = subprocess.run([sys.executable, "main.py", "plan", "--exact-locations", str(MAX_LOCATIONS + 1)],
+                                cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("--exact-locations", result.stderr)
+
+
+if __name__ == "__main__":
+    unittest.main()
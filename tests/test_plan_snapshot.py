@@ -0,0 +1,79 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import main
+from model.wgups import WGUPS
+from util.plan_snapshot import HEADER, SECTION, load_plan
+from util.reporter import Reporter
+
+
+# Byte offset of a section of the snapshot at path, read from its directory.
+def section_offset(path, name):
+    data = Path(path).read_bytes()
+    section_count = HEADER.unpack_from(data)[4]
+    for i in range(section_count):
+        section_name, _, offset, _, _ = SECTION.unpack_from(data, HEADER.size + i * SECTION.size)
+        if section_name.rstrip(b"\0").decode("ascii") == name:
+            return offset
+    raise KeyError(name)
+
+
+# Writes data to path with the byte at offset inverted.
+def flip_byte(path, offset):
+    data = bytearray(Path(path).read_bytes())
+    data[offset] ^= 0xFF
+    Path(path).write_bytes(bytes(data))
+
+
+def package_rows(packages):
+    return sorted((p.id, p.address, p.city, p.zip, p.notes, p.deadline_at, p.weight, p.priority, p.location_id,
+                   p.truck and p.truck.id, p.available_at, p.dispatched_at, p.delivered_at) for p in packages)
+
+
+class PlanSnapshotTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.wgups = main.plan_day(main.build_parser().parse_args(["plan"]))[0]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "day.plan"
+        self.wgups.save_plan(self.path)
+
+    def test_round_trip(self):
+        snapshot = load_plan(self.path)
+        self.assertEqual(package_rows(snapshot.packages), package_rows(self.wgups.packages.get_all()))
+        self.assertEqual(snapshot.routes(), self.wgups.routes)
+        restored = WGUPS.from_snapshot(self.wgups.locations, self.wgups.distances, snapshot, reporter=Reporter())
+        for truck, saved in zip(self.wgups.trucks, restored.trucks):
+            self.assertEqual(saved.dispatch_at, truck.dispatch_at)
+            self.assertEqual([p.id for p in saved.packages], [p.id for p in truck.packages])
+        self.assertEqual(restored.packages.lookup_(9).address, self.wgups.packages.lookup_(9).address)
+
+    def test_corrupt_section_fails_its_checksum(self):
+        flip_byte(self.path, section_offset(self.path, "delivered_times"))
+        with self.assertRaisesRegex(ValueError, "checksum of section delivered_times"):
+            load_plan(self.path)
+        load_plan(self.path, verify=False)  # only the header and directory are checked
+
+    def test_corrupt_directory_is_rejected(self):
+        flip_byte(self.path, HEADER.size + 1)
+        with self.assertRaisesRegex(ValueError, "damaged section directory"):
+            load_plan(self.path, verify=False)
+
+    def test_truncated_file_is_rejected(self):
+        data = self.path.read_bytes()
+        self.path.write_bytes(data[:len(data) // 2])
+        with self.assertRaisesRegex(ValueError, "truncated"):
+            load_plan(self.path, verify=False)
+
+    def test_other_file_is_rejected(self):
+        self.path.write_bytes(b"id,address\n" * 20)
+        with self.assertRaisesRegex(ValueError, "is not a version 2 plan snapshot"):
+            load_plan(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import datetime
+import unittest
+
+from model.package import PackagePriority
+from model.wgups import WGUPS
+from util.csv_reader import get_location_data, get_package_data
+from util.reporter import Reporter
+
+LOCATIONS, DISTANCES = get_location_data()
+EARLY_PACKAGES = (1, 13, 14, 16, 20, 29, 30, 31, 34, 37, 40, 19)
+
+
+# WGUPS on the shipped data with the packages due by 10:30 on truck 1, package 15 first.
+def early_truck() -> WGUPS:
+    wgups = WGUPS(LOCATIONS, DISTANCES, get_package_data(), 3, reporter=Reporter())
+    for package_id in EARLY_PACKAGES:
+        wgups.load_truck(1, package_id, PackagePriority.MEDIUM)
+    wgups.load_truck(1, 15, PackagePriority.HIGH)
+    return wgups
+
+
+def at(hour, minute):
+    return datetime.datetime(1, 1, 1, hour, minute)
+
+
+def late(wgups):
+    return sorted(p.id for p in wgups.trucks[0].packages
+                  if p.deadline_at is not None and p.delivered_at > p.deadline_at)
+
+
+class StartBucketTest(unittest.TestCase):
+    def test_start_in_the_same_bucket_reuses_the_route(self):
+        wgups = early_truck()
+        wgups.generate_route(1, at(8, 30))
+        route, back = wgups.generate_route(1, at(8, 45))
+        self.assertEqual(wgups.route_cache_info()["hits"], 1)
+        self.assertEqual((route, back), early_truck().generate_route(1, at(8, 45)))
+
+    def test_route_that_makes_a_package_late_is_not_reused(self):
+        wgups = early_truck()
+        wgups.generate_route(1, at(8, 30))
+        route, back = wgups.generate_route(1, at(8, 50))
+        self.assertEqual(wgups.route_cache_info()["hits"], 0)
+        fresh = early_truck()
+        self.assertEqual((route, back), fresh.generate_route(1, at(8, 50)))
+        self.assertEqual(late(wgups), late(fresh))
+
+    def test_start_in_another_bucket_misses(self):
+        wgups = early_truck()
+        wgups.generate_route(1, at(8, 0))
+        wgups.generate_route(1, at(9, 30))
+        self.assertEqual(wgups.route_cache_info()["hits"], 0)
+        self.assertEqual(late(wgups), [13, 15, 30, 31, 37])
+
+
+if __name__ == "__main__":
+    unittest.main()
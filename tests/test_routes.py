@@ -0,0 +1,84 @@
+import datetime
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from model.package import PackagePriority
+from model.wgups import WGUPS
+from util.csv_reader import get_location_data, get_package_data
+from util.reporter import Reporter
+
+ROOT = Path(__file__).resolve().parent.parent
+LOCATIONS, DISTANCES = get_location_data()
+
+# The loads of the interactive menu, in its order: (truck, package, priority).
+HIGH, MEDIUM, LOW = PackagePriority.HIGH, PackagePriority.MEDIUM, PackagePriority.LOW
+INTERACTIVE_LOADS = [(2, 3, MEDIUM), (2, 18, MEDIUM), (2, 36, MEDIUM), (2, 38, MEDIUM),
+                     (1, 1, MEDIUM), (1, 13, MEDIUM), (1, 14, MEDIUM), (1, 16, MEDIUM), (1, 20, MEDIUM),
+                     (1, 29, MEDIUM), (1, 30, MEDIUM), (1, 31, MEDIUM), (1, 34, MEDIUM), (1, 37, MEDIUM),
+                     (1, 40, MEDIUM),
+                     (2, 25, HIGH), (2, 6, MEDIUM), (2, 28, MEDIUM), (2, 32, MEDIUM),
+                     (1, 15, HIGH), (1, 19, MEDIUM),
+                     (2, 2, LOW), (2, 4, LOW), (2, 5, LOW), (2, 7, LOW), (2, 8, LOW), (2, 10, LOW), (2, 11, LOW),
+                     (2, 12, LOW),
+                     (3, 9, LOW), (3, 17, LOW), (3, 21, LOW), (3, 22, LOW), (3, 23, LOW), (3, 24, LOW), (3, 26, LOW),
+                     (3, 27, LOW), (3, 33, LOW), (3, 35, LOW), (3, 39, LOW)]
+INTERACTIVE_SCHEDULE = [(1, datetime.datetime(1, 1, 1, 8)), (2, datetime.datetime(1, 1, 1, 9, 5)), (3, 1)]
+
+
+# The day of the interactive menu: its loads, package 9 held until 10:20 and its schedule for two drivers.
+def interactive_day(exact_locations, candidates=0):
+    wgups = WGUPS(LOCATIONS, DISTANCES, get_package_data(), 3, reporter=Reporter(), exact_locations=exact_locations)
+    if candidates:
+        wgups.use_candidate_lists(candidates)
+    for truck_id, package_id, priority in INTERACTIVE_LOADS:
+        wgups.load_truck(truck_id, package_id, priority)
+    wgups.packages.lookup_(9).available_time = datetime.datetime(1, 1, 1, 10, 20)
+    return wgups, wgups.simulate(INTERACTIVE_SCHEDULE, drivers=2)
+
+
+def stops(route):
+    return [entry[1] for entry in route if entry[1] is not None]
+
+
+def total_miles(day):
+    return round(sum(float(sum(entry[2] for entry in route)) for route, _ in day.routes.values()), 2)
+
+
+class NearestNeighborRouteTest(unittest.TestCase):
+    def test_interactive_day(self):
+        wgups, day = interactive_day(exact_locations=0)
+        self.assertEqual(stops(day.routes[1][0]),
+                         [14, 16, 34, 15, 20, 19, 40, 1, 29, 37, 30, 13, 31, "back_to_hq"])
+        self.assertEqual(stops(day.routes[2][0]),
+                         [25, 2, 28, 4, 32, 6, 36, 12, 7, 10, 38, 5, 3, 8, 18, 11, "back_to_hq"])
+        self.assertEqual(stops(day.routes[3][0]), [21, 24, 26, 22, 33, 17, 27, 35, 39, 9, 23, "back_to_hq"])
+        self.assertEqual(total_miles(day), 126.9)
+        self.assertGreaterEqual(wgups.packages.lookup_(9).delivered_time, datetime.datetime(1, 1, 1, 10, 20))
+
+    def test_candidate_lists_keep_the_routes(self):
+        _, full = interactive_day(exact_locations=0)
+        _, day = interactive_day(exact_locations=0, candidates=4)
+        self.assertEqual({truck_id: route for truck_id, (route, _) in day.routes.items()},
+                         {truck_id: route for truck_id, (route, _) in full.routes.items()})
+
+
+class ExactRouteTest(unittest.TestCase):
+    def test_interactive_day(self):
+        _, day = interactive_day(exact_locations=13)
+        self.assertEqual(stops(day.routes[1][0]),
+                         [16, 34, 15, 14, 29, 37, 30, 13, 31, 40, 1, 19, 20, "back_to_hq"])
+        self.assertEqual(stops(day.routes[2][0]),
+                         [25, 2, 28, 4, 32, 6, 36, 12, 7, 10, 38, 5, 3, 8, 18, 11, "back_to_hq"])
+        self.assertEqual(stops(day.routes[3][0]), [21, 24, 26, 22, 33, 17, 27, 35, 39, 9, 23, "back_to_hq"])
+        self.assertEqual(total_miles(day), 124.1)
+
+    def test_interactive_menu_uses_exact_routing(self):
+        result = subprocess.run([sys.executable, "main.py"], input="R\nQ\n", cwd=ROOT, capture_output=True,
+                                text=True, check=True)
+        self.assertIn("Total miles traveled: 124.10", result.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
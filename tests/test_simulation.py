@@ -0,0 +1,38 @@
+import datetime
+import unittest
+
+from model.simulation import simulate_day
+
+
+def at(hour, minute=0):
+    return datetime.datetime(1, 1, 1, hour, minute)
+
+
+# Every truck is out for an hour and delivers nothing.
+def hour_route(truck_id, dispatch_time):
+    return [], dispatch_time + datetime.timedelta(hours=1), []
+
+
+class DriverHandoffTest(unittest.TestCase):
+    def test_driver_takes_a_truck_that_can_leave_over_a_blocked_one(self):
+        # truck 3 takes truck 1's driver but cannot leave before 11:00; truck 2 is ready and waits for any driver
+        schedule = [(1, at(8)), (2, at(8)), (3, 1), (3, at(11))]
+        result = simulate_day(schedule, 1, {}, [], hour_route)
+        self.assertEqual(result.dispatch_times, {1: at(8), 2: at(9), 3: at(11)})
+        self.assertEqual(result.drivers, {1: 1, 2: 1, 3: 1})
+
+    def test_driver_waits_for_a_blocked_truck_when_nothing_else_can_leave(self):
+        schedule = [(1, at(8)), (2, 1), (2, at(10))]
+        result = simulate_day(schedule, 1, {}, [], hour_route)
+        self.assertEqual(result.dispatch_times, {1: at(8), 2: at(10)})
+
+    def test_truck_waiting_for_two_trucks_keeps_both_drivers(self):
+        # truck 3 waits for trucks 1 and 2, so truck 1's driver takes truck 4, waiting since 8:45, and truck 2's
+        # driver truck 3
+        schedule = [(1, at(8)), (2, at(8, 30)), (3, 1), (3, 2), (4, at(8, 45))]
+        result = simulate_day(schedule, 2, {}, [], hour_route)
+        self.assertEqual(result.dispatch_times, {1: at(8), 2: at(8, 30), 3: at(9, 30), 4: at(9)})
+
+
+if __name__ == "__main__":
+    unittest.main()
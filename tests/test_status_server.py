@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+import main
+from model.package import PackageStatus
+from util.plan_snapshot import load_plan
+from util.status_server import StatusServer, StoreStatusIndex
+
+
+def plan():
+    return main.plan_day(main.build_parser().parse_args(["plan"]))[0]
+
+
+# A StatusServer listening on a free local port, and a connection to it.
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    def make_server(self) -> StatusServer:
+        return StatusServer(plan)
+
+    async def asyncSetUp(self):
+        self.server = self.make_server()
+        listening = asyncio.get_running_loop().create_future()
+        self.serving = asyncio.create_task(self.server.serve("127.0.0.1", 0, started=listening.set_result))
+        port = (await listening).sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.serving.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await self.serving
+
+    async def request(self, line) -> dict:
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+
+class ProtocolTest(ServerTestCase):
+    async def test_status_follows_the_planned_times(self):
+        wgups = self.server.wgups
+        for package_id in (1, 9, 15, 25, 40):
+            package = wgups.packages.lookup_(package_id)
+            for time_ in (datetime.datetime(1, 1, 1, 8), package.dispatched_time, package.delivered_time,
+                          package.delivered_time + datetime.timedelta(minutes=1)):
+                time_ = time_.replace(second=0)  # queries are in whole minutes
+                response = await self.request("STATUS " + str(package_id) + " " + time_.strftime("%H:%M"))
+                status = PackageStatus.HUB
+                if time_ > package.dispatched_time:
+                    status = PackageStatus.EN_ROUTE
+                if time_ > package.delivered_time:
+                    status = PackageStatus.DELIVERED
+                self.assertEqual((response["time"], response["package"], response["status"]),
+                                 (time_.strftime("%H:%M"), package_id, status.name))
+
+    async def test_bulk_all_and_counts_agree(self):
+        bulk = await self.request("BULK 10:00 3 1 2")
+        self.assertEqual([package["package"] for package in bulk["packages"]], [3, 1, 2])
+        everything = await self.request("ALL 10:00")
+        self.assertEqual([package["package"] for package in everything["packages"]], list(range(1, 41)))
+        counts = await self.request("COUNTS 10:00")
+        expected = self.server.wgups.get_status_counts(datetime.datetime(1, 1, 1, 10))
+        self.assertEqual({status: counts[status.name] for status in PackageStatus}, expected)
+        self.assertEqual(sum(1 for package in everything["packages"] if package["status"] == "DELIVERED"),
+                         counts["DELIVERED"])
+
+    async def test_errors(self):
+        self.assertIn("Unknown package", (await self.request("STATUS 999 10:00"))["error"])
+        self.assertIn("out of range", (await self.request("STATUS 1 25:00"))["error"])
+        self.assertIn("Unknown request", (await self.request("HELLO"))["error"])
+        self.assertIn("Empty request", (await self.request(""))["error"])
+        self.assertIn("delivered", (await self.request("DELAY 14 09:00 10:00"))["error"])
+
+    async def test_delay_swaps_in_a_new_index(self):
+        generation = (await self.request("STATS"))["generation"]
+        response = await self.request("DELAY 9 10:00 11:30")
+        self.assertIn(9, response["route"])
+        self.assertEqual((await self.request("STATS"))["generation"], generation + 1)
+        status = await self.request("STATUS 9 11:29")
+        self.assertNotEqual(status["status"], "DELIVERED")
+
+    async def test_quit_closes_the_connection(self):
+        self.writer.write(b"QUIT\n")
+        await self.writer.drain()
+        self.assertEqual(await self.reader.readline(), b"")
+
+
+class SnapshotProtocolTest(ServerTestCase):
+    def make_server(self) -> StatusServer:
+        self.planned = plan()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "day.plan"
+        self.planned.save_plan(path)
+        return StatusServer(None, StoreStatusIndex(load_plan(path).packages))
+
+    async def test_answers_like_the_planned_day(self):
+        everything = await self.request("ALL 10:00")
+        for package in everything["packages"]:
+            planned = self.planned.packages.lookup_(package["package"])
+            self.assertEqual(package["delivery"], planned.delivered_time.strftime("%H:%M"))
+        self.assertIn("needs a planner", (await self.request("DELAY 9 10:00 11:30"))["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,55 +1,131 @@
 # Mario Silvestri III
+import contextlib
 import csv
-from model.location import Location
-from model.package import Package
+from pathlib import Path
+from typing import Optional
+
+import numpy
+
+from model.location import DISTANCE_DTYPE, Location
+from model.package import Package, parse_deadline, parse_weight
+from util.instrumentation import timed
 
 """
 Utility functions for extracting data from csv files into formats applicable for Package and Location classes.
+
+The readers are generators over a path or an open file: rows are parsed into typed values one at a time, so a manifest
+is never held in memory as text. Malformed rows are reported with their line number and do not stop the load; pass a
+list as errors to collect (line number, message) pairs, otherwise they are printed.
 """
 
+DATA_DIRECTORY = Path(__file__).resolve().parent.parent / "data"
+DISTANCE_CSV = DATA_DIRECTORY / "distance.csv"
+PACKAGE_CSV = DATA_DIRECTORY / "package.csv"
 
-# Import distances data csv file.
-# Time Complexity: O(N)
-# Space Complexity: O(N^2)
-def get_location_data():
-    distance_table = []
 
-    with open('data/distance.csv', newline='') as distance_csv:
-        reader = csv.reader(distance_csv)
+# Opens a path for reading, or passes an already open file through without closing it.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+@contextlib.contextmanager
+def open_source(source):
+    if hasattr(source, "read"):
+        yield source
+    else:
+        with open(source, newline='') as file:
+            yield file
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def report_error(errors: Optional[list], source, line_number, message):
+    if errors is None:
+        print("Line " + str(line_number) + " of " + str(getattr(source, "name", source)) + ": " + message)
+    else:
+        errors.append((line_number, message))
 
-        # Time Complexity: O(N) [loops once for each row of data]
-        # Space Complexity: O(N) [adds one row to distance table for each row of data]
+
+# Yields each location with the list of its distances to itself and every lower-indexed location, one csv row at a
+# time, plus the number of distance columns in the row (rows are padded to one column per location). A location row
+# is never dropped, since location ids are row positions; distances that are missing or not numbers are reported and
+# read as infinite, so the pair is never chosen as the nearest stop.
+# Time Complexity: O(N^2) [N rows of up to N values]
+# Space Complexity: O(N) [one row at a time]
+def iter_locations(source=DISTANCE_CSV, errors: Optional[list] = None):
+    with open_source(source) as distance_csv:
+        reader = csv.reader(distance_csv)
         for index, row in enumerate(reader):
-            row.insert(0, str(index))
-            distance_table.extend([row])
+            if len(row) < 3:
+                report_error(errors, source, reader.line_num, "expected name, address and zip")
+                row = row + [""] * (3 - len(row))
+            values = [value for value in row[3:] if value]
+            distances = []
+            for value in values[:index + 1]:
+                try:
+                    distances.append(float(value))
+                except ValueError:
+                    report_error(errors, source, reader.line_num, "distance " + repr(value) + " is not a number")
+                    distances.append(numpy.inf)
+            if len(values) != index + 1:
+                report_error(errors, source, reader.line_num,
+                             "expected " + str(index + 1) + " distances, found " + str(len(values)))
+                distances.extend([numpy.inf] * (index + 1 - len(distances)))
+            distances[index] = 0
+            yield Location(index, row[0], row[1], row[2]), distances, len(row) - 3
 
-        location_list: list[Location] = []
 
-        # Time Complexity: O(N)
-        # Space Complexity: O(N^2) [each additional location adds N distances to its list of locations]
-        for index, location in enumerate(distance_table):
-            location = [i for i in location if i]
-            location_list.append(Location(location[0], location[1], location[2],
-                                          location[3], [float(i) for i in location[4:-1]]))
-        return location_list
+# Import distances data csv file. Returns the list of locations and a symmetric distance matrix indexed by location id.
+# The matrix is sized from the width of the first row (one column per location) and grown if the file is longer.
+# Time Complexity: O(N^2) [every cell of the matrix is filled once]
+# Space Complexity: O(N^2)
+@timed()
+def get_location_data(path=DISTANCE_CSV, errors: Optional[list] = None):
+    location_list: list[Location] = []
+    distances = None
 
+    # Each row of the csv lists the distances to all lower-indexed locations, so the rows fill the lower triangle.
+    for location, row, width in iter_locations(path, errors):
+        if distances is None:
+            distances = numpy.zeros((max(1, width), max(1, width)), dtype=DISTANCE_DTYPE)
+        if location.id >= len(distances):
+            grown = numpy.zeros((2 * len(distances), 2 * len(distances)), dtype=DISTANCE_DTYPE)
+            grown[:len(distances), :len(distances)] = distances
+            distances = grown
+        location_list.append(location)
+        distances[location.id, :len(row)] = row
 
-# Import packages data csv file.
-# Time Complexity: O(N)
-# Space Complexity: O(N)
-def get_package_data():
-    package_table = []
-    package_list: list[Package] = []
+    if distances is None:
+        return location_list, numpy.zeros((0, 0), dtype=DISTANCE_DTYPE)
+    if len(distances) != len(location_list):
+        distances = distances[:len(location_list), :len(location_list)].copy()
+    # mirror the lower triangle into the upper one; the diagonal is zero so adding the transpose is exact
+    distances += distances.T
+    return location_list, numpy.ascontiguousarray(distances)
 
-    with open('data/package.csv', newline='') as package_csv:
-        reader = csv.reader(package_csv)
 
+# Yields a Package for each valid row of the package csv, with the deadline and weight already parsed.
+# Time Complexity: O(N)
+# Space Complexity: O(1) [one row at a time]
+def iter_packages(source=PACKAGE_CSV, errors: Optional[list] = None):
+    with open_source(source) as package_csv:
+        reader = csv.reader(package_csv)
         for row in reader:
-            package_table.extend([row])
+            if not row:
+                continue
+            if len(row) < 7:
+                report_error(errors, source, reader.line_num,
+                             "expected at least 7 columns, found " + str(len(row)) + "; row skipped")
+                continue
+            try:
+                id_, deadline, weight = int(row[0]), parse_deadline(row[5]), parse_weight(row[6])
+            except ValueError as error:
+                report_error(errors, source, reader.line_num, str(error) + "; row skipped")
+                continue
+            yield Package(id_, row[1], row[2], row[4], deadline, weight, row[7] if len(row) > 7 else "")
 
-        for index, package in enumerate(package_table):
-            package_list.append(Package(package[0], package[1],
-                                        package[2], package[4], package[5],
-                                        package[6], package[7]))
 
-    return package_list
+# Import packages data csv file.
+# Time Complexity: O(N)
+# Space Complexity: O(N)
+@timed()
+def get_package_data(path=PACKAGE_CSV, errors: Optional[list] = None):
+    return list(iter_packages(path, errors))
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import struct
+import weakref
+from multiprocessing import shared_memory
+
+import numpy
+
+from model.location import DISTANCE_DTYPE, Location
+from util.csv_reader import DATA_DIRECTORY, DISTANCE_CSV, get_location_data
+from util.instrumentation import timed
+
+"""
+Compiled binary form of the distance table, and a shared memory copy of the distance matrix for worker processes.
+
+Binary layout (little-endian):
+    header      magic, format version, location count, size / mtime / sha256 of the source csv,
+                metadata length and offset of the distance block
+    metadata    utf-8 json list of [name, address, zip] per location, in location id order
+    distances   N * N float64 matrix, row-major, starting at a 64 byte boundary
+"""
+
+MAGIC = b"WGUPSDST"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQq32sQQ")
+ALIGNMENT = 64
+
+
+# Time Complexity: O(N) [size of the file]
+# Space Complexity: O(1)
+def file_checksum(path) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+# Converts the distance csv into the binary format. The file is written next to its final name and renamed into
+# place so a reader never sees a half written table.
+# Time Complexity: O(N^2)
+# Space Complexity: O(N^2)
+def compile_distance_csv(csv_path, binary_path):
+    locations, distances = get_location_data(csv_path)
+    metadata = json.dumps([[loc.name, loc.address, loc.zip] for loc in locations]).encode("utf-8")
+    data_offset = -(-(HEADER.size + len(metadata)) // ALIGNMENT) * ALIGNMENT
+    stat = os.stat(csv_path)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(locations), stat.st_size, stat.st_mtime_ns,
+                         file_checksum(csv_path), len(metadata), data_offset)
+
+    temporary_path = str(binary_path) + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(header)
+        file.write(metadata)
+        file.write(b"\0" * (data_offset - HEADER.size - len(metadata)))
+        file.write(numpy.ascontiguousarray(distances, dtype="<f8").tobytes())
+    os.replace(temporary_path, binary_path)
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def read_header(binary_path):
+    with open(binary_path, "rb") as file:
+        magic, version, count, size, mtime_ns, checksum, metadata_length, data_offset = \
+            HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(str(binary_path) + " is not a version " + str(FORMAT_VERSION) + " distance table")
+    return count, size, mtime_ns, checksum, metadata_length, data_offset
+
+
+# Loads a compiled distance table. The distance matrix is memory mapped read-only, so only the pages that are used
+# are read from disk and several processes loading the same file share the page cache.
+# Time Complexity: O(N) [location metadata; the matrix is not read up front]
+# Space Complexity: O(N)
+def load_distance_binary(binary_path):
+    count, _, _, _, metadata_length, data_offset = read_header(binary_path)
+    with open(binary_path, "rb") as file:
+        file.seek(HEADER.size)
+        metadata = json.loads(file.read(metadata_length).decode("utf-8"))
+    locations = [Location(i, name, address, zip_) for i, (name, address, zip_) in enumerate(metadata)]
+    distances = numpy.memmap(binary_path, dtype="<f8", mode="r", offset=data_offset, shape=(count, count))
+    return locations, distances
+
+
+# Returns True when the binary was compiled from the current contents of the csv. Size and modification time are
+# compared first; the checksum is only recomputed when they differ, e.g. after the csv was copied or touched, and a
+# matching checksum records the new modification time so the next start takes the fast path again.
+# Time Complexity: O(1), O(N) when the csv metadata changed
+# Space Complexity: O(1)
+def is_current(csv_path, binary_path):
+    try:
+        count, size, mtime_ns, checksum, metadata_length, data_offset = read_header(binary_path)
+    except (OSError, ValueError, struct.error):
+        return False
+    stat = os.stat(csv_path)
+    if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+        return True
+    if stat.st_size != size or file_checksum(csv_path) != checksum:
+        return False
+    with open(binary_path, "r+b") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, size, stat.st_mtime_ns, checksum, metadata_length,
+                               data_offset))
+    return True
+
+
+# Loads locations and distances through the binary table, compiling it first if it is missing or stale.
+# Time Complexity: O(N) when the binary is current, O(N^2) when it is rebuilt
+# Space Complexity: O(N)
+@timed()
+def get_location_data_cached(csv_path=DISTANCE_CSV, binary_path=DATA_DIRECTORY / "distance.bin"):
+    if not is_current(csv_path, binary_path):
+        compile_distance_csv(csv_path, binary_path)
+    return load_distance_binary(binary_path)
+
+
+# A copy of the distance matrix in a multiprocessing.shared_memory block. Worker processes attach to it by name with
+# attach_distances, so every process reads the same physical pages and the matrix is never pickled. The block is
+# released by close(), or when the object is garbage collected.
+# Time Complexity: O(N^2) [one copy of the matrix]
+# Space Complexity: O(N^2)
+class SharedDistanceMatrix:
+    def __init__(self, distances: numpy.ndarray):
+        self.shape = distances.shape
+        self.dtype = numpy.dtype(DISTANCE_DTYPE)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(1, distances.size * self.dtype.itemsize))
+        self.distances = numpy.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+        self.distances[:] = distances
+        self.finalizer = weakref.finalize(self, release_shared_memory, self.memory)
+
+    # The picklable description workers need to attach: (name, shape, dtype)
+    @property
+    def handle(self):
+        return self.memory.name, self.shape, self.dtype.str
+
+    def close(self):
+        self.distances = None
+        self.finalizer()
+
+
+# Unlinks the block so the name is freed. Closing can fail while an array still views the buffer; the mapping then
+# goes away with the array or the process.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def release_shared_memory(memory: shared_memory.SharedMemory):
+    memory.unlink()
+    try:
+        memory.close()
+    except BufferError:
+        pass
+
+
+# Attaches to a SharedDistanceMatrix from another process. The SharedMemory object is returned with the array and
+# has to be kept alive as long as the array is used.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def attach_distances(handle):
+    name, shape, dtype = handle
+    memory = shared_memory.SharedMemory(name=name)
+    return memory, numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
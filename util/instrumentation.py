@@ -0,0 +1,179 @@
+import functools
+import json
+import marshal
+import time
+from contextlib import contextmanager
+
+"""
+Opt-in counters and timers for the hot paths. Nothing is recorded until enable() is called; while disabled a timed
+function costs one flag check per call and counters are only touched behind an `if instrumentation.enabled` test.
+
+    instrumentation.enable()
+    ...
+    print(instrumentation.format_report())
+    instrumentation.dump_stats("wgups.prof")  # python -m pstats wgups.prof, or snakeviz
+
+Timers nest: each one records its total time and its own time, excluding the timers it called, plus which timer
+called it, so the dump reads like a cProfile dump of the timed functions only. Work done in the routing worker
+processes of generate_routes is not recorded.
+"""
+
+enabled = False
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class TimerStats:
+    __slots__ = ("calls", "total", "own", "max", "code", "callers")
+
+    def __init__(self, code):
+        self.calls = 0
+        self.total = 0.0
+        self.own = 0.0
+        self.max = 0.0
+        self.code = code  # (file, line, function name), the key of the function in a pstats dump
+        self.callers: dict = {}  # caller name -> [calls, own, total]
+
+
+timers: dict[str, TimerStats] = {}
+counters: dict[str, int] = {}
+running: list = []  # [name, start, time spent in nested timers] per open timer
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def enable():
+    global enabled
+    enabled = True
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def disable():
+    global enabled
+    enabled = False
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def reset():
+    timers.clear()
+    counters.clear()
+    running.clear()
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def count(name, amount=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def start(name, code):
+    if name not in timers:
+        timers[name] = TimerStats(code)
+    running.append([name, time.perf_counter(), 0.0])
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def stop():
+    name, started, nested = running.pop()
+    elapsed = time.perf_counter() - started
+    stats = timers[name]
+    stats.calls += 1
+    stats.total += elapsed
+    stats.own += elapsed - nested
+    stats.max = max(stats.max, elapsed)
+    caller = running[-1][0] if running else None
+    if caller is not None:
+        running[-1][2] += elapsed
+        calls = stats.callers.setdefault(caller, [0, 0.0, 0.0])
+        calls[0] += 1
+        calls[1] += elapsed - nested
+        calls[2] += elapsed
+
+
+# Decorator timing every call of a function while instrumentation is enabled. The name defaults to the function's
+# qualified name.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def timed(name=None):
+    def decorator(function):
+        label = name or function.__qualname__
+        code = (function.__code__.co_filename, function.__code__.co_firstlineno, label)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start(label, code)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stop()
+        return wrapper
+    return decorator
+
+
+# Times a block of code under the given name while instrumentation is enabled.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+@contextmanager
+def timer(name):
+    if not enabled:
+        yield
+        return
+    start(name, ("~", 0, name))
+    try:
+        yield
+    finally:
+        stop()
+
+
+# Time Complexity: O(T + C) [T timers, C counters]
+# Space Complexity: O(T + C)
+def report() -> dict:
+    return {"timers": {name: {"calls": stats.calls, "seconds": stats.total, "own_seconds": stats.own,
+                              "max_seconds": stats.max,
+                              "callers": {caller: calls[0] for caller, calls in stats.callers.items()}}
+                       for name, stats in timers.items()},
+            "counters": dict(counters)}
+
+
+# The report as a text table, slowest timer first.
+# Time Complexity: O(T log T + C log C)
+# Space Complexity: O(T + C)
+def format_report() -> str:
+    lines = ["{:<40} {:>10} {:>12} {:>12} {:>12}".format("timer", "calls", "total ms", "own ms", "max ms")]
+    for name, stats in sorted(timers.items(), key=lambda item: -item[1].total):
+        lines.append("{:<40} {:>10} {:>12.3f} {:>12.3f} {:>12.3f}".format(name, stats.calls, stats.total * 1e3,
+                                                                         stats.own * 1e3, stats.max * 1e3))
+    if counters:
+        lines.append("")
+        lines.append("{:<40} {:>10}".format("counter", "value"))
+        for name, value in sorted(counters.items()):
+            lines.append("{:<40} {:>10}".format(name, value))
+    return "\n".join(lines) + "\n"
+
+
+# Time Complexity: O(T + C)
+# Space Complexity: O(T + C)
+def write_report(path):
+    with open(path, "w") as output:
+        json.dump(report(), output, indent=2)
+
+
+# Writes the timers in the marshal format of cProfile.Profile.dump_stats, readable by pstats.Stats.
+# Time Complexity: O(T)
+# Space Complexity: O(T)
+def dump_stats(path):
+    stats = {}
+    for stats_ in timers.values():
+        callers = {timers[caller].code: (calls, calls, own, total)
+                   for caller, (calls, own, total) in stats_.callers.items()}
+        stats[stats_.code] = (stats_.calls, stats_.calls, stats_.own, stats_.total, callers)
+    with open(path, "wb") as output:
+        marshal.dump(stats, output)
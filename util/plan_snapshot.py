@@ -0,0 +1,274 @@
+import datetime
+import mmap
+import os
+import struct
+import zlib
+from typing import Optional
+
+import numpy
+
+from model.clock import clock_array, to_clock, to_datetime
+from model.package_store import (DELETED_ID, NO_LOCATION, NO_TRUCK, PackageRecord, PackageStore, deadline_minutes,
+                                 from_column)
+from model.truck import Truck
+from util.instrumentation import timed
+
+"""
+Binary snapshot of a planned day: every package with its truck and status times, each truck's load order and
+dispatch time, and the routes. A process that only answers status queries loads the snapshot instead of reading the
+csv files and planning again.
+
+Binary layout (little-endian):
+    header      magic, format version, package count, truck count, section count, crc32 of the directory
+    directory   per section its name, numpy dtype, offset, element count and crc32
+    sections    one array per column, each starting at a 64 byte boundary
+
+The package columns are the columns of model.package_store with the rows in package id order. Text columns are
+dictionary encoded: int32 codes into one table of distinct utf-8 strings. Times, of the packages and the trucks, are
+int64 columns on the clock of model.clock. Loading maps the file copy-on-write and
+wraps the sections in a PackageStore without copying them, so nothing is read until it is used and a lookup only
+decodes the strings of its own row. Changes made to a loaded plan stay in memory.
+"""
+
+MAGIC = b"WGUPSPLN"
+FORMAT_VERSION = 2  # 2: times as int64 clock columns instead of datetime64
+HEADER = struct.Struct("<8sIQIII")
+SECTION = struct.Struct("<24s16sQQI")
+ALIGNMENT = 64
+NO_STOP = -1  # package id column of a route entry without a package
+BACK_TO_HQ = -2
+STRING_COLUMNS = {"addresses": "address", "cities": "city", "zips": "zip", "notes": "notes"}
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# The distinct strings of a snapshot, decoded on first use.
+# Time Complexity: O(1) per lookup
+# Space Complexity: O(S) [S strings used]
+class StringTable:
+    def __init__(self, offsets: numpy.ndarray, data: numpy.ndarray):
+        self.offsets = offsets
+        self.data = data
+        self.decoded: dict[int, str] = {}
+
+    def __getitem__(self, code) -> str:
+        text = self.decoded.get(code)
+        if text is None:
+            text = self.data[self.offsets[code]:self.offsets[code + 1]].tobytes().decode("utf-8")
+            self.decoded[code] = text
+        return text
+
+
+# A text column of a loaded PackageStore: the dictionary codes of the snapshot, plus the values written or appended
+# since it was loaded.
+# Time Complexity: O(1) per operation
+# Space Complexity: O(C) [C changed rows]
+class StringColumn:
+    def __init__(self, codes: numpy.ndarray, table: StringTable):
+        self.codes = codes
+        self.table = table
+        self.changed: dict[int, str] = {}
+        self.size = len(codes)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, row):
+        if row in self.changed:
+            return self.changed[row]
+        if not 0 <= row < len(self.codes):
+            raise IndexError(row)
+        return self.table[int(self.codes[row])]
+
+    def __setitem__(self, row, text):
+        self.changed[row] = text
+
+    def append(self, text):
+        self.changed[self.size] = text
+        self.size += 1
+
+
+# A loaded plan. packages is a PackageStore over the mapped file with its rows in id order; trucks have their dispatch
+# time, while their load order and route are read from the file when asked for, so a status lookup never builds them.
+# Time Complexity: O(1)
+# Space Complexity: O(T)
+class PlanSnapshot:
+    def __init__(self, path, sections: dict[str, numpy.ndarray], packages: PackageStore, trucks: list[Truck]):
+        self.path = path
+        self.sections = sections
+        self.packages = packages
+        self.trucks = trucks
+
+    # The packages of a truck in loading order.
+    # Time Complexity: O(N) [packages on the truck]
+    # Space Complexity: O(N)
+    def truck_packages(self, truck_id) -> list[PackageRecord]:
+        offsets = self.sections["load_offsets"]
+        rows = self.sections["load_rows"][offsets[truck_id - 1]:offsets[truck_id]]
+        return [PackageRecord(self.packages, row) for row in rows.tolist()]
+
+    # The truck's (route, return_time) as generate_route returned it, or None if it was not routed.
+    # Time Complexity: O(R) [route entries]
+    # Space Complexity: O(R)
+    def route(self, truck_id) -> Optional[tuple[list, datetime.datetime]]:
+        return_time = to_datetime(from_column(self.sections["return_times"][truck_id - 1]))
+        if return_time is None:
+            return None
+        offsets = self.sections["route_offsets"]
+        start, end = offsets[truck_id - 1], offsets[truck_id]
+        route = []
+        for location_id, package_id, distance in zip(self.sections["route_location_ids"][start:end].tolist(),
+                                                     self.sections["route_package_ids"][start:end].tolist(),
+                                                     self.sections["route_distances"][start:end].tolist()):
+            route.append((location_id, None if package_id == NO_STOP else
+                          "back_to_hq" if package_id == BACK_TO_HQ else package_id, distance))
+        return route, return_time
+
+    # Every saved route by truck id.
+    # Time Complexity: O(R)
+    # Space Complexity: O(R)
+    def routes(self) -> dict[int, tuple[list, datetime.datetime]]:
+        routes = {}
+        for truck in self.trucks:
+            route = self.route(truck.id)
+            if route is not None:
+                routes[truck.id] = route
+        return routes
+
+
+# Columns of the packages in id order, from a PackageStore or from Package objects.
+# Time Complexity: O(N log N)
+# Space Complexity: O(N)
+def package_columns(packages) -> dict:
+    if isinstance(packages, PackageStore):
+        rows = numpy.flatnonzero(packages.ids[:packages.size] != DELETED_ID)
+        rows = rows[numpy.argsort(packages.ids[rows], kind="stable")]
+        columns = {name: getattr(packages, name)[:packages.size][rows] for name in PackageStore.NUMERIC_COLUMNS}
+        for name in STRING_COLUMNS:
+            column = getattr(packages, name)
+            columns[name] = [column[row] for row in rows.tolist()]
+        return columns
+
+    packages = sorted(packages, key=lambda p: p.id)
+    columns = {"ids": [p.id for p in packages],
+               "location_ids": [NO_LOCATION if p.location_id is None else p.location_id for p in packages],
+               "deadlines": [deadline_minutes(p.deadline) for p in packages],
+               "weights": [p.weight for p in packages],
+               "priorities": [p.priority.value for p in packages],
+               "truck_ids": [NO_TRUCK if p.truck is None else p.truck.id for p in packages]}
+    columns = {name: numpy.array(values, dtype=PackageStore.NUMERIC_COLUMNS[name]) for name, values in columns.items()}
+    for name, attribute in (("available_times", "available_at"), ("dispatched_times", "dispatched_at"),
+                            ("delivered_times", "delivered_at")):
+        columns[name] = clock_array(getattr(p, attribute) for p in packages)
+    for name, attribute in STRING_COLUMNS.items():
+        columns[name] = [getattr(p, attribute) for p in packages]
+    return columns
+
+
+# Writes the plan: packages is the package table of WGUPS (any table with get_all, or a PackageStore) or a list of
+# packages, trucks the WGUPS trucks and routes {truck_id: (route, return_time)}. The file is written next to its
+# final name and renamed into place so a reader never sees a half written plan.
+# Time Complexity: O(N log N + R)
+# Space Complexity: O(N + R)
+@timed()
+def save_plan(path, packages, trucks: list[Truck], routes: dict[int, tuple[list, datetime.datetime]]):
+    if not isinstance(packages, (PackageStore, list)):
+        packages = packages.get_all()
+    columns = package_columns(packages)
+    sections = {name: numpy.asarray(columns[name]) for name in PackageStore.NUMERIC_COLUMNS}
+
+    strings: dict[str, int] = {}
+    for name in STRING_COLUMNS:
+        sections[name] = numpy.array([strings.setdefault(text, len(strings)) for text in columns[name]],
+                                     dtype=numpy.int32)
+    encoded = [text.encode("utf-8") for text in strings]
+    sections["string_offsets"] = numpy.cumsum([0] + [len(text) for text in encoded], dtype=numpy.int64)
+    sections["string_data"] = numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8)
+
+    ids = sections["ids"]
+    load_rows = []
+    route_entries = []
+    for truck in trucks:
+        load_rows.append(numpy.searchsorted(ids, numpy.array([p.id for p in truck.packages], dtype=numpy.int64)))
+        route_entries.append(routes[truck.id][0] if truck.id in routes else [])
+    sections["dispatch_times"] = clock_array(t.dispatch_at for t in trucks)
+    sections["return_times"] = clock_array(to_clock(routes[t.id][1]) if t.id in routes else None for t in trucks)
+    sections["load_offsets"] = numpy.cumsum([0] + [len(rows) for rows in load_rows], dtype=numpy.int64)
+    sections["load_rows"] = numpy.concatenate(load_rows + [numpy.empty(0, dtype=numpy.int64)]).astype(numpy.int64)
+    sections["route_offsets"] = numpy.cumsum([0] + [len(route) for route in route_entries], dtype=numpy.int64)
+    entries = [entry for route in route_entries for entry in route]
+    sections["route_location_ids"] = numpy.array([entry[0] for entry in entries], dtype=numpy.int32)
+    sections["route_package_ids"] = numpy.array([NO_STOP if entry[1] is None else
+                                                 BACK_TO_HQ if entry[1] == "back_to_hq" else entry[1]
+                                                 for entry in entries], dtype=numpy.int64)
+    sections["route_distances"] = numpy.array([entry[2] for entry in entries], dtype=numpy.float64)
+
+    directory = []
+    offset = aligned(HEADER.size + SECTION.size * len(sections))
+    for name, array in sections.items():
+        array = numpy.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        sections[name] = array
+        directory.append(SECTION.pack(name.encode("ascii"), array.dtype.str.encode("ascii"), offset, len(array),
+                                      zlib.crc32(array)))
+        offset = aligned(offset + array.nbytes)
+    directory = b"".join(directory)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(ids), len(trucks), len(sections), zlib.crc32(directory))
+
+    temporary_path = str(path) + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(header)
+        file.write(directory)
+        for array in sections.values():
+            file.write(b"\0" * (aligned(file.tell()) - file.tell()))
+            file.write(array.tobytes())
+    os.replace(temporary_path, path)
+
+
+# Loads a plan written by save_plan. Raises ValueError if the file is not a plan of this format version, is
+# truncated, or, with verify=True, if a section does not match its checksum. verify=False only checks the header and
+# the directory, which keeps loading independent of the size of the plan.
+# Time Complexity: O(T) [O(N) with verify]
+# Space Complexity: O(T)
+@timed()
+def load_plan(path, verify=True) -> PlanSnapshot:
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+    if len(buffer) < HEADER.size:
+        raise ValueError(str(path) + " is not a plan snapshot")
+    magic, version, package_count, truck_count, section_count, directory_checksum = \
+        HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(str(path) + " is not a version " + str(FORMAT_VERSION) + " plan snapshot")
+    directory = buffer[HEADER.size:HEADER.size + SECTION.size * section_count]
+    if len(directory) != SECTION.size * section_count or zlib.crc32(directory) != directory_checksum:
+        raise ValueError(str(path) + " has a damaged section directory")
+
+    sections = {}
+    for i in range(section_count):
+        name, dtype, offset, count, checksum = SECTION.unpack_from(directory, i * SECTION.size)
+        name, dtype = name.rstrip(b"\0").decode("ascii"), numpy.dtype(dtype.rstrip(b"\0").decode("ascii"))
+        if offset + count * dtype.itemsize > len(buffer):
+            raise ValueError(str(path) + " is truncated in section " + name)
+        array = numpy.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        if verify and zlib.crc32(array) != checksum:
+            raise ValueError(str(path) + " fails the checksum of section " + name)
+        sections[name] = array
+
+    packages = PackageStore(0)
+    for name in PackageStore.NUMERIC_COLUMNS:
+        setattr(packages, name, sections[name])
+    table = StringTable(sections["string_offsets"], sections["string_data"])
+    for name in STRING_COLUMNS:
+        setattr(packages, name, StringColumn(sections[name], table))
+    packages.size = package_count
+
+    trucks = [Truck(i + 1) for i in range(truck_count)]
+    for truck, dispatch_at in zip(trucks, sections["dispatch_times"]):
+        truck.dispatch_at = from_column(dispatch_at)
+    packages.trucks = trucks
+    return PlanSnapshot(path, sections, packages, trucks)
+
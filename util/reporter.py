@@ -0,0 +1,257 @@
+import contextlib
+import csv
+import io
+import json
+import sys
+from typing import Optional
+
+from model.clock import format_clocks
+from model.package import PackagePriority, PackageStatus
+
+"""
+Presentation of what WGUPS does. Loading, routing and status queries return plain records and hand them to a reporter,
+and warnings, such as packages without a location or that may be late, go to its notice method:
+
+    ConsoleReporter   the interactive text, written as it happens (the default)
+    TextReporter      the same kind of text, collected and written at once on flush()
+    CsvReporter       one csv row per record, a header before the first row of each kind
+    JsonLinesReporter one JSON object per record
+    Reporter          quiet: records are dropped without being formatted
+
+The buffered reporters join everything into a single write to their stream when flush() is called.
+"""
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class LoadRecord:
+    __slots__ = ("truck_id", "package_id", "priority")
+
+    def __init__(self, truck_id, package_id, priority: PackagePriority):
+        self.truck_id = truck_id
+        self.package_id = package_id
+        self.priority = priority
+
+
+# A planned route: the route entries of generate_route, the dispatch time and the time the truck is back.
+# Time Complexity: O(1)
+# Space Complexity: O(1) [the route list is shared]
+class RouteRecord:
+    __slots__ = ("truck_id", "dispatch_time", "route", "return_time")
+
+    def __init__(self, truck_id, dispatch_time, route: list[tuple], return_time):
+        self.truck_id = truck_id
+        self.dispatch_time = dispatch_time
+        self.route = route
+        self.return_time = return_time
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(1)
+    def miles(self):
+        return float(sum(entry[2] for entry in self.route))
+
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def package_ids(self):
+        return [entry[1] for entry in self.route if entry[1] is not None and entry[1] != "back_to_hq"]
+
+
+# The status of every package at one time, backed by the status timeline once all packages are routed and by the
+# packages, sorted by id, before that.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class StatusReport:
+    def __init__(self, time_, timeline=None, packages: Optional[list] = None):
+        self.time = time_
+        self.timeline = timeline
+        self.packages = packages
+
+    # The text print_package_status prints for every package.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def text(self):
+        if self.timeline is not None:
+            return self.timeline.format_statuses(self.time)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for package in self.packages:
+                package.print_package_status(self.time)
+        return output.getvalue()
+
+    # (package id, status name, truck id, dispatch HH:MM, delivery HH:MM) per package; truck and times are None for
+    # a package that is not routed.
+    # Time Complexity: O(N)
+    # Space Complexity: O(N)
+    def rows(self):
+        if self.timeline is not None:
+            timeline = self.timeline
+            names = [None] + [status.name for status in PackageStatus]
+            return [(package_id, names[status], truck_id, dispatch, delivery)
+                    for package_id, status, truck_id, dispatch, delivery in
+                    zip(timeline.ids.tolist(), timeline.statuses(self.time).tolist(), timeline.truck_ids.tolist(),
+                        format_clocks(timeline.dispatched), format_clocks(timeline.delivered))]
+        rows = []
+        for package in self.packages:
+            if package.truck is None or package.dispatched_time is None or package.delivered_time is None:
+                rows.append((package.id, PackageStatus.HUB.name, None, None, None))
+                continue
+            status = PackageStatus.HUB
+            if self.time > package.dispatched_time:
+                status = PackageStatus.EN_ROUTE
+            if self.time > package.delivered_time:
+                status = PackageStatus.DELIVERED
+            rows.append((package.id, status.name, package.truck.id, package.dispatched_time.strftime("%H:%M"),
+                         package.delivered_time.strftime("%H:%M")))
+        return rows
+
+
+# Quiet reporter, and the interface of the others.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+class Reporter:
+    def load(self, record: LoadRecord):
+        pass
+
+    def route(self, record: RouteRecord):
+        pass
+
+    def statuses(self, report: StatusReport):
+        pass
+
+    def notice(self, text: str):
+        pass
+
+    def flush(self):
+        pass
+
+
+# Writes what the interactive program has always printed, when it happens. Routes are summarized by main.py itself.
+# Time Complexity: O(1) per record, O(N) per status report
+# Space Complexity: O(1)
+class ConsoleReporter(Reporter):
+    def load(self, record: LoadRecord):
+        print("\tTruck " + str(record.truck_id) + " loaded with package " + str(record.package_id))
+
+    def notice(self, text: str):
+        print(text)
+
+    def statuses(self, report: StatusReport):
+        if report.timeline is not None:
+            sys.stdout.write(report.text())
+            return
+        # package by package, so an unrouted package stops the table where it always has
+        for package in report.packages:
+            package.print_package_status(report.time)
+
+
+# Collects formatted text and writes it to the stream in one call on flush().
+# Time Complexity: O(1) per part
+# Space Complexity: O(N) [until flushed]
+class BufferedReporter(Reporter):
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.parts: list[str] = []
+
+    def flush(self):
+        if self.parts:
+            stream = self.stream or sys.stdout
+            stream.write("".join(self.parts))
+            stream.flush()
+            self.parts.clear()
+
+
+# Time Complexity: O(1) per record, O(N) per status report
+# Space Complexity: O(N) [until flushed]
+class TextReporter(BufferedReporter):
+    def load(self, record: LoadRecord):
+        self.parts.append("Truck " + str(record.truck_id) + " loaded with package " + str(record.package_id) + "\n")
+
+    def route(self, record: RouteRecord):
+        self.parts.append("Truck " + str(record.truck_id) + " leaves at " + record.dispatch_time.strftime("%H:%M") +
+                          ", back at " + record.return_time.strftime("%H:%M") + ", " +
+                          "{:.2f}".format(record.miles()) + " miles: " + str(record.package_ids()) + "\n")
+
+    def statuses(self, report: StatusReport):
+        self.parts.append(report.text())
+
+    def notice(self, text: str):
+        self.parts.append(text + "\n")
+
+
+# Time Complexity: O(1) per record, O(N) per status report
+# Space Complexity: O(N) [until flushed]
+class CsvReporter(BufferedReporter):
+    HEADERS = {"load": ["record", "truck", "package", "priority"],
+               "route": ["record", "truck", "dispatch", "return", "miles", "packages"],
+               "status": ["record", "time", "package", "status", "truck", "dispatch", "delivery"],
+               "notice": ["record", "text"]}
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+        self.started: set[str] = set()
+
+    def write_rows(self, kind, rows):
+        if kind not in self.started:
+            self.started.add(kind)
+            self.writer.writerow(self.HEADERS[kind])
+        self.writer.writerows(rows)
+
+    def load(self, record: LoadRecord):
+        self.write_rows("load", [("load", record.truck_id, record.package_id, record.priority.name)])
+
+    def route(self, record: RouteRecord):
+        self.write_rows("route", [("route", record.truck_id, record.dispatch_time.strftime("%H:%M"),
+                                   record.return_time.strftime("%H:%M"), "{:.2f}".format(record.miles()),
+                                   " ".join(str(i) for i in record.package_ids()))])
+
+    def statuses(self, report: StatusReport):
+        at = report.time.strftime("%H:%M")
+        self.write_rows("status", [("status", at) + row for row in report.rows()])
+
+    def notice(self, text: str):
+        self.write_rows("notice", [("notice", text)])
+
+    def flush(self):
+        self.parts.append(self.buffer.getvalue())
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        super().flush()
+
+
+# Time Complexity: O(1) per record, O(N) per status report
+# Space Complexity: O(N) [until flushed]
+class JsonLinesReporter(BufferedReporter):
+    def load(self, record: LoadRecord):
+        self.parts.append(json.dumps({"record": "load", "truck": record.truck_id, "package": record.package_id,
+                                      "priority": record.priority.name}) + "\n")
+
+    def route(self, record: RouteRecord):
+        self.parts.append(json.dumps({"record": "route", "truck": record.truck_id,
+                                      "dispatch": record.dispatch_time.strftime("%H:%M"),
+                                      "return": record.return_time.strftime("%H:%M"),
+                                      "miles": round(record.miles(), 2), "packages": record.package_ids()}) + "\n")
+
+    def statuses(self, report: StatusReport):
+        at = report.time.strftime("%H:%M")
+        self.parts += [json.dumps({"record": "status", "time": at, "package": package_id, "status": status,
+                                   "truck": truck_id, "dispatch": dispatch, "delivery": delivery}) + "\n"
+                       for package_id, status, truck_id, dispatch, delivery in report.rows()]
+
+    def notice(self, text: str):
+        self.parts.append(json.dumps({"record": "notice", "text": text}) + "\n")
+
+
+REPORTERS = {"console": ConsoleReporter, "text": TextReporter, "csv": CsvReporter, "jsonl": JsonLinesReporter,
+             "quiet": Reporter}
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def make_reporter(name, stream=None) -> Reporter:
+    if name not in REPORTERS:
+        raise ValueError("Unknown output format " + repr(name) + ", expected one of " + ", ".join(REPORTERS))
+    if name in ("console", "quiet"):
+        return REPORTERS[name]()
+    return REPORTERS[name](stream)
@@ -0,0 +1,131 @@
+import argparse
+import csv
+import random
+from pathlib import Path
+
+import numpy
+
+"""
+Seeded generator of synthetic scenarios in the formats of data/distance.csv and data/package.csv, for measuring the
+program on networks far larger than the shipped one.
+
+    python -m util.scenario_generator --locations 5000 --packages 20000 --output scenarios/5k
+
+Locations are random points in a square around the hub; distances are straight-line miles rounded to one decimal as in
+the shipped table. The same arguments and seed always write the same files.
+"""
+
+STREETS = ["Main St", "State St", "Canyon Rd", "Dalton Ave S", "Oakland Ave", "Price Ave", "Taylorsville Blvd",
+           "Bringhurst St", "Vista Way", "Hopkins Ave", "Valley Central Hwy", "Ridge Rd"]
+DIRECTIONS = ["N", "S", "E", "W"]
+ZIPS = ["84103", "84104", "84105", "84106", "84107", "84111", "84115", "84117", "84118", "84119", "84121", "84123"]
+DEFAULT_DEADLINES = {"9:00 AM": 0.05, "10:30 AM": 0.3, "EOD": 0.65}
+DELAYED_NOTE = "Delayed on flight---will not arrive to depot until 9:05 am"
+WRONG_ADDRESS_NOTE = "Wrong address listed"
+
+
+# A unique street address per location id.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def synthetic_address(rng: random.Random, id_):
+    return str(id_ * 10 + rng.randrange(1, 10)) + " " + rng.choice(DIRECTIONS) + " " + rng.choice(STREETS)
+
+
+# Writes the distance csv: name, address and zip, then the distances to every lower-indexed location, each row padded
+# with empty columns to one column per location. Only one row is held in memory at a time. Returns the addresses and
+# zips by location id.
+# Time Complexity: O(N^2)
+# Space Complexity: O(N)
+def write_distances(path, count, seed=1, size_miles=None):
+    rng = random.Random(seed)
+    points = numpy.random.default_rng(seed).random((count, 2))
+    # keep the density of the shipped network, about 27 locations in a 10 mile square
+    points *= size_miles if size_miles is not None else 10 * max(1.0, (count / 27) ** 0.5)
+    addresses = ["4001 S 700 E"] + [synthetic_address(rng, i) for i in range(1, count)]
+    zips = [rng.choice(ZIPS) for _ in range(count)]
+    with open(path, "w", newline='') as distance_csv:
+        writer = csv.writer(distance_csv)
+        for i in range(count):
+            row = numpy.sqrt(((points[:i + 1] - points[i]) ** 2).sum(axis=1))
+            distances = ["{:.1f}".format(value) for value in row.tolist()]
+            distances[i] = "0"
+            name = "Hub" if i == 0 else "Location " + str(i)
+            writer.writerow([name, addresses[i], zips[i]] + distances + [""] * (count - i - 1))
+    return addresses, zips
+
+
+# Writes the package csv. deadlines maps a deadline as written in the csv ("10:30 AM" or "EOD") to its share of the
+# packages; note_rate is the share of packages given one of the special notes, chosen evenly among pinned truck,
+# delayed, delivered with two other packages and wrong address. Packages are only delivered with recent packages that
+# are not pinned to a truck, so every generated scenario can be loaded.
+# Time Complexity: O(N)
+# Space Complexity: O(1)
+def write_packages(path, count, addresses, zips, seed=1, deadlines=None, note_rate=0.25, trucks=3):
+    rng = random.Random(seed + 1)
+    deadlines = deadlines or DEFAULT_DEADLINES
+    labels, weights = list(deadlines), list(deadlines.values())
+    pinned = set()
+    with open(path, "w", newline='') as package_csv:
+        writer = csv.writer(package_csv)
+        for id_ in range(1, count + 1):
+            location_id = rng.randrange(1, len(addresses)) if len(addresses) > 1 else 0
+            deadline = rng.choices(labels, weights)[0]
+            notes = ""
+            if rng.random() < note_rate:
+                kind = rng.randrange(4)
+                recent = [i for i in range(max(1, id_ - 20), id_) if i not in pinned]
+                if kind == 0:
+                    notes = "Can only be on truck " + str(rng.randrange(1, trucks + 1))
+                    pinned.add(id_)
+                elif kind == 1:
+                    notes = DELAYED_NOTE
+                elif kind == 2 and len(recent) >= 2:
+                    notes = "Must be delivered with " + ", ".join(str(i) for i in sorted(rng.sample(recent, 2)))
+                elif kind == 3:
+                    notes = WRONG_ADDRESS_NOTE
+            writer.writerow([id_, addresses[location_id], "Salt Lake City", "UT", zips[location_id], deadline,
+                             rng.randrange(1, 90), notes])
+
+
+# Writes distance.csv and package.csv into directory and returns their paths.
+# Time Complexity: O(L^2 + P)
+# Space Complexity: O(L)
+def generate_scenario(directory, locations, packages, seed=1, deadlines=None, note_rate=0.25, trucks=3):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    distance_path = directory / "distance.csv"
+    package_path = directory / "package.csv"
+    addresses, zips = write_distances(distance_path, locations, seed)
+    write_packages(package_path, packages, addresses, zips, seed, deadlines, note_rate, trucks)
+    return distance_path, package_path
+
+
+# Parses "9:00 AM=0.1,EOD=0.9" into a deadline mix.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_deadline_mix(text):
+    mix = {}
+    for part in text.split(","):
+        label, _, share = part.rpartition("=")
+        mix[label.strip()] = float(share)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic distance.csv and package.csv.")
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--packages", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--deadlines", type=parse_deadline_mix, default=None,
+                        help='share of each deadline, e.g. "9:00 AM=0.05,10:30 AM=0.3,EOD=0.65"')
+    parser.add_argument("--note-rate", type=float, default=0.25)
+    parser.add_argument("--trucks", type=int, default=3, help="highest truck number in 'Can only be on truck' notes")
+    parser.add_argument("--output", default="scenario")
+    args = parser.parse_args()
+    distance_path, package_path = generate_scenario(args.output, args.locations, args.packages, args.seed,
+                                                    args.deadlines, args.note_rate, args.trucks)
+    print("Wrote " + str(distance_path) + " and " + str(package_path))
+
+
+if __name__ == "__main__":
+    main()
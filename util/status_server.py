@@ -0,0 +1,399 @@
+import asyncio
+import datetime
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy
+
+from model.clock import MICROSECONDS_PER_MINUTE, NOT_SET, format_clock
+from model.events import AddressChange, Delay
+from model.package import PackageStatus, format_deadline
+from model.package_store import NO_TRUCK, PackageRecord, PackageStore
+
+"""
+Status queries over a local socket. The day is planned once, then every query is answered on the event loop from a
+StatusIndex: package id -> row, dispatch and delivery times as integer arrays and the JSON of each package in each
+status rendered up front, so a query is a dict lookup, two comparisons and a string join. Re-planning and events run
+on a single planning thread and build a new index, which replaces the old one when it is complete; queries keep being
+answered from the old index meanwhile.
+
+The protocol is one request line and one JSON response line, any number per connection:
+
+    STATUS <id> <HH:MM>                          {"time": "10:00", "package": 1, "status": "DELIVERED", ...}
+    BULK <HH:MM> <id> [<id> ...]                 {"time": "10:00", "packages": [{...}, ...]}
+    ALL <HH:MM>                                  {"time": "10:00", "packages": [{...}, ...]}
+    COUNTS <HH:MM>                               {"time": "10:00", "HUB": 12, "EN_ROUTE": 8, "DELIVERED": 20}
+    DELAY <id> <HH:MM> <available HH:MM>         a Delay event at the first time, answered with the new route
+    ADDRESS <id> <HH:MM> <address>               an AddressChange event
+    REPLAN                                       plans the whole day again
+    STATS                                        connections, queries and index generation
+    QUIT
+
+Errors are answered with {"error": "..."}. Times are minutes of the day; a package is en route after its dispatch
+time and delivered after its delivery time, as in Package.print_package_status. Packages without a route are at
+the hub all day.
+
+A plan saved by util.plan_snapshot can be served without a planner: the index is read from the snapshot's columns
+(StoreStatusIndex), and DELAY, ADDRESS and REPLAN are answered with an error.
+"""
+
+NOT_ROUTED = numpy.iinfo(numpy.int64).max  # event time of a package that is never dispatched or delivered
+WRITE_BUFFER_LIMIT = 1 << 16  # bytes buffered for a connection before waiting for the client to read
+LINE_LIMIT = 1 << 20  # longest request line, for BULK queries
+
+
+# Minutes of the day of an HH:MM time. Raises ValueError.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def parse_minutes(text) -> int:
+    hours, minutes = text.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError("Time out of range: " + text)
+    return hours * 60 + minutes
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def datetime_of(minutes) -> datetime.datetime:
+    return datetime.datetime(1, 1, 1, minutes // 60, minutes % 60)
+
+
+# Immutable snapshot of every package's status over the day.
+# Time Complexity: O(N log N)
+# Space Complexity: O(N)
+class StatusIndex:
+    def __init__(self, packages, generation=0):
+        packages = sorted(packages, key=lambda p: p.id)
+        self.generation = generation
+        self.rows = {p.id: row for row, p in enumerate(packages)}
+        routed = [p.truck is not None and p.dispatched_at is not None and p.delivered_at is not None
+                  for p in packages]
+        self.dispatched = numpy.array([p.dispatched_at if r else NOT_ROUTED for p, r in zip(packages, routed)],
+                                      dtype=numpy.int64)
+        self.delivered = numpy.array([p.delivered_at if r else NOT_ROUTED for p, r in zip(packages, routed)],
+                                     dtype=numpy.int64)
+        self.sorted_dispatched = numpy.sort(self.dispatched)
+        self.sorted_delivered = numpy.sort(self.delivered)
+        # plain ints for single lookups, which are faster to compare than numpy scalars
+        self.dispatched_times: list[int] = self.dispatched.tolist()
+        self.delivered_times: list[int] = self.delivered.tolist()
+        # the JSON object of each package as HUB, EN_ROUTE and DELIVERED, without its opening brace
+        self.bodies = [render_bodies(p, r) for p, r in zip(packages, routed)]
+        self.all_responses: dict[int, bytes] = {}  # ALL response per minute of the day, at most 1440
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def __len__(self):
+        return len(self.bodies)
+
+    # Time Complexity: O(1)
+    # Space Complexity: O(1)
+    def package_json(self, package_id, minutes) -> str:
+        row = self.rows[package_id]
+        at = minutes * MICROSECONDS_PER_MINUTE
+        return self.bodies[row][(at > self.dispatched_times[row]) + (at > self.delivered_times[row])]
+
+    # Time Complexity: O(K) [K packages]
+    # Space Complexity: O(K)
+    def bulk_response(self, package_ids: list[int], minutes) -> bytes:
+        rows = [self.rows[package_id] for package_id in package_ids]
+        at = minutes * MICROSECONDS_PER_MINUTE
+        statuses = ((at > self.dispatched[rows]).astype(numpy.int8) +
+                    (at > self.delivered[rows]).astype(numpy.int8)).tolist()
+        bodies = self.bodies
+        return packages_response(minutes, [bodies[row][status] for row, status in zip(rows, statuses)])
+
+    # Every package at the given minute. Built once per minute of the day and reused.
+    # Time Complexity: O(N) [vectorized] the first time, O(1) afterwards
+    # Space Complexity: O(N)
+    def all_response(self, minutes) -> bytes:
+        response = self.all_responses.get(minutes)
+        if response is None:
+            at = minutes * MICROSECONDS_PER_MINUTE
+            statuses = ((at > self.dispatched).astype(numpy.int8) +
+                        (at > self.delivered).astype(numpy.int8)).tolist()
+            response = packages_response(minutes, [bodies[status] for bodies, status in zip(self.bodies, statuses)])
+            self.all_responses[minutes] = response
+        return response
+
+    # Time Complexity: O(log N)
+    # Space Complexity: O(1)
+    def counts(self, minutes) -> dict[str, int]:
+        at = minutes * MICROSECONDS_PER_MINUTE
+        dispatched = int(numpy.searchsorted(self.sorted_dispatched, at, side="left"))
+        delivered = int(numpy.searchsorted(self.sorted_delivered, at, side="left"))
+        return {PackageStatus.HUB.name: len(self.bodies) - dispatched,
+                PackageStatus.EN_ROUTE.name: dispatched - delivered,
+                PackageStatus.DELIVERED.name: delivered}
+
+
+# Package id -> row of a store whose rows are in id order, by binary search.
+# Time Complexity: O(log N) per lookup
+# Space Complexity: O(1)
+class SortedRows:
+    def __init__(self, ids: numpy.ndarray):
+        self.ids = ids
+
+    def __getitem__(self, package_id) -> int:
+        row = int(numpy.searchsorted(self.ids, package_id))
+        if row == len(self.ids) or self.ids[row] != package_id:
+            raise KeyError(package_id)
+        return row
+
+    def __contains__(self, package_id):
+        try:
+            self[package_id]
+        except KeyError:
+            return False
+        return True
+
+
+# The bodies of render_bodies, rendered the first time a package is asked for.
+# Time Complexity: O(1) per package
+# Space Complexity: O(K) [K packages asked for]
+class RenderedBodies:
+    def __init__(self, store: PackageStore, routed: numpy.ndarray):
+        self.store = store
+        self.routed = routed
+        self.rendered: dict[int, tuple[str, str, str]] = {}
+
+    def __len__(self):
+        return len(self.routed)
+
+    def __getitem__(self, row) -> tuple[str, str, str]:
+        bodies = self.rendered.get(row)
+        if bodies is None:
+            if not 0 <= row < len(self.routed):
+                raise IndexError(row)
+            bodies = render_bodies(PackageRecord(self.store, row), bool(self.routed[row]))
+            self.rendered[row] = bodies
+        return bodies
+
+
+# A StatusIndex read from the columns of a PackageStore whose rows are in id order, such as the store of a loaded
+# plan snapshot. The event times are converted in a few vectorized passes and nothing is rendered up front, so the
+# index is ready in milliseconds however many packages there are; a package's JSON is rendered when first asked for.
+# Time Complexity: O(N) [vectorized]
+# Space Complexity: O(N)
+class StoreStatusIndex(StatusIndex):
+    def __init__(self, store: PackageStore, generation=0):
+        size = store.size
+        self.generation = generation
+        self.rows = SortedRows(store.ids[:size])
+        dispatched, delivered = store.dispatched_times[:size], store.delivered_times[:size]
+        routed = (store.truck_ids[:size] != NO_TRUCK) & (dispatched != NOT_SET) & (delivered != NOT_SET)
+        self.dispatched = numpy.where(routed, dispatched, NOT_ROUTED)
+        self.delivered = numpy.where(routed, delivered, NOT_ROUTED)
+        self.dispatched_times = self.dispatched
+        self.delivered_times = self.delivered
+        self.bodies = RenderedBodies(store, routed)
+        self.all_responses: dict[int, bytes] = {}
+
+    # Sorted on the first COUNTS query.
+    # Time Complexity: O(N log N) once
+    # Space Complexity: O(N)
+    @functools.cached_property
+    def sorted_dispatched(self):
+        return numpy.sort(self.dispatched)
+
+    @functools.cached_property
+    def sorted_delivered(self):
+        return numpy.sort(self.delivered)
+
+    # Time Complexity: O(log N)
+    # Space Complexity: O(1)
+    def package_json(self, package_id, minutes) -> str:
+        row = self.rows[package_id]
+        at = minutes * MICROSECONDS_PER_MINUTE
+        return self.bodies[row][int(at > self.dispatched[row]) + int(at > self.delivered[row])]
+
+
+# The package's JSON object body for each status, e.g. '"package": 1, "status": "HUB", ...}'.
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def render_bodies(package, routed) -> tuple[str, str, str]:
+    fields = {"truck": package.truck.id if routed else None,
+              "dispatch": format_clock(package.dispatched_at) if routed else None,
+              "delivery": format_clock(package.delivered_at) if routed else None,
+              "deadline": format_deadline(package.deadline)}
+    if not routed:
+        hub = '"package": ' + str(package.id) + ', "status": "HUB", ' + json.dumps(fields)[1:]
+        return hub, hub, hub
+    return tuple('"package": ' + str(package.id) + ', "status": "' + status.name + '", ' + json.dumps(fields)[1:]
+                 for status in PackageStatus)
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def time_field(minutes) -> str:
+    return '{"time": "' + "{:02d}:{:02d}".format(minutes // 60, minutes % 60) + '", '
+
+
+# Time Complexity: O(K)
+# Space Complexity: O(K)
+def packages_response(minutes, bodies: list[str]) -> bytes:
+    return (time_field(minutes) + '"packages": [' + ", ".join(["{" + body for body in bodies]) + "]}\n").encode()
+
+
+# Time Complexity: O(1)
+# Space Complexity: O(1)
+def error_response(message) -> bytes:
+    return (json.dumps({"error": message}) + "\n").encode()
+
+
+# Answers connections from the current StatusIndex. planner returns a routed WGUPS, or is None when serving the
+# given index of a saved plan; planning and every event run on the planning thread, one at a time.
+# Time Complexity: O(1) per status query, O(K) per bulk query
+# Space Complexity: O(N)
+class StatusServer:
+    def __init__(self, planner: Optional[Callable], index: Optional[StatusIndex] = None):
+        self.planner = planner
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="planning")
+        self.wgups = None  # only touched on the planning thread once serving
+        self.index: Optional[StatusIndex] = index
+        self.generation = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.queries = 0
+
+    # Runs a planning job on the planning thread and swaps in the index it builds.
+    # Time Complexity: O(T * N^2) [the planning]
+    # Space Complexity: O(N^2)
+    async def run_planning(self, job, *args):
+        result, self.index = await asyncio.get_running_loop().run_in_executor(self.executor, job, *args)
+        return result
+
+    # Plans the day from scratch. Runs on the planning thread.
+    # Time Complexity: O(T * N^2)
+    # Space Complexity: O(N^2)
+    def plan(self):
+        self.wgups = self.planner()
+        self.generation += 1
+        miles = sum(entry[2] for route, _ in self.wgups.routes.values() for entry in route)
+        return {"replanned": True, "total_miles": round(float(miles), 2)}, \
+            StatusIndex(self.wgups.packages.get_all(), self.generation)
+
+    # Applies an event to the planned day. Runs on the planning thread.
+    # Time Complexity: O(R^2 + N log N) [R stops left on the truck, rebuilding the index]
+    # Space Complexity: O(N)
+    def apply(self, event):
+        route, return_time = self.wgups.apply_event(event)
+        self.generation += 1
+        stops = [entry[1] for entry in route if entry[1] not in (None, "back_to_hq")]
+        return {"package": event.package_id, "truck": self.wgups.packages.lookup_(event.package_id).truck.id,
+                "return": return_time.strftime("%H:%M"), "route": stops}, \
+            StatusIndex(self.wgups.packages.get_all(), self.generation)
+
+    # The response to one request line, or None to close the connection. Queries are answered without leaving the
+    # event loop; events and re-planning wait for the planning thread.
+    # Time Complexity: O(1) per status query
+    # Space Complexity: O(1)
+    async def respond(self, line: bytes) -> Optional[bytes]:
+        words = line.decode(errors="replace").split()
+        if not words:
+            return error_response("Empty request")
+        command = words[0].upper()
+        index = self.index
+        try:
+            if command == "STATUS" and len(words) == 3:
+                self.queries += 1
+                minutes = parse_minutes(words[2])
+                return (time_field(minutes) + index.package_json(int(words[1]), minutes) + "\n").encode()
+            if command == "BULK" and len(words) >= 3:
+                self.queries += 1
+                return index.bulk_response([int(word) for word in words[2:]], parse_minutes(words[1]))
+            if command == "ALL" and len(words) == 2:
+                self.queries += 1
+                return index.all_response(parse_minutes(words[1]))
+            if command == "COUNTS" and len(words) == 2:
+                self.queries += 1
+                minutes = parse_minutes(words[1])
+                return (time_field(minutes) + json.dumps(index.counts(minutes))[1:] + "\n").encode()
+            if command in ("DELAY", "ADDRESS", "REPLAN") and self.planner is None:
+                return error_response("Serving a saved plan; " + command + " needs a planner")
+            if command in ("DELAY", "ADDRESS") and len(words) >= 4 and int(words[1]) not in index.rows:
+                raise KeyError(int(words[1]))
+            if command == "DELAY" and len(words) == 4:
+                event = Delay(datetime_of(parse_minutes(words[2])), int(words[1]),
+                              datetime_of(parse_minutes(words[3])))
+                return (json.dumps(await self.run_planning(self.apply, event)) + "\n").encode()
+            if command == "ADDRESS" and len(words) >= 4:
+                address = line.decode(errors="replace").split(None, 3)[3].strip()
+                event = AddressChange(datetime_of(parse_minutes(words[2])), int(words[1]), address)
+                return (json.dumps(await self.run_planning(self.apply, event)) + "\n").encode()
+            if command == "REPLAN" and len(words) == 1:
+                return (json.dumps(await self.run_planning(self.plan)) + "\n").encode()
+            if command == "STATS" and len(words) == 1:
+                return (json.dumps({"connections": self.connections, "open_connections": self.open_connections,
+                                    "queries": self.queries, "packages": len(index),
+                                    "generation": index.generation}) + "\n").encode()
+            if command == "QUIT":
+                return None
+        except KeyError as error:
+            return error_response("Unknown package " + str(error))
+        except ValueError as error:
+            return error_response(str(error))
+        return error_response("Unknown request: " + " ".join(words)[:80])
+
+    # Time Complexity: O(Q) [Q requests on the connection]
+    # Space Complexity: O(1)
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # a line longer than LINE_LIMIT
+                    writer.write(error_response("Request line too long"))
+                    break
+                if not line:
+                    break
+                response = await self.respond(line)
+                if response is None:
+                    break
+                writer.write(response)
+                if writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                    await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    # Plans the day unless an index was given, then listens on a TCP port, or on a Unix socket if path is given, until
+    # cancelled.
+    # started, if given, is called with the listening server once queries can be answered.
+    # Time Complexity: O(T * N^2) [the first plan]
+    # Space Complexity: O(N^2)
+    async def serve(self, host="127.0.0.1", port=8421, path=None, started: Optional[Callable] = None):
+        if self.index is None:
+            await self.run_planning(self.plan)
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path, limit=LINE_LIMIT, backlog=4096)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT, backlog=4096)
+        if started is not None:
+            started(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Serves status queries until interrupted. See StatusServer.serve.
+# Time Complexity: O(T * N^2) [the first plan]
+# Space Complexity: O(N^2)
+def run(planner: Optional[Callable], host="127.0.0.1", port=8421, path=None, index: Optional[StatusIndex] = None):
+    def started(server):
+        print("Answering status queries on " + ", ".join(str(s.getsockname()) for s in server.sockets))
+
+    try:
+        asyncio.run(StatusServer(planner, index).serve(host, port, path, started))
+    except KeyboardInterrupt:
+        pass